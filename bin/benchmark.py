@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Times each stage of the pipeline over a fixed corpus, either synthetic
+# (served by fake_datatracker.py) or replayed from a cassette, with the LLM
+# stubbed out. Each pass runs in a fresh process so that module-level caches
+# don't carry over, but passes share a working directory so that later passes
+# see the files written by earlier ones.
+PASSES = {
+    # A first run from an empty checkout.
+    "cold": {},
+    # ./bin/run.py -p on top of the cold run.
+    "warm": {"force_parse": True},
+    # ./bin/run.py -f on top of the previous runs.
+    "refresh": {"force_feedback": True},
+}
+STAGES = ["positions", "metadata", "feedback", "parse", "summarize", "format"]
+# Stages slower than the baseline by more than this fraction are reported as regressions.
+DEFAULT_THRESHOLD = 0.2
+
+
+def _get_peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
+
+
+def _stub_llm(latency):
+    import summarize
+
+    def get_stubbed_ai_summary(prompt, model, summaries_forced=None):
+        if latency:
+            time.sleep(latency)
+        return f"<p>Stubbed summary of {len(prompt)} characters.</p>", True
+
+    summarize._get_ai_summary = get_stubbed_ai_summary
+
+
+def run_pass(pass_name, jobs=8, llm_latency=0.0):
+    """Runs every stage once in the current directory and returns their measurements."""
+    import http_cache
+    import http_client
+    from email_index import flush_email_index
+    from feedback import save_all_html_feedback
+    from feedback_parser import parse_all_feedback
+    from format import run_formatting
+    from nominees import crawl_nominee_info, get_active_nominees, get_nominee_positions
+    from positions import get_positions, get_topics
+    from summarize import run_summarize
+
+    _stub_llm(llm_latency)
+    options = {"force_metadata": False, "force_feedback": False, "force_parse": False, "redo_summaries": False}
+    options.update(PASSES[pass_name])
+    force_metadata = options["force_metadata"]
+
+    def crawl_metadata():
+        nominee_ids = [nominee['id'] for nominee in get_active_nominees(force_metadata=force_metadata)]
+        crawl_nominee_info(nominee_ids, force_metadata=force_metadata, jobs=jobs)
+        flush_email_index()
+
+    stage_functions = {
+        "positions": lambda: (get_positions(force_metadata=force_metadata), get_topics(force_metadata=force_metadata), get_nominee_positions(force_metadata=force_metadata)),
+        "metadata": crawl_metadata,
+        "feedback": lambda: save_all_html_feedback(force_metadata=force_metadata, force_feedback=options["force_feedback"], jobs=jobs),
+        "parse": lambda: parse_all_feedback(force_metadata=force_metadata, force_feedback=options["force_feedback"], force_parse=options["force_parse"], jobs=jobs),
+        "summarize": lambda: run_summarize(summaries_forced=True, **options),
+        "format": lambda: run_formatting(summaries_forced=True, **options),
+    }
+    results = {}
+    for stage in STAGES:
+        http_before = dict(http_client.HTTP_STATS)
+        cache_before = dict(http_cache.CACHE_STATS)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        stage_functions[stage]()
+        results[stage] = {
+            "wall_s": time.perf_counter() - wall_start,
+            "cpu_s": time.process_time() - cpu_start,
+            "peak_rss_mb": _get_peak_rss_mb(),
+            "requests": http_client.HTTP_STATS["requests"] - http_before["requests"],
+            "bytes": http_client.HTTP_STATS["bytes"] - http_before["bytes"],
+            "cache_downloaded": http_cache.CACHE_STATS["downloaded"] - cache_before["downloaded"],
+            "cache_not_modified": http_cache.CACHE_STATS["not_modified"] - cache_before["not_modified"],
+        }
+    return results
+
+
+def _prepare_work_dir(work_dir):
+    os.makedirs(os.path.join(work_dir, "config"), exist_ok=True)
+    with open(os.path.join(work_dir, "config", "session_id.txt"), "w", encoding="utf-8") as f:
+        f.write("benchmark")
+    with open(os.path.join(work_dir, "config", "gemini_settings.json"), "w", encoding="utf-8") as f:
+        json.dump({"enabled": True, "api_key": "benchmark"}, f, indent=4)
+
+
+def _run_pass_in_subprocess(pass_name, work_dir, args, datatracker_url=None):
+    result_file = os.path.join(work_dir, f"benchmark_{pass_name}.json")
+    command = [sys.executable, os.path.abspath(__file__), "--child-pass", pass_name, "--child-result", result_file, "--jobs", str(args.jobs), "--llm-latency", str(args.llm_latency), "--api-rate", str(args.api_rate), "--private-rate", str(args.private_rate)]
+    if args.replay:
+        command += ["--replay", os.path.abspath(args.replay)]
+    env = dict(os.environ)
+    if datatracker_url:
+        env["NOMCOM_DATATRACKER_URL"] = datatracker_url
+    with open(os.path.join(work_dir, f"benchmark_{pass_name}.log"), "w", encoding="utf-8") as log:
+        subprocess.run(command, cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT, check=True)
+    with open(result_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(args):
+    """Runs the requested passes over a fresh working directory and returns all the results."""
+    corpus_settings = {"replay": args.replay} if args.replay else {
+        "nominees": round(args.nominees * args.scale),
+        "positions": args.positions,
+        "feedback_per_nominee": round(args.feedback * args.scale),
+        "authors": round(args.authors * args.scale),
+        "seed": args.seed,
+        "latency_ms": args.latency,
+    }
+    results = {
+        "commit": _get_commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "corpus": corpus_settings,
+        "jobs": args.jobs,
+        "llm_latency": args.llm_latency,
+        "api_rate": args.api_rate,
+        "private_rate": args.private_rate,
+        "passes": {},
+    }
+    with contextlib.ExitStack() as stack:
+        datatracker_url = None
+        if not args.replay:
+            from fake_datatracker import generate_corpus, start_fake_datatracker
+            corpus = generate_corpus(num_nominees=max(1, corpus_settings["nominees"]), num_positions=args.positions, feedback_per_nominee=corpus_settings["feedback_per_nominee"], num_authors=max(10, corpus_settings["authors"]), seed=args.seed)
+            server, datatracker_url = start_fake_datatracker(corpus, latency=args.latency / 1000)
+            stack.callback(server.shutdown)
+        work_dir = args.work_dir or stack.enter_context(tempfile.TemporaryDirectory(prefix="nomcom-benchmark-"))
+        _prepare_work_dir(work_dir)
+        for pass_name in args.passes.split(","):
+            print(f"Running {pass_name} pass in {work_dir}...")
+            results["passes"][pass_name] = _run_pass_in_subprocess(pass_name, work_dir, args, datatracker_url=datatracker_url)
+    return results
+
+
+def print_results(results, baseline=None, threshold=DEFAULT_THRESHOLD):
+    """Prints one line per stage, compared to baseline if given, and returns the list of regressions."""
+    regressions = []
+    for pass_name, stages in results["passes"].items():
+        print(f"\n{pass_name} pass:")
+        print(f"{'stage':>10} {'wall (s)':>9} {'cpu (s)':>9} {'rss (MB)':>9} {'requests':>9}")
+        baseline_stages = (baseline or {}).get("passes", {}).get(pass_name, {})
+        for stage, measurements in stages.items():
+            line = f"{stage:>10} {measurements['wall_s']:>9.2f} {measurements['cpu_s']:>9.2f} {measurements['peak_rss_mb']:>9.1f} {measurements['requests']:>9}"
+            baseline_measurements = baseline_stages.get(stage)
+            if baseline_measurements and baseline_measurements["wall_s"] > 0:
+                change = measurements["wall_s"] / baseline_measurements["wall_s"] - 1
+                line += f"  {change:+.0%} vs baseline"
+                # Ignore noise on stages that take no time at all.
+                if change > threshold and measurements["wall_s"] - baseline_measurements["wall_s"] > 0.05:
+                    line += "  REGRESSION"
+                    regressions.append((pass_name, stage))
+            print(line)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Time each pipeline stage over a synthetic or replayed corpus.')
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply the size of the synthetic corpus, e.g. 10 or 100")
+    parser.add_argument("--nominees", type=int, default=50, help="Number of synthetic nominees before scaling")
+    parser.add_argument("--positions", type=int, default=11, help="Number of synthetic positions")
+    parser.add_argument("--feedback", type=int, default=20, help="Number of feedback entries per nominee before scaling")
+    parser.add_argument("--authors", type=int, default=300, help="Number of feedback authors before scaling")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpus")
+    parser.add_argument("--latency", type=float, default=0.0, help="Milliseconds of latency added by the fake datatracker")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Replay a recorded cassette instead of serving a synthetic corpus")
+    parser.add_argument("--passes", default="cold,warm", help=f"Comma-separated passes to run, among {', '.join(PASSES)}")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="Number of concurrent metadata and feedback downloads, and of parsing processes")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the stubbed LLM takes per summary")
+    parser.add_argument("--api-rate", type=float, default=0, help="Requests per second to the API, 0 (the default) for unlimited")
+    parser.add_argument("--private-rate", type=float, default=0, help="Requests per second to the feedback pages, 0 (the default) for unlimited")
+    parser.add_argument("--work-dir", help="Run in this directory instead of a temporary one, and keep it")
+    parser.add_argument("-o", "--output", help="Save the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results previously saved with --output")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Fraction of slowdown reported as a regression")
+    parser.add_argument("--child-pass", help=argparse.SUPPRESS)
+    parser.add_argument("--child-result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_pass:
+        from rate_limiter import configure_rate_limits
+        configure_rate_limits(api_rate=args.api_rate, private_rate=args.private_rate)
+        if args.replay:
+            from cassette import start_replaying
+            start_replaying(args.replay)
+        child_results = run_pass(args.child_pass, jobs=args.jobs, llm_latency=args.llm_latency)
+        with open(args.child_result, "w", encoding="utf-8") as f:
+            json.dump(child_results, f, indent=4)
+        sys.exit(0)
+
+    for pass_name in args.passes.split(","):
+        if pass_name not in PASSES:
+            parser.error(f"Unknown pass {pass_name}")
+    benchmark_results = run_benchmark(args)
+    baseline_results = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline_results = json.load(f)
+    found_regressions = print_results(benchmark_results, baseline=baseline_results, threshold=args.threshold)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(benchmark_results, f, indent=4)
+        print(f"\nSaved results to {args.output}")
+    if found_regressions:
+        sys.exit(1)
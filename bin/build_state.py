@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import threading
+from storage import open_atomically
+
+# Records, for each derived file (parsed feedback, AI summaries, pages), the
+# hashes of the inputs it was built from and the version of the code that
+# built it. A file only needs to be rebuilt when it's missing, or when its
+# inputs or code version differ from the recorded ones, so a change only
+# propagates as far as it actually changes things: feedback pages whose
+# markup changed get parsed again, but if the parsed feedback is the same,
+# summaries and pages aren't redone.
+BUILD_STATE_FILE = "data/build_state.json"
+
+BUILD_STATE_LOCK = threading.Lock()
+# Artifact path -> {"inputs": {name: hash}, "code_version": version}
+BUILD_STATE = None
+BUILD_STATE_DIRTY = False
+EXPLAIN = False
+
+
+def set_explain(explain):
+    """Prints why each artifact gets rebuilt."""
+    global EXPLAIN
+    EXPLAIN = explain
+
+
+def explain_rebuild(artifact, reason):
+    if EXPLAIN:
+        print(f"Rebuilding {artifact}: {reason}")
+
+
+def hash_input(value):
+    """Returns a short hash of a string, bytes, or anything that can be written as JSON."""
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    elif not isinstance(value, bytes):
+        value = json.dumps(value, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(value).hexdigest()[:16]
+
+
+def _load_build_state_locked():
+    global BUILD_STATE
+    if BUILD_STATE is None:
+        BUILD_STATE = {}
+        if os.path.exists(BUILD_STATE_FILE):
+            with open(BUILD_STATE_FILE, "r", encoding="utf-8") as f:
+                BUILD_STATE = json.load(f)
+    return BUILD_STATE
+
+
+def get_build_record(artifact):
+    with BUILD_STATE_LOCK:
+        return _load_build_state_locked().get(artifact)
+
+
+def get_rebuild_reason(artifact, inputs, code_version, exists=None, forced_by=None, adopt_unrecorded=False):
+    """Returns why artifact needs to be rebuilt from inputs, or None if it's up to date.
+
+    exists defaults to whether the artifact is a file on disk. forced_by names
+    the flag that forces a rebuild, if any. With adopt_unrecorded, an existing
+    artifact built before its inputs were recorded is assumed to be up to
+    date, for artifacts that are expensive to rebuild. It is then recorded as
+    built from inputs, so only changes made after that are noticed.
+    """
+    if exists is None:
+        exists = os.path.exists(artifact)
+    if not exists:
+        reason = "missing"
+    elif forced_by:
+        reason = f"forced by {forced_by}"
+    else:
+        record = get_build_record(artifact)
+        if record is None and adopt_unrecorded:
+            record_build(artifact, inputs, code_version)
+            reason = None
+        elif record is None:
+            reason = "no record of how it was built"
+        elif record["code_version"] != code_version:
+            reason = f"code version changed from {record['code_version']} to {code_version}"
+        else:
+            changed_inputs = sorted(name for name in set(inputs) | set(record["inputs"]) if inputs.get(name) != record["inputs"].get(name))
+            reason = f"{', '.join(changed_inputs)} changed" if changed_inputs else None
+    if reason:
+        explain_rebuild(artifact, reason)
+    return reason
+
+
+def record_build(artifact, inputs, code_version):
+    """Records that artifact was built from inputs. Written to disk by flush_build_state()."""
+    global BUILD_STATE_DIRTY
+    with BUILD_STATE_LOCK:
+        _load_build_state_locked()[artifact] = {"inputs": inputs, "code_version": code_version}
+        BUILD_STATE_DIRTY = True
+
+
+def flush_build_state():
+    global BUILD_STATE_DIRTY
+    with BUILD_STATE_LOCK:
+        if not BUILD_STATE_DIRTY:
+            return
+        with open_atomically(BUILD_STATE_FILE, "w") as f:
+            json.dump(BUILD_STATE, f, indent=4, sort_keys=True)
+        BUILD_STATE_DIRTY = False
+
+
+atexit.register(flush_build_state)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Show how derived files were built.')
+    parser.add_argument('artifact', nargs='?', help='Optional: The file to show the build record of, e.g. data/feedback_json/123.json')
+    args = parser.parse_args()
+
+    if args.artifact:
+        print(json.dumps(get_build_record(args.artifact), indent=4))
+    else:
+        with BUILD_STATE_LOCK:
+            build_state = _load_build_state_locked()
+        print(f"{len(build_state)} artifacts recorded in {BUILD_STATE_FILE}")
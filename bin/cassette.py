@@ -0,0 +1,111 @@
+import atexit
+import gzip
+import json
+import threading
+import time
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# A cassette is a gzipped JSON lines file holding one HTTP exchange per line.
+# Recording one while running the pipeline makes it possible to replay the
+# exact same run later without network access or a datatracker session.
+# Cookies are never recorded, but responses are, so a cassette that includes
+# view-feedback pages is as confidential as the feedback itself.
+RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After")
+
+CASSETTE_LOCK = threading.Lock()
+CASSETTE_MODE = None
+CASSETTE_FILE = None
+RECORDING_HANDLE = None
+REPLAY_LATENCY = 0.0
+# URL -> list of recorded exchanges, in the order they were recorded.
+REPLAY_EXCHANGES = {}
+# URL -> index of the next exchange to replay for that URL.
+REPLAY_POSITIONS = {}
+
+
+def start_recording(cassette_file):
+    """Records every subsequent HTTP exchange into cassette_file, replacing its contents."""
+    global CASSETTE_MODE, CASSETTE_FILE, RECORDING_HANDLE
+    RECORDING_HANDLE = gzip.open(cassette_file, "wt", encoding="utf-8")
+    atexit.register(stop_recording)
+    CASSETTE_MODE = "record"
+    CASSETTE_FILE = cassette_file
+    print(f"Recording HTTP exchanges to {cassette_file}")
+
+
+def stop_recording():
+    global CASSETTE_MODE, RECORDING_HANDLE
+    with CASSETTE_LOCK:
+        if RECORDING_HANDLE is not None:
+            RECORDING_HANDLE.close()
+            RECORDING_HANDLE = None
+            CASSETTE_MODE = None
+
+
+def _read_exchanges(cassette_file):
+    with gzip.open(cassette_file, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                yield json.loads(line)
+        except (EOFError, ValueError):
+            # The recording was interrupted, but everything before that is usable.
+            print(f"Cassette {cassette_file} is truncated")
+
+
+def start_replaying(cassette_file, latency=0.0):
+    """Serves every subsequent HTTP request from cassette_file, optionally adding latency in seconds."""
+    global CASSETTE_MODE, CASSETTE_FILE, REPLAY_LATENCY
+    REPLAY_EXCHANGES.clear()
+    REPLAY_POSITIONS.clear()
+    for exchange in _read_exchanges(cassette_file):
+        REPLAY_EXCHANGES.setdefault(exchange["url"], []).append(exchange)
+    CASSETTE_MODE = "replay"
+    CASSETTE_FILE = cassette_file
+    REPLAY_LATENCY = latency
+    print(f"Replaying HTTP exchanges from {cassette_file}")
+
+
+def is_recording():
+    return CASSETTE_MODE == "record"
+
+
+def is_replaying():
+    return CASSETTE_MODE == "replay"
+
+
+def record_response(url, response):
+    exchange = {
+        "url": url,
+        "status": response.status_code,
+        "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+        "body": response.text,
+    }
+    line = json.dumps(exchange, separators=(",", ":")) + "\n"
+    with CASSETTE_LOCK:
+        if RECORDING_HANDLE is not None:
+            RECORDING_HANDLE.write(line)
+
+
+def replay_response(url):
+    """Returns the next recorded response for url.
+
+    Once all the exchanges recorded for a URL have been replayed, the last
+    one keeps being served.
+    """
+    with CASSETTE_LOCK:
+        exchanges = REPLAY_EXCHANGES.get(url)
+        if not exchanges:
+            raise Exception(f"No recorded response for {url} in {CASSETTE_FILE}")
+        position = REPLAY_POSITIONS.get(url, 0)
+        REPLAY_POSITIONS[url] = position + 1
+        exchange = exchanges[min(position, len(exchanges) - 1)]
+    if REPLAY_LATENCY:
+        time.sleep(REPLAY_LATENCY)
+    response = requests.Response()
+    response.url = url
+    response.status_code = exchange["status"]
+    response.headers = CaseInsensitiveDict(exchange["headers"])
+    response.encoding = "utf-8"
+    response._content = exchange["body"].encode("utf-8")
+    return response
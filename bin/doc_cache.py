@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import OrderedDict
+from storage import get_data_file_size, get_stored_path, read_data_json
+from tracing import count
+
+# Parsed JSON documents shared by the parser, summarizer and formatter, so
+# that a run loads each feedback file once instead of once per position and
+# per page that uses it. Entries are dropped once the file on disk changes,
+# and the least recently used ones once the documents add up to more than
+# DOC_CACHE_MAX_BYTES of JSON. Cached documents are shared, so callers must
+# not modify them; copying them on every use would cost more than reading the
+# file again.
+DOC_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+DOC_CACHE_LOCK = threading.Lock()
+# Path -> (stamp, size, document), least recently used first.
+DOC_CACHE = OrderedDict()
+DOC_CACHE_BYTES = 0
+DOC_CACHE_STATS = {
+    "hits": 0,
+    "misses": 0,
+    "invalidations": 0,
+    "evictions": 0,
+}
+
+
+def _get_stamp(path):
+    """Returns what identifies the current contents of path, or None if there is no such file."""
+    stored_path = get_stored_path(path)
+    if stored_path is None:
+        return None
+    stat = os.stat(stored_path)
+    return (stored_path, stat.st_mtime_ns, stat.st_size)
+
+
+def _count_locked(name):
+    DOC_CACHE_STATS[name] += 1
+    count(f"doc_cache.{name}")
+
+
+def _remove_locked(path):
+    global DOC_CACHE_BYTES
+    _, size, _ = DOC_CACHE.pop(path)
+    DOC_CACHE_BYTES -= size
+
+
+def _add_locked(path, stamp, size, document):
+    global DOC_CACHE_BYTES
+    if path in DOC_CACHE:
+        _remove_locked(path)
+    DOC_CACHE[path] = (stamp, size, document)
+    DOC_CACHE_BYTES += size
+    while DOC_CACHE_BYTES > DOC_CACHE_MAX_BYTES and len(DOC_CACHE) > 1:
+        _remove_locked(next(iter(DOC_CACHE)))
+        _count_locked("evictions")
+
+
+def get_cached_json(path):
+    """Returns the document in path, reading it only if it changed since it was last read."""
+    stamp = _get_stamp(path)
+    with DOC_CACHE_LOCK:
+        entry = DOC_CACHE.get(path)
+        if entry is not None:
+            if entry[0] == stamp:
+                DOC_CACHE.move_to_end(path)
+                _count_locked("hits")
+                return entry[2]
+            _remove_locked(path)
+            _count_locked("invalidations")
+        _count_locked("misses")
+    document = read_data_json(path)
+    with DOC_CACHE_LOCK:
+        _add_locked(path, stamp, get_data_file_size(path), document)
+    return document
+
+
+def put_cached_json(path, document):
+    """Caches a document that was just written to path, so that it isn't read back.
+
+    The caller must not modify document afterwards.
+    """
+    stamp = _get_stamp(path)
+    with DOC_CACHE_LOCK:
+        _add_locked(path, stamp, get_data_file_size(path), document)
+
+
+def print_doc_cache_stats():
+    with DOC_CACHE_LOCK:
+        stats = dict(DOC_CACHE_STATS)
+    print(f"Documents: {stats['hits']} hits, {stats['misses']} misses, {stats['invalidations']} invalidated, {stats['evictions']} evicted")
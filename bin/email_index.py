@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+
+# Maps email addresses to datatracker person IDs. The index is split into
+# shards by email hash so that a lookup only needs to read one small file, and
+# each shard is an append-only journal of ["email", "person_id"] lines so that
+# adding an entry never rewrites what is already on disk. Later lines take
+# precedence over earlier ones.
+EMAIL_INDEX_DIR = "data/emails"
+LEGACY_EMAILS_FILE = "data/emails.json"
+NUM_SHARDS = 16
+# New entries are written once this many are pending, so that a killed run
+# loses at most a few lookups. run.py also flushes after each stage.
+FLUSH_BATCH_SIZE = 16
+
+EMAIL_INDEX_LOCK = threading.Lock()
+# Shard number -> {email: person_id} for shards that were read from disk.
+LOADED_SHARDS = {}
+# Entries added by this process, which take precedence over the shards.
+ADDED_ENTRIES = {}
+# Entries that haven't been written to disk yet.
+PENDING_ENTRIES = []
+LEGACY_EMAILS_FILE_IMPORTED = False
+
+
+def _get_shard(email):
+    return int(hashlib.sha1(email.encode("utf-8")).hexdigest(), 16) % NUM_SHARDS
+
+
+def _get_shard_file(shard):
+    return os.path.join(EMAIL_INDEX_DIR, f"{shard:02d}.jsonl")
+
+
+def _import_legacy_emails_file():
+    """Copies the entries of the old emails.json into the journal the first time the index is used."""
+    global LEGACY_EMAILS_FILE_IMPORTED
+    if LEGACY_EMAILS_FILE_IMPORTED:
+        return
+    LEGACY_EMAILS_FILE_IMPORTED = True
+    if os.path.exists(EMAIL_INDEX_DIR) or not os.path.exists(LEGACY_EMAILS_FILE):
+        return
+    with open(LEGACY_EMAILS_FILE, "r", encoding="utf-8") as f:
+        legacy_entries = json.load(f)
+    # Entries added by this process are newer, so they need to come last.
+    PENDING_ENTRIES[:0] = legacy_entries.items()
+    _flush_locked()
+    print(f"Imported {len(legacy_entries)} entries from {LEGACY_EMAILS_FILE} into {EMAIL_INDEX_DIR}")
+
+
+def _load_shard(shard):
+    if shard in LOADED_SHARDS:
+        return LOADED_SHARDS[shard]
+    _import_legacy_emails_file()
+    entries = {}
+    shard_file = _get_shard_file(shard)
+    if os.path.exists(shard_file):
+        with open(shard_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    email, person_id = json.loads(line)
+                except ValueError:
+                    # A torn final line from an interrupted write.
+                    continue
+                entries[email] = person_id
+    LOADED_SHARDS[shard] = entries
+    return entries
+
+
+def get_indexed_person_id(email):
+    """Returns the person ID for email, or None if it isn't known yet."""
+    with EMAIL_INDEX_LOCK:
+        if email in ADDED_ENTRIES:
+            return ADDED_ENTRIES[email]
+        return _load_shard(_get_shard(email)).get(email)
+
+
+def add_indexed_person_id(email, person_id):
+    """Adds an entry, which is written to disk with the next batch or by flush_email_index()."""
+    with EMAIL_INDEX_LOCK:
+        ADDED_ENTRIES[email] = person_id
+        # Re-resolving a known email shouldn't grow the journal.
+        if _load_shard(_get_shard(email)).get(email) != person_id:
+            PENDING_ENTRIES.append((email, person_id))
+            if len(PENDING_ENTRIES) >= FLUSH_BATCH_SIZE:
+                _flush_locked()
+
+
+def _flush_locked():
+    pending_by_shard = {}
+    for email, person_id in PENDING_ENTRIES:
+        pending_by_shard.setdefault(_get_shard(email), []).append((email, person_id))
+    os.makedirs(EMAIL_INDEX_DIR, exist_ok=True)
+    for shard, entries in pending_by_shard.items():
+        shard_file = _get_shard_file(shard)
+        needs_newline = False
+        if os.path.exists(shard_file) and os.path.getsize(shard_file) > 0:
+            with open(shard_file, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                # Don't glue the first new entry onto a torn final line.
+                needs_newline = f.read(1) != b"\n"
+        with open(shard_file, "a", encoding="utf-8") as f:
+            if needs_newline:
+                f.write("\n")
+            for email, person_id in entries:
+                f.write(json.dumps([email, person_id]) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if shard in LOADED_SHARDS:
+            LOADED_SHARDS[shard].update(entries)
+    PENDING_ENTRIES.clear()
+
+
+def flush_email_index():
+    """Appends the entries added since the last flush to the on-disk index."""
+    with EMAIL_INDEX_LOCK:
+        _import_legacy_emails_file()
+        if PENDING_ENTRIES:
+            _flush_locked()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import html
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+from positions import POSITION_SHORT_NAMES, get_nomcom_id
+
+# A stand-in for the subset of datatracker that this tool uses, serving a
+# synthetic corpus so that the whole pipeline can be exercised at any scale
+# without network access. Point the tool at it with --datatracker-url or the
+# NOMCOM_DATATRACKER_URL environment variable. The session cookie is ignored.
+
+# Roughly the size of a normal NomCom cycle, multiplied by --scale.
+DEFAULT_NOMINEES = 50
+DEFAULT_FEEDBACK_PER_NOMINEE = 20
+DEFAULT_AUTHORS = 300
+NUM_VOTING_MEMBERS = 10
+NUM_MEETINGS = 20
+NUM_GROUPS = 40
+NOMCOM_GROUP_ID = 2000
+# Tastypie's default and maximum page sizes.
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 1000
+
+FIRST_NAMES = ["Alex", "Bao", "Carmen", "Dmitri", "Emeka", "Fatima", "Gustav", "Hiroshi", "Ines", "Jun", "Kwame", "Lucia", "Mehmet", "Nadia", "Olu", "Priya", "Quentin", "Rosa", "Sven", "Tamar", "Uma", "Viktor", "Wen", "Ximena", "Yusuf", "Zofia"]
+LAST_NAMES = ["Andersen", "Banerjee", "Castillo", "Dubois", "Eriksson", "Fischer", "Garcia", "Haddad", "Ivanova", "Jensen", "Kim", "Larsen", "Moreau", "Nakamura", "Okafor", "Petrov", "Quinn", "Rossi", "Schmidt", "Tanaka", "Ueda", "Varga", "Wang", "Yilmaz", "Zhou"]
+WORDS = ["consensus", "working", "group", "draft", "review", "leadership", "technical", "experience", "area", "director", "community", "responsive", "balanced", "workload", "transport", "routing", "security", "operations", "charter", "shepherd", "IESG", "discuss", "ballot", "meeting", "mentoring", "diversity", "deep", "knowledge", "fair", "thorough", "patient", "strong", "concerned", "time", "commitment", "would", "support", "the", "a", "and", "of", "to", "with", "has", "is", "very", "not", "always"]
+NOMINEE_POSITION_STATES = ["accepted", "accepted", "accepted", "declined", "pending"]
+
+
+def _get_position_names(num_positions):
+    names = list(POSITION_SHORT_NAMES)[:num_positions]
+    for i in range(len(names), num_positions):
+        names.append(f"Synthetic Area {i + 1} (SA{i + 1}) AD")
+    return names
+
+
+def _get_text(rng, num_words):
+    text = " ".join(rng.choice(WORDS) for _ in range(num_words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _get_date(rng):
+    return f"2025-{rng.randint(8, 11):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}"
+
+
+def generate_corpus(num_nominees=DEFAULT_NOMINEES, num_positions=len(POSITION_SHORT_NAMES), feedback_per_nominee=DEFAULT_FEEDBACK_PER_NOMINEE, num_authors=DEFAULT_AUTHORS, seed=0):
+    """Returns a synthetic datatracker, as {resource: [objects]} plus the feedback behind the view-feedback pages.
+
+    The same arguments always produce the same corpus.
+    """
+    rng = random.Random(seed)
+    nomcom_id = get_nomcom_id()
+    nomcom_uri = f"/api/v1/nomcom/nomcom/{nomcom_id}/"
+    objects = {resource: [] for resource in [
+        "nomcom/nomcom", "nomcom/position", "nomcom/topic", "nomcom/nominee", "nomcom/nomineeposition",
+        "dbtemplate/dbtemplate", "person/person", "person/email", "group/group", "group/role",
+        "meeting/meeting", "meeting/session", "meeting/registration", "meeting/attended", "doc/documentauthor"]}
+
+    objects["nomcom/nomcom"].append({"id": nomcom_id, "group": f"/api/v1/group/group/{NOMCOM_GROUP_ID}/", "resource_uri": nomcom_uri})
+    objects["group/group"].append({"id": NOMCOM_GROUP_ID, "acronym": "nomcom2025", "name": "IAB/IESG Nominating Committee 2025/2026", "resource_uri": f"/api/v1/group/group/{NOMCOM_GROUP_ID}/"})
+    for group_id in range(1, NUM_GROUPS + 1):
+        objects["group/group"].append({"id": group_id, "acronym": f"wg{group_id}", "name": f"Working Group {group_id}", "resource_uri": f"/api/v1/group/group/{group_id}/"})
+    for meeting_id in range(1, NUM_MEETINGS + 1):
+        objects["meeting/meeting"].append({"id": meeting_id, "number": str(103 + meeting_id), "date": f"{2018 + meeting_id // 3}-{(meeting_id % 3) * 4 + 3:02d}-01", "type": "/api/v1/name/meetingtypename/ietf/", "resource_uri": f"/api/v1/meeting/meeting/{meeting_id}/"})
+    session_id = 0
+    for meeting_id in range(1, NUM_MEETINGS + 1):
+        for group_id in range(1, NUM_GROUPS + 1):
+            session_id += 1
+            objects["meeting/session"].append({"id": session_id, "meeting": f"/api/v1/meeting/meeting/{meeting_id}/", "group": f"/api/v1/group/group/{group_id}/", "resource_uri": f"/api/v1/meeting/session/{session_id}/"})
+
+    position_names = _get_position_names(num_positions)
+    for position_id, name in enumerate(position_names, start=1):
+        objects["nomcom/position"].append({"id": position_id, "name": name, "nomcom": nomcom_uri, "is_open": True, "accepting_nominations": True, "accepting_feedback": True, "is_iesg_position": name.endswith(" AD"), "resource_uri": f"/api/v1/nomcom/position/{position_id}/"})
+        objects["dbtemplate/dbtemplate"].append({"id": position_id, "content": f"Feedback about the {name} position.", "resource_uri": f"/api/v1/dbtemplate/dbtemplate/{position_id}/"})
+        objects["nomcom/topic"].append({"id": position_id, "subject": f"{name} position requirements", "nomcom": nomcom_uri, "audience": "/api/v1/name/topicaudiencename/general/", "description": f"/api/v1/dbtemplate/dbtemplate/{position_id}/", "resource_uri": f"/api/v1/nomcom/topic/{position_id}/"})
+
+    def add_person(person_id):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        email = f"{name.lower().replace(' ', '.')}.{person_id}@example.org"
+        objects["person/person"].append({"id": person_id, "name": name, "ascii": name, "biography": _get_text(rng, 30), "photo": None, "photo_thumb": None, "pronouns_freetext": None, "pronouns_selectable": "[]", "resource_uri": f"/api/v1/person/person/{person_id}/"})
+        objects["person/email"].append({"address": email, "person": f"/api/v1/person/person/{person_id}/", "primary": True, "active": True, "resource_uri": f"/api/v1/person/email/{email}/"})
+        return name, email
+
+    def add_meeting_history(person_id):
+        for meeting_id in rng.sample(range(1, NUM_MEETINGS + 1), rng.randint(0, NUM_MEETINGS)):
+            objects["meeting/registration"].append({"id": len(objects["meeting/registration"]) + 1, "person": f"/api/v1/person/person/{person_id}/", "meeting": f"/api/v1/meeting/meeting/{meeting_id}/", "resource_uri": f"/api/v1/meeting/registration/{len(objects['meeting/registration']) + 1}/"})
+            for group_id in rng.sample(range(1, NUM_GROUPS + 1), rng.randint(0, 5)):
+                attended_session_id = (meeting_id - 1) * NUM_GROUPS + group_id
+                objects["meeting/attended"].append({"id": len(objects["meeting/attended"]) + 1, "person": f"/api/v1/person/person/{person_id}/", "session": f"/api/v1/meeting/session/{attended_session_id}/", "resource_uri": f"/api/v1/meeting/attended/{len(objects['meeting/attended']) + 1}/"})
+
+    authors = []
+    for i in range(num_authors):
+        person_id = 100000 + i
+        authors.append(add_person(person_id))
+        if i < NUM_VOTING_MEMBERS:
+            objects["group/role"].append({"id": i + 1, "group": f"/api/v1/group/group/{NOMCOM_GROUP_ID}/", "name": "/api/v1/name/rolename/member/", "person": f"/api/v1/person/person/{person_id}/", "email": f"/api/v1/person/email/{authors[-1][1]}/", "resource_uri": f"/api/v1/group/role/{i + 1}/"})
+            add_meeting_history(person_id)
+
+    nominee_feedback = {}
+    for nominee_id in range(1, num_nominees + 1):
+        person_id = 1000 + nominee_id
+        nominee_name, nominee_email = add_person(person_id)
+        add_meeting_history(person_id)
+        for _ in range(rng.randint(0, 30)):
+            kind = rng.choice(["rfc", "draft-ietf-", "draft-"])
+            document = f"rfc{rng.randint(1000, 9999)}" if kind == "rfc" else f"{kind}{rng.choice(WORDS)}-{rng.randint(1, 999)}"
+            objects["doc/documentauthor"].append({"id": len(objects["doc/documentauthor"]) + 1, "email": f"/api/v1/person/email/{nominee_email}/", "person": f"/api/v1/person/person/{person_id}/", "document": f"/api/v1/doc/document/{document}/", "resource_uri": f"/api/v1/doc/documentauthor/{len(objects['doc/documentauthor']) + 1}/"})
+
+        nominee_position_ids = sorted(rng.sample(range(1, num_positions + 1), min(num_positions, rng.randint(1, 3))))
+        objects["nomcom/nominee"].append({"id": nominee_id, "email": f"/api/v1/person/email/{nominee_email}/", "person": f"/api/v1/person/person/{person_id}/", "nomcom": nomcom_uri, "nominee_position": [f"/api/v1/nomcom/position/{position_id}/" for position_id in nominee_position_ids], "duplicated": None, "resource_uri": f"/api/v1/nomcom/nominee/{nominee_id}/"})
+        accepted_position_names = []
+        for position_id in nominee_position_ids:
+            state = rng.choice(NOMINEE_POSITION_STATES)
+            if state == "accepted":
+                accepted_position_names.append(position_names[position_id - 1])
+            objects["nomcom/nomineeposition"].append({"id": len(objects["nomcom/nomineeposition"]) + 1, "nominee": f"/api/v1/nomcom/nominee/{nominee_id}/", "position": f"/api/v1/nomcom/position/{position_id}/", "state": f"/api/v1/name/nomineepositionstatename/{state}/", "resource_uri": f"/api/v1/nomcom/nomineeposition/{len(objects['nomcom/nomineeposition']) + 1}/"})
+
+        comments = []
+        for _ in range(feedback_per_nominee):
+            author_name, author_email = rng.choice(authors)
+            comments.append({"name": author_name, "email": author_email, "date": _get_date(rng), "nominee": nominee_name, "position": position_names[rng.choice(nominee_position_ids) - 1], "feedback": "\n\n".join(_get_text(rng, rng.randint(10, 80)) for _ in range(rng.randint(1, 4)))})
+        comments.sort(key=lambda comment: comment["date"], reverse=True)
+        questionnaires = [{"position": name, "feedback": _get_text(rng, 200)} for name in accepted_position_names]
+        nominee_feedback[nominee_id] = {"comments": comments, "questionnaires": questionnaires}
+
+    topic_feedback = {}
+    for topic in objects["nomcom/topic"]:
+        comments = []
+        for _ in range(feedback_per_nominee):
+            author_name, author_email = rng.choice(authors)
+            comments.append({"name": author_name, "email": author_email, "date": _get_date(rng), "subject": _get_text(rng, 5), "feedback": _get_text(rng, rng.randint(20, 120))})
+        comments.sort(key=lambda comment: comment["date"], reverse=True)
+        topic_feedback[topic["id"]] = {"comments": comments, "questionnaires": []}
+
+    return {"objects": objects, "nominee_feedback": nominee_feedback, "topic_feedback": topic_feedback}
+
+
+def _render_feedback_entry(entry):
+    rows = [("From", f'{html.escape(entry["name"])} &lt;<a href="mailto:{entry["email"]}">{entry["email"]}</a>&gt;')]
+    if "date" in entry:
+        rows.append(("Date", entry["date"]))
+    if "nominee" in entry:
+        rows.append(("Nominees", html.escape(entry["nominee"])))
+    if "position" in entry:
+        rows.append(("Positions", html.escape(entry["position"])))
+    if "subject" in entry:
+        rows.append(("Subject", html.escape(entry["subject"])))
+    rows.append(("Feedback", f'<pre class="pasted">{html.escape(entry["feedback"])}</pre>'))
+    return '<dl class="row">\n' + "".join(f'<dt class="col-sm-2">{title}</dt>\n<dd class="col-sm-10">{value}</dd>\n' for title, value in rows) + "</dl>\n<hr>\n"
+
+
+def render_feedback_page(feedback):
+    """Returns a view-feedback page laid out like datatracker's."""
+    comments = "".join(_render_feedback_entry(entry) for entry in feedback["comments"])
+    questionnaires = "".join(f'<dl class="row">\n<dt class="col-sm-2">Positions</dt>\n<dd class="col-sm-10">{html.escape(entry["position"])}</dd>\n<dt class="col-sm-2">Feedback</dt>\n<dd class="col-sm-10"><pre class="pasted">{html.escape(entry["feedback"])}</pre></dd>\n</dl>\n' for entry in feedback["questionnaires"])
+    return f'''<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>View feedback</title></head>
+<body>
+<ul class="nav nav-tabs" role="tablist">
+<li class="nav-item"><button class="nav-link active" data-bs-target="#comment" role="tab">Comments</button></li>
+<li class="nav-item"><button class="nav-link" data-bs-target="#questio" role="tab">Questionnaires</button></li>
+</ul>
+<div class="tab-content">
+<div class="tab-pane active" id="comment" role="tabpanel">
+{comments}</div>
+<div class="tab-pane" id="questio" role="tabpanel">
+{questionnaires}</div>
+</div>
+</body>
+</html>
+'''
+
+
+def _get_key(uri):
+    return unquote(uri.strip('/').split('/')[-1])
+
+
+def _matches(obj, name, value):
+    if name.endswith("__in"):
+        return str(obj.get(name[:-len("__in")])) in value.split(",")
+    field = obj.get(name)
+    if isinstance(field, str) and field.startswith("/api/"):
+        return _get_key(field) == value
+    return str(field) == value
+
+
+class FakeDatatrackerHandler(BaseHTTPRequestHandler):
+    # Set on subclasses by make_server().
+    corpus = None
+    indexes = None
+    latency = 0.0
+    error_rate = 0.0
+    rng = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self._send(503, b"Service Unavailable", "text/plain", extra_headers={"Retry-After": "0"})
+            return
+        parts = urlsplit(self.path)
+        match = re.fullmatch(r"/nomcom/\d+/private/view-feedback/(nominee|topic)/(\d+)/?", parts.path)
+        if match:
+            pages = self.corpus["nominee_feedback" if match.group(1) == "nominee" else "topic_feedback"]
+            feedback = pages.get(int(match.group(2)))
+            if feedback is None:
+                self._send(404, b"Not Found", "text/plain")
+            else:
+                self._send(200, render_feedback_page(feedback).encode("utf-8"), "text/html; charset=utf-8")
+            return
+        match = re.fullmatch(r"/api/v1/(\w+/\w+)/(?:([^/]+)/)?", parts.path)
+        if not match or match.group(1) not in self.indexes:
+            self._send(404, b"Not Found", "text/plain")
+            return
+        resource, key = match.group(1), match.group(2)
+        if key is not None:
+            obj = self.indexes[resource].get(unquote(key))
+            if obj is None:
+                self._send(404, b"Not Found", "text/plain")
+            else:
+                self._send_json(obj)
+            return
+        self._send_json(self._get_page(resource, parts.path, dict(parse_qsl(parts.query))))
+
+    def _get_page(self, resource, path, query):
+        limit = min(int(query.pop("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+        offset = int(query.pop("offset", 0))
+        query.pop("format", None)
+        objects = [obj for obj in self.corpus["objects"][resource] if all(_matches(obj, name, value) for name, value in query.items())]
+
+        def page_path(page_offset):
+            return f"{path}?{urlencode({**query, 'limit': limit, 'offset': page_offset}, safe='/,@')}"
+
+        return {
+            "meta": {
+                "limit": limit,
+                "next": page_path(offset + limit) if offset + limit < len(objects) else None,
+                "offset": offset,
+                "previous": page_path(max(0, offset - limit)) if offset > 0 else None,
+                "total_count": len(objects),
+            },
+            "objects": objects[offset:offset + limit],
+        }
+
+    def _send_json(self, data):
+        self._send(200, json.dumps(data).encode("utf-8"), "application/json")
+
+    def _send(self, status, body, content_type, extra_headers=None):
+        headers = dict(extra_headers or {})
+        if status == 200:
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            headers["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(corpus, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, seed=0):
+    """Returns a server for corpus, optionally adding latency in seconds and failing a fraction of requests with 503."""
+    indexes = {resource: {_get_key(obj["resource_uri"]): obj for obj in objects} for resource, objects in corpus["objects"].items()}
+    handler = type("Handler", (FakeDatatrackerHandler,), {
+        "corpus": corpus,
+        "indexes": indexes,
+        "latency": latency,
+        "error_rate": error_rate,
+        "rng": random.Random(seed),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_fake_datatracker(corpus, latency=0.0, error_rate=0.0):
+    """Serves corpus on a free local port from a background thread, and returns (server, base_url)."""
+    server = make_server(corpus, latency=latency, error_rate=error_rate)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve a synthetic datatracker for offline load testing.')
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--nominees", type=int, default=DEFAULT_NOMINEES, help="Number of nominees")
+    parser.add_argument("--positions", type=int, default=len(POSITION_SHORT_NAMES), help="Number of positions")
+    parser.add_argument("--feedback", type=int, default=DEFAULT_FEEDBACK_PER_NOMINEE, help="Number of feedback entries per nominee and per topic")
+    parser.add_argument("--authors", type=int, default=DEFAULT_AUTHORS, help="Number of distinct feedback authors")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply the number of nominees, feedback entries and authors")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the corpus generator")
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay added to every response, in milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail with 503")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(
+        num_nominees=max(1, round(args.nominees * args.scale)),
+        num_positions=args.positions,
+        feedback_per_nominee=round(args.feedback * args.scale),
+        num_authors=max(NUM_VOTING_MEMBERS, round(args.authors * args.scale)),
+        seed=args.seed)
+    server = make_server(corpus, host=args.host, port=args.port, latency=args.latency / 1000, error_rate=args.error_rate, seed=args.seed)
+    counts = ", ".join(f"{len(objects)} {resource}" for resource, objects in corpus["objects"].items())
+    print(f"Serving {counts}")
+    print(f"Run the tool with NOMCOM_DATATRACKER_URL=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
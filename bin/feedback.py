@@ -1,18 +1,41 @@
 #!/usr/bin/env python3
 import argparse
-import requests
+import hashlib
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import lxml.html
+from cassette import is_replaying
+from http_client import http_get
+from build_state import explain_rebuild
 from nominees import get_active_nominees
 from positions import get_topic_id_from_position_name, get_positions
+from storage import data_file_exists, get_data_file_size, open_atomically, read_data_file, write_data_file
+from tracing import count, span
 
 SESSION_ID = None
-FEEDBACK_NOMINEE_ID_DOWNLOADED = []
-FEEDBACK_TOPIC_DOWNLOADED = []
+FEEDBACK_DIR = "data/feedback_html"
+# Records when and what was downloaded for each page, so that a forced refresh
+# that gets interrupted can resume without downloading everything again.
+MANIFEST_FILE = "data/feedback_html/manifest.json"
+# An interrupted refresh is only resumed if it started this recently.
+RESUME_WINDOW = 6 * 60 * 60
+MANIFEST = None
+# Whether downloads were added to the manifest since it was last written.
+# Downloads only update it in memory, and it's written once they are done.
+MANIFEST_DIRTY = False
+MANIFEST_LOCK = threading.Lock()
+# Pages downloaded since this time don't need to be downloaded again when forced.
+PROCESS_STARTED_AT = time.time()
 
 def get_session_id():
     global SESSION_ID
+    if not SESSION_ID and is_replaying():
+        # Replayed responses don't need a real session.
+        SESSION_ID = "replay"
     if not SESSION_ID:
         session_id_file = Path("config/session_id.txt")
         os.makedirs(os.path.dirname(session_id_file), exist_ok=True)
@@ -35,56 +58,188 @@ def get_session_id():
             session_id_file.write_text(SESSION_ID)
     return SESSION_ID
 
+def _load_manifest_locked():
+    global MANIFEST
+    if MANIFEST is None:
+        MANIFEST = {"pages": {}}
+        if os.path.exists(MANIFEST_FILE):
+            with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+                MANIFEST = json.load(f)
+    return MANIFEST
+
+
+def _save_manifest_locked():
+    global MANIFEST_DIRTY
+    with open_atomically(MANIFEST_FILE, "w") as f:
+        json.dump(MANIFEST, f, indent=4)
+    MANIFEST_DIRTY = False
+
+
+def flush_feedback_manifest():
+    """Writes the pages downloaded since the last flush to the manifest."""
+    with MANIFEST_LOCK:
+        if MANIFEST_DIRTY:
+            _save_manifest_locked()
+
+
+def get_manifest_entry(file_name):
+    """Returns {id, fetched_at, size, sha256, fingerprint} for a downloaded page, or None."""
+    with MANIFEST_LOCK:
+        return _load_manifest_locked()["pages"].get(file_name)
+
+
+def _begin_refresh():
+    """Returns the time since which pages count as refreshed, resuming an interrupted refresh if there is one."""
+    with MANIFEST_LOCK:
+        manifest = _load_manifest_locked()
+        started_at = manifest.get("refresh_started_at")
+        if started_at and not manifest.get("refresh_completed_at") and time.time() - started_at < RESUME_WINDOW:
+            print(f"Resuming the feedback refresh started at {time.ctime(started_at)}")
+            return min(started_at, PROCESS_STARTED_AT)
+        manifest["refresh_started_at"] = PROCESS_STARTED_AT
+        manifest["refresh_completed_at"] = None
+        _save_manifest_locked()
+        return PROCESS_STARTED_AT
+
+
+def _end_refresh():
+    with MANIFEST_LOCK:
+        _load_manifest_locked()["refresh_completed_at"] = time.time()
+        _save_manifest_locked()
+
+
+def _get_download_reason(file_name, force_feedback, refreshed_since):
+    """Returns why a page needs to be downloaded, or None if the saved copy will do."""
+    output_file = os.path.join(FEEDBACK_DIR, file_name)
+    entry = get_manifest_entry(file_name)
+    if not data_file_exists(output_file):
+        reason = "missing"
+    elif entry and entry["size"] != get_data_file_size(output_file):
+        # The file was modified or damaged since it was downloaded.
+        reason = "size differs from the download"
+    elif force_feedback and (entry is None or entry["fetched_at"] < refreshed_since):
+        reason = "refreshing with -f"
+    else:
+        return None
+    explain_rebuild(output_file, reason)
+    return reason
+
+
+def get_feedback_fingerprint(content):
+    """Returns a hash of the feedback panes of a view-feedback page.
+
+    Only the whitespace-normalized text of the comment and questionnaire panes
+    is hashed, so that CSRF tokens, timestamps and the like elsewhere on the
+    page don't make it look like the feedback changed.
+    """
+    document = lxml.html.fromstring(content)
+    panes = document.xpath('//div[@role="tabpanel"][@id="comment" or @id="questio"]')
+    normalized = "\n".join(f"{pane.get('id')}: " + " ".join(pane.text_content().split()) for pane in panes)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def get_page_fingerprint(file_name):
+    """Returns the fingerprint of the feedback in a downloaded page, or None if there is no such page."""
+    entry = get_manifest_entry(file_name)
+    if entry and entry.get("fingerprint"):
+        return entry["fingerprint"]
+    path = os.path.join(FEEDBACK_DIR, file_name)
+    if not data_file_exists(path):
+        return None
+    return get_feedback_fingerprint(read_data_file(path))
+
+
+def _download_feedback_page(url, file_name, page_id):
+    """Downloads a page and records it in the manifest, along with the fingerprint of its feedback."""
+    global MANIFEST_DIRTY
+    session_id = get_session_id()
+    response = http_get(url, cookies={"sessionid": session_id})
+    response.raise_for_status()
+    content = response.content
+    fingerprint = get_feedback_fingerprint(content)
+    write_data_file(os.path.join(FEEDBACK_DIR, file_name), content)
+    with MANIFEST_LOCK:
+        _load_manifest_locked()["pages"][file_name] = {
+            "id": page_id,
+            "fetched_at": time.time(),
+            "size": len(content),
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "fingerprint": fingerprint,
+        }
+        MANIFEST_DIRTY = True
+    count("cache.downloaded", directory=FEEDBACK_DIR)
+
+
 def save_html_feedback_for_nominee(nominee_id, force_feedback=False):
     """Downloads and saves the HTML feedback for a single nominee."""
-    global FEEDBACK_NOMINEE_ID_DOWNLOADED
-    session_id = get_session_id()
-    output_file = f"data/feedback_html/{nominee_id}.html"
-    if os.path.exists(output_file) and ((not force_feedback) or (nominee_id in FEEDBACK_NOMINEE_ID_DOWNLOADED)):
+    _save_html_feedback_for_nominee(nominee_id, force_feedback=force_feedback)
+    flush_feedback_manifest()
+
+
+def _save_html_feedback_for_nominee(nominee_id, force_feedback=False, refreshed_since=None):
+    """Downloads the page unless it's saved. With force_feedback, it is downloaded
+    again unless that already happened since refreshed_since, which defaults to
+    the start of this process.
+    """
+    file_name = f"{nominee_id}.html"
+    if not _get_download_reason(file_name, force_feedback, refreshed_since or PROCESS_STARTED_AT):
+        count("cache.fresh", directory=FEEDBACK_DIR)
         return
 
     url = f"https://datatracker.ietf.org/nomcom/2025/private/view-feedback/nominee/{nominee_id}"
     print(f"Downloading HTML feedback for nominee {nominee_id} from {url}")
-    response = requests.get(url, cookies={"sessionid": session_id})
-    response.raise_for_status()
-
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(response.text)
-    print(f"Saved HTML feedback for nominee {nominee_id} to {output_file}")
-    FEEDBACK_NOMINEE_ID_DOWNLOADED.append(nominee_id)
+    with span("feedback_download", nominee_id=nominee_id):
+        _download_feedback_page(url, file_name, nominee_id)
+    print(f"Saved HTML feedback for nominee {nominee_id} to {os.path.join(FEEDBACK_DIR, file_name)}")
 
 
 def save_html_feedback_for_position(position_name, force_feedback=False):
     """Downloads and saves the HTML feedback for a single position."""
-    global FEEDBACK_TOPIC_DOWNLOADED
-    session_id = get_session_id()
+    _save_html_feedback_for_position(position_name, force_feedback=force_feedback)
+    flush_feedback_manifest()
+
+
+def _save_html_feedback_for_position(position_name, force_feedback=False, refreshed_since=None):
     topic_id = get_topic_id_from_position_name(position_name)
     if not topic_id:
         print(f"Could not find topic ID for position {position_name}")
         return
-    output_file = f"data/feedback_html/topic_{topic_id}.html"
-    if os.path.exists(output_file) and ((not force_feedback) or (topic_id in FEEDBACK_TOPIC_DOWNLOADED)):
+    file_name = f"topic_{topic_id}.html"
+    if not _get_download_reason(file_name, force_feedback, refreshed_since or PROCESS_STARTED_AT):
+        count("cache.fresh", directory=FEEDBACK_DIR)
         return
 
     url = f"https://datatracker.ietf.org/nomcom/2025/private/view-feedback/topic/{topic_id}"
     print(f"Downloading HTML feedback for position {position_name} from {url}")
-    response = requests.get(url, cookies={"sessionid": session_id})
-    response.raise_for_status()
+    with span("feedback_download", topic_id=topic_id):
+        _download_feedback_page(url, file_name, topic_id)
+    print(f"Saved HTML feedback for position {position_name} to {os.path.join(FEEDBACK_DIR, file_name)}")
 
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(response.text)
-    print(f"Saved HTML feedback for position {position_name} to {output_file}")
-    FEEDBACK_TOPIC_DOWNLOADED.append(topic_id)
 
+def save_all_html_feedback(force_metadata=False, force_feedback=False, jobs=1):
+    """Saves HTML feedback for all nominees and positions, using up to `jobs` concurrent downloads.
 
-def save_all_html_feedback(force_metadata=False, force_feedback=False):
-    """Saves HTML feedback for all nominees."""
-    for nominee in get_active_nominees(force_metadata=force_metadata):
-        save_html_feedback_for_nominee(nominee["id"], force_feedback=force_feedback)
-    for position in get_positions(force_metadata=force_metadata):
-        save_html_feedback_for_position(position["name"], force_feedback=force_feedback)
+    A forced refresh that gets interrupted picks up where it stopped the next
+    time it runs. The manifest is written once all downloads are done.
+    """
+    # Ask for the session ID before any worker needs it.
+    get_session_id()
+    refreshed_since = _begin_refresh() if force_feedback else PROCESS_STARTED_AT
+    tasks = [lambda nominee_id=nominee["id"]: _save_html_feedback_for_nominee(nominee_id, force_feedback=force_feedback, refreshed_since=refreshed_since) for nominee in get_active_nominees(force_metadata=force_metadata)]
+    tasks += [lambda position_name=position["name"]: _save_html_feedback_for_position(position_name, force_feedback=force_feedback, refreshed_since=refreshed_since) for position in get_positions(force_metadata=force_metadata)]
+    try:
+        if jobs <= 1:
+            for task in tasks:
+                task()
+        else:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                for future in [executor.submit(task) for task in tasks]:
+                    future.result()
+    finally:
+        # Keep track of what was downloaded, even if a download failed.
+        flush_feedback_manifest()
+    if force_feedback:
+        _end_refresh()
 
 
 if __name__ == "__main__":
@@ -93,6 +248,7 @@ if __name__ == "__main__":
     parser.add_argument("-f", "--force-feedback", action="store_true", help="Force download of feedback even if file exists")
     parser.add_argument("identifier", nargs="?", help="Optional: The nominee ID or position name to get feedback for.")
     parser.add_argument("-a", "--force-all", action="store_true", help="Get latest feedback and redo subsequent operations")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="Number of concurrent feedback downloads")
     args = parser.parse_args()
 
     if args.force_all:
@@ -106,4 +262,4 @@ if __name__ == "__main__":
             position_name = args.identifier
             save_html_feedback_for_position(position_name, force_feedback=args.force_feedback)
     else:
-        save_all_html_feedback(force_metadata=args.force_metadata, force_feedback=args.force_feedback)
+        save_all_html_feedback(force_metadata=args.force_metadata, force_feedback=args.force_feedback, jobs=args.jobs)
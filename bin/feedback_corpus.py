@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import mmap
+import os
+import threading
+from collections import Counter
+from storage import COMPRESSED_SUFFIX, FEEDBACK_DIRS, open_atomically, read_data_json
+
+# All parsed feedback in one append-only file, with one row per feedback
+# entry, so that questions across nominees don't need to load hundreds of
+# JSON files. Each line is a JSON array whose first element is its kind:
+#   ["a", author_id, name, email]            interns an author
+#   ["p", position_id, short_name]           interns a position
+#   ["n", nominee_id, name, email]           names a nominee, later rows win
+#   ["e", nominee_id, topic_id, position_id, author_id, date, fingerprint, subject, feedback]
+#   ["q", nominee_id, position_id, text]     a questionnaire, later rows win, null once removed
+# Entries have either a nominee_id or a topic_id, and topic entries have no
+# position since several positions can share a topic. Tables are always
+# written before the entries that refer to them, so the file can be read in
+# one pass. It is stored uncompressed so that it can be appended to and
+# memory-mapped.
+CORPUS_FILE = "data/feedback_corpus.jsonl"
+
+CORPUS_LOCK = threading.Lock()
+# What the file holds, loaded on first use: {"authors": {(name, email): id},
+# "positions": {short_name: id}, "nominees": {nominee_id: [name, email]},
+# "questionnaires": {(nominee_id, position_id): text},
+# "sources": {("nominee" or "topic", id): Counter of (position_id, fingerprint)}}
+CORPUS_STATE = None
+
+
+def iter_corpus_lines(corpus_file=None, start=0):
+    """Yields (offset, line) for each complete line of the corpus from start, reading it through a memory map."""
+    corpus_file = corpus_file or CORPUS_FILE
+    if not os.path.exists(corpus_file) or os.path.getsize(corpus_file) <= start:
+        return
+    with open(corpus_file, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            mapped.seek(start)
+            offset = start
+            for line in iter(mapped.readline, b""):
+                if not line.endswith(b"\n"):
+                    # A torn final line from an interrupted write.
+                    return
+                yield offset, line
+                offset += len(line)
+
+
+def iter_corpus_rows(corpus_file=None):
+    """Yields the rows of the corpus as lists."""
+    for _, line in iter_corpus_lines(corpus_file):
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Overwritten by a later line after an interrupted write.
+            continue
+
+
+def read_corpus_row(offset, corpus_file=None):
+    """Returns the row at offset, as given by iter_corpus_lines()."""
+    with open(corpus_file or CORPUS_FILE, "rb") as f:
+        f.seek(offset)
+        return json.loads(f.readline())
+
+
+def iter_corpus_entries(corpus_file=None):
+    """Yields each feedback entry as a dict, with its author, position and nominee resolved."""
+    authors = {}
+    positions = {}
+    nominees = {}
+    for row in iter_corpus_rows(corpus_file):
+        kind = row[0]
+        if kind == "a":
+            authors[row[1]] = (row[2], row[3])
+        elif kind == "p":
+            positions[row[1]] = row[2]
+        elif kind == "n":
+            nominees[row[1]] = row[2]
+        elif kind == "e":
+            _, nominee_id, topic_id, position_id, author_id, date, fingerprint, subject, feedback = row
+            name, email = authors[author_id]
+            yield {
+                "nominee_id": nominee_id,
+                "nominee": nominees.get(nominee_id),
+                "topic_id": topic_id,
+                "position": positions.get(position_id),
+                "name": name,
+                "email": email,
+                "date": date,
+                "subject": subject,
+                "feedback": feedback,
+                "fingerprint": fingerprint,
+            }
+
+
+def _get_source(row):
+    return ("nominee", row[1]) if row[1] is not None else ("topic", row[2])
+
+
+def _load_corpus_state_locked():
+    global CORPUS_STATE
+    if CORPUS_STATE is None:
+        CORPUS_STATE = {"authors": {}, "positions": {}, "nominees": {}, "questionnaires": {}, "sources": {}}
+        for row in iter_corpus_rows():
+            kind = row[0]
+            if kind == "a":
+                CORPUS_STATE["authors"][(row[2], row[3])] = row[1]
+            elif kind == "p":
+                CORPUS_STATE["positions"][row[2]] = row[1]
+            elif kind == "n":
+                CORPUS_STATE["nominees"][row[1]] = [row[2], row[3]]
+            elif kind == "q":
+                CORPUS_STATE["questionnaires"][(row[1], row[2])] = row[3]
+            elif kind == "e":
+                CORPUS_STATE["sources"].setdefault(_get_source(row), Counter())[(row[3], row[6])] += 1
+    return CORPUS_STATE
+
+
+def _intern(table, key, kind, rows):
+    if key not in table:
+        table[key] = len(table)
+        rows.append([kind, table[key], *key] if isinstance(key, tuple) else [kind, table[key], key])
+    return table[key]
+
+
+def _append_rows_locked(rows):
+    if not rows:
+        return
+    os.makedirs(os.path.dirname(CORPUS_FILE), exist_ok=True)
+    with open(CORPUS_FILE, "ab+") as f:
+        content = "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                # Don't let a torn line from an interrupted write swallow the next row.
+                content = b"\n" + content
+        f.write(content)
+
+
+def _remove_source_locked(source):
+    """Rewrites the corpus without the entries of source."""
+    with open_atomically(CORPUS_FILE, "w") as f:
+        for row in iter_corpus_rows():
+            if row[0] != "e" or _get_source(row) != source:
+                f.write(json.dumps(row) + "\n")
+    del CORPUS_STATE["sources"][source]
+
+
+def _update_source(source, nominee_id, topic_id, entries_by_position, nominee=None, questionnaires=None):
+    """Makes the corpus hold exactly the given entries for source, appending when it can."""
+    with CORPUS_LOCK:
+        state = _load_corpus_state_locked()
+        rows = []
+        # The same entry is listed under each of the positions it's about.
+        keyed_entries = []
+        for position, entries in entries_by_position.items():
+            position_id = _intern(state["positions"], position, "p", rows) if position else None
+            keyed_entries += [((position_id, data["fingerprint"]), data) for data in entries]
+        fingerprints = Counter(key for key, _ in keyed_entries)
+        remaining = Counter(state["sources"].get(source, Counter()))
+        if remaining - fingerprints:
+            # Entries were removed or edited, which can't be appended.
+            _remove_source_locked(source)
+            remaining = Counter()
+        if nominee and state["nominees"].get(nominee_id) != nominee:
+            state["nominees"][nominee_id] = nominee
+            rows.append(["n", nominee_id, *nominee])
+        for key, data in keyed_entries:
+            # Only append what isn't there yet, in page order.
+            if remaining[key] > 0:
+                remaining[key] -= 1
+                continue
+            author_id = _intern(state["authors"], (data.get("name", ""), data.get("email", "")), "a", rows)
+            rows.append(["e", nominee_id, topic_id, key[0], author_id, data.get("date", ""), data["fingerprint"], data.get("subject"), data.get("feedback", "")])
+        if questionnaires is not None:
+            texts = {_intern(state["positions"], position, "p", rows): text for position, text in questionnaires.items()}
+            previous_position_ids = [position_id for (questionnaire_nominee_id, position_id), text in state["questionnaires"].items() if questionnaire_nominee_id == nominee_id and text is not None]
+            for position_id in set(texts) | set(previous_position_ids):
+                text = texts.get(position_id)
+                if state["questionnaires"].get((nominee_id, position_id)) != text:
+                    state["questionnaires"][(nominee_id, position_id)] = text
+                    rows.append(["q", nominee_id, position_id, text])
+        _append_rows_locked(rows)
+        state["sources"][source] = fingerprints
+
+
+def update_nominee_corpus(nominee_id, result):
+    """Records the parsed feedback and questionnaires of a nominee in the corpus."""
+    nominee_info = result.get("nominee_info", {})
+    nominee = [nominee_info.get("name"), nominee_info.get("email")]
+    _update_source(("nominee", nominee_id), nominee_id, None, result.get("feedback", {}), nominee=nominee, questionnaires=result.get("questionnaires", {}))
+
+
+def update_topic_corpus(topic_id, result):
+    """Records the parsed feedback of a topic in the corpus."""
+    _update_source(("topic", topic_id), None, topic_id, {None: result.get("feedback", [])})
+
+
+def is_in_corpus(kind, object_id):
+    """Returns whether the corpus has the feedback of a "nominee" or "topic"."""
+    with CORPUS_LOCK:
+        return (kind, object_id) in _load_corpus_state_locked()["sources"]
+
+
+def rebuild_corpus():
+    """Writes the corpus again from all the parsed feedback files."""
+    global CORPUS_STATE
+    with CORPUS_LOCK:
+        if os.path.exists(CORPUS_FILE):
+            os.remove(CORPUS_FILE)
+        CORPUS_STATE = None
+    feedback_dir = "data/feedback_json"
+    extension = FEEDBACK_DIRS[feedback_dir]
+    file_names = {file_name[:-len(COMPRESSED_SUFFIX)] if file_name.endswith(COMPRESSED_SUFFIX) else file_name for file_name in os.listdir(feedback_dir)}
+    for file_name in sorted(file_names):
+        if not file_name.endswith(extension):
+            continue
+        object_id = file_name[:-len(extension)]
+        result = read_data_json(os.path.join(feedback_dir, file_name))
+        if object_id.startswith("topic_"):
+            update_topic_corpus(int(object_id[len("topic_"):]), result)
+        else:
+            update_nominee_corpus(int(object_id), result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Show statistics about all the parsed feedback.')
+    parser.add_argument("--rebuild", action="store_true", help=f"Rewrite {CORPUS_FILE} from the parsed feedback files")
+    parser.add_argument("--top-authors", type=int, default=10, help="Number of most prolific feedback authors to show")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild_corpus()
+    num_entries = 0
+    entries_by_author = Counter()
+    nominees_by_author = {}
+    for entry in iter_corpus_entries():
+        num_entries += 1
+        entries_by_author[(entry["name"], entry["email"])] += 1
+        if entry["nominee_id"] is not None:
+            nominees_by_author.setdefault((entry["name"], entry["email"]), set()).add(entry["nominee_id"])
+    print(f"{num_entries} feedback entries from {len(entries_by_author)} authors in {CORPUS_FILE}")
+    for (name, email), num_author_entries in entries_by_author.most_common(args.top_authors):
+        print(f"{num_author_entries:>5} entries about {len(nominees_by_author.get((name, email), ())):>3} nominees from {name} <{email}>")
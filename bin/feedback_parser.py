@@ -1,16 +1,159 @@
 #!/usr/bin/env python3
-import json
 import argparse
-from bs4 import BeautifulSoup
+import hashlib
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from bs4 import BeautifulSoup, NavigableString
+import lxml.html
+from lxml import etree
 import re
-import os
 import sys
 from nominees import get_active_nominees, get_nominee_info
-from positions import get_position_short_name, get_positions, get_topic_id_from_position_name
-from feedback import save_html_feedback_for_nominee, save_html_feedback_for_position
+from positions import POSITION_SHORT_NAMES, get_position_short_name, get_positions, get_topic_id_from_position_name
+from build_state import get_build_record, get_rebuild_reason, hash_input, record_build, set_explain
+from doc_cache import get_cached_json, put_cached_json
+from email_index import flush_email_index
+from feedback_corpus import is_in_corpus, update_nominee_corpus, update_topic_corpus
+from feedback import get_page_fingerprint, save_html_feedback_for_nominee, save_html_feedback_for_position
+from storage import data_file_exists, read_data_json, read_data_text, write_data_json
+from tracing import count, span
 
 PARSED_TOPIC_IDS = []
 PARSED_NOMINEE_IDS = []
+# Bump when a change to the extraction changes its results, so that all
+# feedback gets parsed again.
+PARSER_VERSION = 1
+
+# The lxml backend only looks at the comment and questionnaire panes, with
+# compiled XPath, instead of building a BeautifulSoup tree of the whole page.
+# Both backends return the same results; BeautifulSoup is kept as a fallback
+# in case datatracker's markup changes in ways the XPath doesn't handle.
+PARSER_BACKENDS = ["lxml", "bs4"]
+PARSER_BACKEND = "lxml"
+COMMENT_PANE_XPATH = etree.XPath('//div[@id="comment"][@role="tabpanel"][@class="tab-pane active"]')
+QUESTIONNAIRE_PANE_XPATH = etree.XPath('//div[@id="questio"][@role="tabpanel"]')
+ENTRIES_XPATH = etree.XPath('.//dl[contains(concat(" ", normalize-space(@class), " "), " row ")]')
+FIELDS_XPATH = etree.XPath('.//dt')
+FIELD_VALUE_XPATH = etree.XPath('following-sibling::dd[1]')
+LINK_XPATH = etree.XPath('.//a')
+PRE_XPATH = etree.XPath('.//pre')
+
+def set_parser_backend(backend):
+    global PARSER_BACKEND
+    PARSER_BACKEND = backend
+
+def _iter_fields_lxml(entry):
+    """Yields the (dt text, dd element) pairs of a feedback entry."""
+    for dt in FIELDS_XPATH(entry):
+        dds = FIELD_VALUE_XPATH(dt)
+        if dds:
+            yield dt.text_content().strip(), dds[0]
+
+def _parse_feedback_entry_lxml(entry):
+    """Parses a single feedback entry like _parse_feedback_entry, from an lxml element."""
+    data = {}
+    for dt_text, dd in _iter_fields_lxml(entry):
+        dd_text = dd.text_content().strip()
+        if "From" in dt_text:
+            if dd.text is not None:
+                data['name'] = dd.text.strip().replace('<', '').strip()
+            email_tags = LINK_XPATH(dd)
+            if email_tags and "mailto:" in email_tags[0].get("href", ""):
+                data["email"] = email_tags[0].text_content().strip()
+        elif "Date" in dt_text:
+            data["date"] = dd_text
+        elif "Nominees" in dt_text:
+            data["nominee"] = dd_text
+        elif "Positions" in dt_text:
+            data["position"] = get_position_short_name(dd_text)
+        elif "Feedback" in dt_text:
+            pre_tags = PRE_XPATH(dd)
+            if pre_tags:
+                data["feedback"] = pre_tags[0].text_content().strip()
+        elif "Subject" in dt_text:
+            data["subject"] = dd_text
+    return data
+
+def _get_comment_entries_lxml(document):
+    comment_panes = COMMENT_PANE_XPATH(document)
+    return ENTRIES_XPATH(comment_panes[0]) if comment_panes else []
+
+def _get_comments_hash(entries):
+    """Returns a hash of the text of lxml comment entries, to notice edits without parsing the entries."""
+    text = "\x1e".join(" ".join(entry.text_content().split()) for entry in entries)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+def get_comments_hash(html_content):
+    """Returns the hash of all the comment entries of a page, which parsed results keep as "comments_hash"."""
+    return _get_comments_hash(_get_comment_entries_lxml(lxml.html.document_fromstring(html_content)))
+
+def _extract_feedback_lxml(html_content, with_questionnaires):
+    document = lxml.html.document_fromstring(html_content)
+    comments = []
+    entries = _get_comment_entries_lxml(document)
+    for entry in entries:
+        data = _parse_feedback_entry_lxml(entry)
+        if data:
+            comments.append(data)
+    questionnaires = _extract_questionnaires_lxml(document) if with_questionnaires else []
+    return comments, questionnaires, _get_comments_hash(entries)
+
+def _extract_questionnaires_lxml(document):
+    questionnaires = []
+    questionnaire_panes = QUESTIONNAIRE_PANE_XPATH(document)
+    if questionnaire_panes:
+        for entry in ENTRIES_XPATH(questionnaire_panes[0]):
+            position = None
+            questionnaire = None
+            for dt_text, dd in _iter_fields_lxml(entry):
+                if "Positions" in dt_text:
+                    position = get_position_short_name(dd.text_content().strip())
+                elif "Feedback" in dt_text:
+                    pre_tags = PRE_XPATH(dd)
+                    if pre_tags:
+                        questionnaire = pre_tags[0].text_content().strip()
+            if position and questionnaire:
+                questionnaires.append((position, questionnaire))
+    return questionnaires
+
+def _extract_new_comments_lxml(html_content, previous_comments, previous_hash, with_questionnaires):
+    """Parses only the comments added to a page since previous_comments were extracted from it.
+
+    Pages only grow, so the new comments are either all before or all after
+    the previous ones. Entries are parsed from each end of the pane until a
+    known one is reached, and the rest are assumed to be the previous ones if
+    there are as many of them and the hash of their text is previous_hash,
+    which catches entries edited in place without parsing them. Returns (new
+    comments, whether they come first, questionnaires, hash of all the
+    comments), or None if the page doesn't look like it just grew.
+    """
+    if previous_hash is None:
+        return None
+    document = lxml.html.document_fromstring(html_content)
+    entries = _get_comment_entries_lxml(document)
+    known_fingerprints = {data["fingerprint"] for data in previous_comments}
+
+    for ordered_entries, new_first in ((entries, True), (entries[::-1], False)):
+        new_comments = []
+        for entry in ordered_entries:
+            data = _parse_feedback_entry_lxml(entry)
+            if data:
+                data["fingerprint"] = get_entry_fingerprint(data)
+                if data["fingerprint"] in known_fingerprints:
+                    break
+            new_comments.append(data)
+        if len(new_comments) + len(previous_comments) != len(entries):
+            continue
+        previous_entries = entries[len(new_comments):] if new_first else entries[:len(entries) - len(new_comments)]
+        if _get_comments_hash(previous_entries) != previous_hash:
+            continue
+        new_comments = [data for data in new_comments if data]
+        if not new_first:
+            new_comments.reverse()
+        questionnaires = _extract_questionnaires_lxml(document) if with_questionnaires else []
+        return new_comments, new_first, questionnaires, _get_comments_hash(entries)
+    return None
 
 def _parse_feedback_entry(entry):
     """Parses a single feedback entry and returns a dictionary."""
@@ -22,7 +165,8 @@ def _parse_feedback_entry(entry):
         if dd:
             dd_text = dd.text.strip()
             if "From" in dt_text:
-                if len(dd.contents) > 0:
+                # A page where the name is missing would start with the link.
+                if len(dd.contents) > 0 and isinstance(dd.contents[0], NavigableString):
                     name = dd.contents[0].strip().replace('<', '').strip()
                     data['name'] = name
                 email_tag = dd.find("a")
@@ -42,31 +186,14 @@ def _parse_feedback_entry(entry):
                 data["subject"] = dd_text
     return data
 
-def parse_feedback_for_position(position_name, force_metadata=False, force_feedback=False, force_parse=False):
-    global PARSED_TOPIC_IDS
-    save_html_feedback_for_position(position_name, force_feedback=force_feedback)
-    topic_id = get_topic_id_from_position_name(position_name, force_metadata=force_metadata)
-    if topic_id is None:
-        print(f"Unknown position_name {position_name}")
-        return {}
-    input_file = f"data/feedback_html/topic_{topic_id}.html"
-    output_file = f"data/feedback_json/topic_{topic_id}.json"
-    if os.path.exists(output_file) and ((not force_parse) or (topic_id in PARSED_TOPIC_IDS)):
-        with open(output_file, "r", encoding="utf-8") as json_file:
-            result = json.load(json_file)
-        return result
-
-    # Read the HTML file
-    with open(input_file, "r", encoding="utf-8") as f:
-        html_content = f.read()
-
+def _extract_feedback_bs4(html_content, with_questionnaires):
     # Parse the HTML content
     soup = BeautifulSoup(html_content, "lxml")
 
     # Find the active tab pane which contains the feedback comments
     comment_tab_pane = soup.find("div", {"id": "comment", "role": "tabpanel", "class": "tab-pane active"})
 
-    feedback_data = []
+    comments = []
 
     if comment_tab_pane:
         # Find all feedback entries within the comment tab pane
@@ -75,57 +202,14 @@ def parse_feedback_for_position(position_name, force_metadata=False, force_feedb
         for entry in feedback_entries:
             data = _parse_feedback_entry(entry)
             if data:
-                feedback_data.append(data)
+                comments.append(data)
 
-    result = {}
-    result["feedback"] = feedback_data
-
-    # Write the extracted data to a JSON file
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    with open(output_file, "w", encoding="utf-8") as json_file:
-        json.dump(result, json_file, indent=4)
-    print(f"Successfully extracted feedback from {input_file} and saved to {output_file}")
-    PARSED_TOPIC_IDS.append(topic_id)
-
-    return result
-
-def parse_feedback_for_nominee(nominee_id, force_metadata=False, force_feedback=False, force_parse=False):
-    global PARSED_NOMINEE_IDS
-    save_html_feedback_for_nominee(nominee_id, force_feedback=force_feedback)
-    input_file = f"data/feedback_html/{nominee_id}.html"
-    output_file = f"data/feedback_json/{nominee_id}.json"
-    if os.path.exists(output_file) and ((not force_parse) or (nominee_id in PARSED_NOMINEE_IDS)):
-        with open(output_file, "r", encoding="utf-8") as json_file:
-            result = json.load(json_file)
-        return result
-
-    # Read the HTML file
-    with open(input_file, "r", encoding="utf-8") as f:
-        html_content = f.read()
-
-    # Parse the HTML content
-    soup = BeautifulSoup(html_content, "lxml")
-
-    # Find the active tab pane which contains the feedback comments
-    comment_tab_pane = soup.find("div", {"id": "comment", "role": "tabpanel", "class": "tab-pane active"})
-
-    feedback_data = {}
-
-    if comment_tab_pane:
-        # Find all feedback entries within the comment tab pane
-        feedback_entries = comment_tab_pane.find_all("dl", class_="row")
-
-        for entry in feedback_entries:
-            data = _parse_feedback_entry(entry)
-            if data:
-                position = data.pop("position", None)
-                if position not in feedback_data:
-                    feedback_data[position] = []
-                feedback_data[position].append(data)
+    questionnaires = []
+    if not with_questionnaires:
+        return comments, questionnaires
 
     # Find the questionnaire tab pane
     questionnaire_tab_pane = soup.find("div", {"id": "questio", "role": "tabpanel"})
-    questionnaire_data = {}
     if questionnaire_tab_pane:
         feedback_entries = questionnaire_tab_pane.find_all("dl", class_="row")
         for entry in feedback_entries:
@@ -144,30 +228,325 @@ def parse_feedback_for_nominee(nominee_id, force_metadata=False, force_feedback=
                         if pre_tag:
                             questionnaire = pre_tag.text.strip()
             if position and questionnaire:
-                questionnaire_data[position] = questionnaire_data.get(position, "") + questionnaire
+                questionnaires.append((position, questionnaire))
+    return comments, questionnaires
 
-    result = {}
-    result["feedback"] = feedback_data
-    result["questionnaires"] = questionnaire_data
+def get_entry_fingerprint(data):
+    """Returns a stable ID for a feedback entry, made from its author, date and text."""
+    text_hash = hashlib.sha256(data.get("feedback", "").encode("utf-8")).hexdigest()
+    key = "\n".join([data.get("email") or data.get("name", ""), data.get("date", ""), text_hash])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
 
+def extract_feedback(html_content, with_questionnaires=True, backend=None):
+    """Returns the comments of a view-feedback page, and its questionnaires as (position, text) pairs.
+
+    Comments are dicts with the name, email, date, nominee, position, feedback
+    and subject fields that were found, and the fingerprint of the entry.
+    """
+    comments, questionnaires, _ = _extract_feedback(html_content, with_questionnaires, backend)
+    return comments, questionnaires
+
+def _extract_feedback(html_content, with_questionnaires, backend):
+    """Like extract_feedback, but also returns the hash of the comment entries."""
+    backend = backend or PARSER_BACKEND
+    if backend == "bs4":
+        comments, questionnaires = _extract_feedback_bs4(html_content, with_questionnaires)
+        # Always hashed with lxml, so that results from both backends can be updated.
+        comments_hash = get_comments_hash(html_content)
+    else:
+        comments, questionnaires, comments_hash = _extract_feedback_lxml(html_content, with_questionnaires)
+    for data in comments:
+        data["fingerprint"] = get_entry_fingerprint(data)
+    return comments, questionnaires, comments_hash
+
+def _get_new_comments(comments, previous_comments):
+    previous_fingerprints = Counter(data["fingerprint"] for data in previous_comments)
+    new_comments = []
+    for data in comments:
+        if previous_fingerprints[data["fingerprint"]] > 0:
+            previous_fingerprints[data["fingerprint"]] -= 1
+        else:
+            new_comments.append(data)
+    return new_comments
+
+def _update_comments(html_content, previous_comments, previous_hash, with_questionnaires, backend):
+    """Returns (all comments, new comments, questionnaires, comments hash) of a page that previous_comments were extracted from."""
+    for data in previous_comments:
+        # Results saved before entries had fingerprints.
+        if "fingerprint" not in data:
+            data["fingerprint"] = get_entry_fingerprint(data)
+    update = None
+    if (backend or PARSER_BACKEND) == "lxml":
+        update = _extract_new_comments_lxml(html_content, previous_comments, previous_hash, with_questionnaires)
+    if update is None:
+        comments, questionnaires, comments_hash = _extract_feedback(html_content, with_questionnaires, backend)
+        return comments, _get_new_comments(comments, previous_comments), questionnaires, comments_hash
+    new_comments, new_first, questionnaires, comments_hash = update
+    comments = new_comments + previous_comments if new_first else previous_comments + new_comments
+    return comments, new_comments, questionnaires, comments_hash
+
+def extract_topic_feedback(html_content, backend=None):
+    """Returns the parsed contents of a topic's feedback page, without writing anything."""
+    comments, _, comments_hash = _extract_feedback(html_content, False, backend)
+    return {"feedback": comments, "comments_hash": comments_hash}
+
+def update_topic_feedback(html_content, previous, backend=None):
+    """Like extract_topic_feedback, but only parses the entries added since previous was extracted.
+
+    Returns the result and the list of new entries.
+    """
+    comments, new_comments, _, comments_hash = _update_comments(html_content, previous.get("feedback", []), previous.get("comments_hash"), False, backend)
+    return {"feedback": comments, "comments_hash": comments_hash}, new_comments
+
+def extract_nominee_feedback(html_content, backend=None):
+    """Returns the feedback and questionnaires of a nominee's page by position, without writing anything."""
+    comments, questionnaires, comments_hash = _extract_feedback(html_content, True, backend)
+    return _group_nominee_feedback(comments, questionnaires, comments_hash)
+
+def _flatten_nominee_comments(previous):
+    """Returns the comments of a nominee's result with their positions, grouped by position."""
+    return [dict(data, position=position) for position, entries in previous.get("feedback", {}).items() for data in entries]
+
+def update_nominee_feedback(html_content, previous, backend=None):
+    """Like extract_nominee_feedback, but only parses the entries added since previous was extracted.
+
+    Returns the result and the list of new entries. The previous comments are
+    grouped by position rather than in page order, which grouping the result
+    by position again makes up for.
+    """
+    comments, new_comments, questionnaires, comments_hash = _update_comments(html_content, _flatten_nominee_comments(previous), previous.get("comments_hash"), True, backend)
+    # Grouping pops the positions, which the new entries should keep.
+    new_comments = [dict(data) for data in new_comments]
+    return _group_nominee_feedback(comments, questionnaires, comments_hash), new_comments
+
+def _group_nominee_feedback(comments, questionnaires, comments_hash):
+    feedback_data = {}
+    for data in comments:
+        position = data.pop("position", None)
+        if position not in feedback_data:
+            feedback_data[position] = []
+        feedback_data[position].append(data)
+    questionnaire_data = {}
+    for position, questionnaire in questionnaires:
+        questionnaire_data[position] = questionnaire_data.get(position, "") + questionnaire
+    return {"feedback": feedback_data, "questionnaires": questionnaire_data, "comments_hash": comments_hash}
+
+def _get_topic_parse_inputs(topic_id):
+    return {
+        "feedback_html": get_page_fingerprint(f"topic_{topic_id}.html"),
+        "parser": PARSER_BACKEND,
+    }
+
+def _get_nominee_parse_inputs(nominee_id, force_metadata=False):
+    return {
+        "feedback_html": get_page_fingerprint(f"{nominee_id}.html"),
+        "nominee_info": hash_input(get_nominee_info(nominee_id, force_metadata=force_metadata)),
+        "parser": PARSER_BACKEND,
+    }
+
+def _get_parse_mode(output_file, inputs, object_id, force_parse, parsed_ids):
+    """Returns how output_file needs to be parsed again, or None if it's up to date.
+
+    "update" only parses the entries added to the page, which is enough when
+    only the page or the nominee info changed. Anything else, like -p, a new
+    PARSER_VERSION or another --parser, gets a "full" parse.
+    """
+    forced_by = "-p" if force_parse and object_id not in parsed_ids else None
+    exists = data_file_exists(output_file)
+    if not get_rebuild_reason(output_file, inputs, PARSER_VERSION, exists=exists, forced_by=forced_by):
+        return None
+    record = get_build_record(output_file)
+    if exists and not forced_by and record and record["code_version"] == PARSER_VERSION and record["inputs"].get("parser") == inputs["parser"]:
+        return "update"
+    return "full"
+
+def _load_parsed_feedback(kind, object_id, output_file):
+    result = get_cached_json(output_file)
+    count("cache.fresh", directory="data/feedback_json")
+    _ensure_in_corpus(kind, object_id, output_file, result=result)
+    return result
+
+def _ensure_in_corpus(kind, object_id, output_file, result=None):
+    """Adds feedback that was parsed before the corpus existed to it."""
+    if is_in_corpus(kind, object_id):
+        return
+    result = result or get_cached_json(output_file)
+    if kind == "topic":
+        update_topic_corpus(object_id, result)
+    else:
+        update_nominee_corpus(object_id, result)
+
+def _report_new_entries(input_file, new_entries):
+    # Nothing to compare with on a first parse.
+    if new_entries is None:
+        return
+    count("parse.new_entries", len(new_entries))
+    if not new_entries:
+        return
+    print(f"Found {len(new_entries)} new feedback entries in {input_file}")
+    for data in new_entries:
+        print(f"  {data.get('date', '')} {data.get('name', '')} <{data.get('email', '')}> {data.get('position', '')}")
+
+def _save_topic_feedback(topic_id, result, input_file, output_file, inputs):
+    # Write the extracted data to a JSON file
+    write_data_json(output_file, result)
+    put_cached_json(output_file, result)
+    record_build(output_file, inputs, PARSER_VERSION)
+    update_topic_corpus(topic_id, result)
+    count("cache.rebuilt", directory="data/feedback_json")
+    print(f"Successfully extracted feedback from {input_file} and saved to {output_file}")
+    PARSED_TOPIC_IDS.append(topic_id)
+    return result
+
+def _save_nominee_feedback(nominee_id, result, input_file, output_file, inputs, force_metadata=False):
     # Get nominee info and add it to the result dictionary
     nominee_info = get_nominee_info(nominee_id, force_metadata=force_metadata)
     result["nominee_info"] = nominee_info
 
     # Write the extracted data to a JSON file
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    with open(output_file, "w", encoding="utf-8") as json_file:
-        json.dump(result, json_file, indent=4)
+    write_data_json(output_file, result)
+    put_cached_json(output_file, result)
+    record_build(output_file, inputs, PARSER_VERSION)
+    update_nominee_corpus(nominee_id, result)
+    count("cache.rebuilt", directory="data/feedback_json")
     print(f"Successfully extracted feedback from {input_file} and saved to {output_file}")
     PARSED_NOMINEE_IDS.append(nominee_id)
-
     return result
 
-def parse_all_feedback(force_metadata=False, force_feedback=False, force_parse=False):
+def _get_topic_files(topic_id):
+    return f"data/feedback_html/topic_{topic_id}.html", f"data/feedback_json/topic_{topic_id}.json"
+
+def _get_nominee_files(nominee_id):
+    return f"data/feedback_html/{nominee_id}.html", f"data/feedback_json/{nominee_id}.json"
+
+def parse_feedback_for_position(position_name, force_metadata=False, force_feedback=False, force_parse=False):
+    save_html_feedback_for_position(position_name, force_feedback=force_feedback)
+    topic_id = get_topic_id_from_position_name(position_name, force_metadata=force_metadata)
+    if topic_id is None:
+        print(f"Unknown position_name {position_name}")
+        return {}
+    input_file, output_file = _get_topic_files(topic_id)
+    inputs = _get_topic_parse_inputs(topic_id)
+    mode = _get_parse_mode(output_file, inputs, topic_id, force_parse, PARSED_TOPIC_IDS)
+    if not mode:
+        return _load_parsed_feedback("topic", topic_id, output_file)
+
+    with span("parse", file=input_file, backend=PARSER_BACKEND):
+        result, new_entries = _extract_feedback_file("topics", input_file, output_file, mode)
+    _report_new_entries(input_file, new_entries)
+    return _save_topic_feedback(topic_id, result, input_file, output_file, inputs)
+
+def parse_feedback_for_nominee(nominee_id, force_metadata=False, force_feedback=False, force_parse=False):
+    save_html_feedback_for_nominee(nominee_id, force_feedback=force_feedback)
+    input_file, output_file = _get_nominee_files(nominee_id)
+    inputs = _get_nominee_parse_inputs(nominee_id, force_metadata=force_metadata)
+    mode = _get_parse_mode(output_file, inputs, nominee_id, force_parse, PARSED_NOMINEE_IDS)
+    if not mode:
+        return _load_parsed_feedback("nominee", nominee_id, output_file)
+
+    with span("parse", file=input_file, backend=PARSER_BACKEND):
+        result, new_entries = _extract_feedback_file("nominees", input_file, output_file, mode)
+    _report_new_entries(input_file, new_entries)
+    return _save_nominee_feedback(nominee_id, result, input_file, output_file, inputs, force_metadata=force_metadata)
+
+def _init_parse_worker(backend, position_short_names):
+    set_parser_backend(backend)
+    POSITION_SHORT_NAMES.clear()
+    POSITION_SHORT_NAMES.update(position_short_names)
+
+def _get_comments(kind, result):
+    if kind == "topics":
+        return result.get("feedback", [])
+    return _flatten_nominee_comments(result)
+
+def _extract_feedback_file(kind, input_file, output_file, mode):
+    """Reads one page and returns what was extracted from it, and the new entries if it was parsed before.
+
+    mode is "update" to only parse the entries added since the last parse, or
+    "full" to parse them all. Only reads and returns data, so that it can run
+    in a parsing process.
+    """
+    # Read the HTML file
+    html_content = read_data_text(input_file)
+    previous = read_data_json(output_file) if data_file_exists(output_file) else None
+    if mode == "update" and previous is not None:
+        if kind == "topics":
+            return update_topic_feedback(html_content, previous)
+        return update_nominee_feedback(html_content, previous)
+    result = extract_topic_feedback(html_content) if kind == "topics" else extract_nominee_feedback(html_content)
+    if previous is None:
+        return result, None
+    previous_comments = _get_comments(kind, previous)
+    for data in previous_comments:
+        if "fingerprint" not in data:
+            data["fingerprint"] = get_entry_fingerprint(data)
+    return result, _get_new_comments(_get_comments(kind, result), previous_comments)
+
+def _save_extracted_feedback(task, extracted, force_metadata=False):
+    kind, object_id, input_file, output_file, inputs, _ = task
+    result, new_entries = extracted
+    _report_new_entries(input_file, new_entries)
+    if kind == "topics":
+        _save_topic_feedback(object_id, result, input_file, output_file, inputs)
+    else:
+        _save_nominee_feedback(object_id, result, input_file, output_file, inputs, force_metadata=force_metadata)
+
+def _parse_files_in_processes(tasks, jobs, force_metadata=False):
+    """Extracts the (kind, object_id, input_file, output_file, inputs, mode) tasks in a process pool and saves the results."""
+    # Processes are spawned rather than forked, since forking a process that
+    # runs download threads can leave locks held in the child, and workers
+    # only need the page and the position names anyway.
+    context = multiprocessing.get_context("spawn")
+    with span("parse_processes", files=len(tasks), jobs=jobs):
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_init_parse_worker, initargs=(PARSER_BACKEND, POSITION_SHORT_NAMES)) as executor:
+            futures = {executor.submit(_extract_feedback_file, task[0], task[2], task[3], task[5]): task for task in tasks}
+            for future in as_completed(futures):
+                _save_extracted_feedback(futures[future], future.result(), force_metadata=force_metadata)
+
+def parse_all_feedback(force_metadata=False, force_feedback=False, force_parse=False, jobs=1):
+    """Parses the feedback of all nominees and positions, in up to jobs processes at once."""
+    if jobs <= 1:
+        for nominee in get_active_nominees(force_metadata=force_metadata):
+            parse_feedback_for_nominee(nominee["id"], force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse)
+        for position in get_positions(force_metadata=force_metadata):
+            parse_feedback_for_position(position["name"], force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse)
+        return
+
+    # Output file -> task, since several positions can share a topic.
+    tasks = {}
     for nominee in get_active_nominees(force_metadata=force_metadata):
-        parse_feedback_for_nominee(nominee["id"], force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse)
+        nominee_id = nominee["id"]
+        save_html_feedback_for_nominee(nominee_id, force_feedback=force_feedback)
+        input_file, output_file = _get_nominee_files(nominee_id)
+        inputs = _get_nominee_parse_inputs(nominee_id, force_metadata=force_metadata)
+        mode = _get_parse_mode(output_file, inputs, nominee_id, force_parse, PARSED_NOMINEE_IDS)
+        if mode:
+            tasks[output_file] = ("nominees", nominee_id, input_file, output_file, inputs, mode)
+        else:
+            count("cache.fresh", directory="data/feedback_json")
+            _ensure_in_corpus("nominee", nominee_id, output_file)
     for position in get_positions(force_metadata=force_metadata):
-        parse_feedback_for_position(position["name"], force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse)
+        save_html_feedback_for_position(position["name"], force_feedback=force_feedback)
+        topic_id = get_topic_id_from_position_name(position["name"], force_metadata=force_metadata)
+        if topic_id is None:
+            print(f"Unknown position_name {position['name']}")
+            continue
+        input_file, output_file = _get_topic_files(topic_id)
+        if output_file in tasks:
+            continue
+        inputs = _get_topic_parse_inputs(topic_id)
+        mode = _get_parse_mode(output_file, inputs, topic_id, force_parse, PARSED_TOPIC_IDS)
+        if mode:
+            tasks[output_file] = ("topics", topic_id, input_file, output_file, inputs, mode)
+        else:
+            count("cache.fresh", directory="data/feedback_json")
+            _ensure_in_corpus("topic", topic_id, output_file)
+    tasks = list(tasks.values())
+    if len(tasks) > 1:
+        _parse_files_in_processes(tasks, min(jobs, len(tasks)), force_metadata=force_metadata)
+    elif tasks:
+        # Not worth starting a process for.
+        _save_extracted_feedback(tasks[0], _extract_feedback_file(tasks[0][0], tasks[0][2], tasks[0][3], tasks[0][5]), force_metadata=force_metadata)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Parse feedback from HTML files.')
@@ -176,8 +555,13 @@ if __name__ == "__main__":
     parser.add_argument("-f", "--force-feedback", action="store_true", help="Force download of feedback even if file exists")
     parser.add_argument("-p", "--force-parse", action="store_true", help="Force parsing even if JSON file exists")
     parser.add_argument("-a", "--force-all", action="store_true", help="Get latest feedback and redo subsequent operations")
+    parser.add_argument("--parser", choices=PARSER_BACKENDS, default=PARSER_BACKEND, help="HTML parser to extract feedback with")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes to parse feedback with")
+    parser.add_argument("--explain", action="store_true", help="Print why each file gets redone")
     args = parser.parse_args()
+    set_explain(args.explain)
 
+    set_parser_backend(args.parser)
     if args.force_all:
         args.force_feedback = True
         args.force_parse = True
@@ -190,4 +574,5 @@ if __name__ == "__main__":
             position_name = args.identifier
             parse_feedback_for_position(position_name, force_metadata=args.force_metadata, force_feedback=args.force_feedback, force_parse=args.force_parse)
     else:
-        parse_all_feedback(force_metadata=args.force_metadata, force_feedback=args.force_feedback, force_parse=args.force_parse)
+        parse_all_feedback(force_metadata=args.force_metadata, force_feedback=args.force_feedback, force_parse=args.force_parse, jobs=args.jobs)
+    flush_email_index()
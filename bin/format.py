@@ -4,12 +4,24 @@ import argparse
 import os
 import json
 import shutil
+from build_state import get_rebuild_reason, hash_input, record_build, set_explain
 from feedback import get_session_id
 from feedback_parser import parse_feedback_for_nominee, parse_feedback_for_position
 from nominees import get_active_nominees, get_nominees_by_position, get_nominee_info, get_person_info_from_email, is_email_in_nomcom
+from doc_cache import get_cached_json
+from email_index import flush_email_index
+from search import SEARCH_OUTPUT_DIR, export_search_index, update_search_index
 from summarize import get_ai_summary_for_nominee_and_position, get_ai_summary_for_position
 from positions import get_position_short_name, get_position_full_name, get_positions, get_topic_id_from_position_name
-
+from tracing import count, span
+
+# Nominees whose pages were already created by this process, since position
+# pages make sure the pages of all their nominees are there.
+FORMATTED_NOMINEE_IDS = []
+# Bump when a change to the templates should recreate all the pages.
+PAGE_VERSION = 1
+# Files copied to the output, found next to bin/ so that it can run from anywhere.
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
 HTML_TEMPLATE = """<!DOCTYPE html>
 <html lang="en">
 <head>
@@ -69,13 +81,16 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 </body>
 </html>"""
 
+def copy_static_file(file_name, destination_path):
+    """Copies a file from the static directory to the output."""
+    source_path = os.path.join(STATIC_DIR, file_name)
+    if os.path.exists(source_path):
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+        shutil.copy(source_path, destination_path)
+
 def copy_logo():
     """Copies the logo to the data directory."""
-    source_logo_path = "static/logo.jpg"
-    destination_logo_path = "output/data/logo.jpg"
-    if os.path.exists(source_logo_path):
-        os.makedirs(os.path.dirname(destination_logo_path), exist_ok=True)
-        shutil.copy(source_logo_path, destination_logo_path)
+    copy_static_file("logo.jpg", "output/data/logo.jpg")
 
 def wrap_in_html(title, body):
     """Wraps the given body in a basic HTML structure."""
@@ -233,6 +248,9 @@ def create_page_for_nominee_and_position(summary, feedback_list, input_file, out
     print(f"Successfully summarized {input_file} for {position_short_name} and saved to {output_file}")
 
 def create_page_for_nominee(nominee_id, force_metadata=False, force_feedback=False, force_parse=False, redo_summaries=False, summaries_forced=None):
+    """Creates the pages of a nominee whose contents changed."""
+    if nominee_id in FORMATTED_NOMINEE_IDS:
+        return
     output_dir = "output/data"
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
@@ -243,20 +261,34 @@ def create_page_for_nominee(nominee_id, force_metadata=False, force_feedback=Fal
 
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    with open(input_file, "r", encoding="utf-8") as f:
-        feedback_dict = json.load(f)
+    feedback_dict = get_cached_json(input_file)
 
     for position_short_name, state in feedback_dict["nominee_info"]["positions"].items():
         if state != "accepted":
+            count("format.pages", kind="nominee", status="skipped")
             continue
-        feedback_list = feedback_dict["feedback"].get(position_short_name, [])
-        summary = get_ai_summary_for_nominee_and_position(nominee_id, position_short_name, force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse, redo_summaries=redo_summaries, summaries_forced=summaries_forced)
         output_filename = f"{nominee_id}_{position_short_name}.html"
         output_file = os.path.join(output_dir, output_filename)
-
-        create_page_for_nominee_and_position(summary, feedback_list, input_file, output_file, feedback_dict, position_short_name)
+        feedback_list = feedback_dict["feedback"].get(position_short_name, [])
+        summary = get_ai_summary_for_nominee_and_position(nominee_id, position_short_name, force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse, redo_summaries=redo_summaries, summaries_forced=summaries_forced)
+        # Author photos and NomCom membership only change with -m, which recreates every page.
+        inputs = {
+            "feedback": hash_input(feedback_list),
+            "questionnaire": hash_input(feedback_dict["questionnaires"].get(position_short_name) or ""),
+            "nominee_info": hash_input(feedback_dict["nominee_info"]),
+            "summary": hash_input(summary or ""),
+        }
+        if not get_rebuild_reason(output_file, inputs, PAGE_VERSION, forced_by="-m" if force_metadata else None):
+            count("format.pages", kind="nominee", status="unchanged")
+            continue
+        with span("page", nominee_id=nominee_id, position=position_short_name):
+            create_page_for_nominee_and_position(summary, feedback_list, input_file, output_file, feedback_dict, position_short_name)
+        record_build(output_file, inputs, PAGE_VERSION)
+        count("format.pages", kind="nominee", status="rendered")
+    FORMATTED_NOMINEE_IDS.append(nominee_id)
 
 def create_page_for_position(position_short_name, force_metadata=False, force_feedback=False, force_parse=False, redo_summaries=False, summaries_forced=None):
+    """Creates the page of a position if its contents changed, and those of its nominees."""
     position_full_name = get_position_full_name(position_short_name)
     output_dir = "output/data"
     if not os.path.exists(output_dir):
@@ -266,8 +298,7 @@ def create_page_for_position(position_short_name, force_metadata=False, force_fe
         input_file = os.path.join("data/feedback_json", f"topic_{topic_id}.json")
         # Make sure the parsed JSON is there.
         parse_feedback_for_position(position_short_name, force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse)
-        with open(input_file, "r", encoding="utf-8") as f:
-            feedback_dict = json.load(f)
+        feedback_dict = get_cached_json(input_file)
     else:
         print(f"Failed to find topic_id for position_short_name {position_short_name}")
         feedback_dict = {}
@@ -278,17 +309,31 @@ def create_page_for_position(position_short_name, force_metadata=False, force_fe
     body += f'<h1 style="margin-top: 2rem;">{position_full_name}</h1>\n'
     if not nominee_ids:
         print(f"No nominees found for position {position_full_name}")
+        count("format.pages", kind="position", status="skipped")
         return
 
+    nominee_infos = []
+    for nominee_id in nominee_ids:
+        # Make sure page is there.
+        create_page_for_nominee(nominee_id, force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse, redo_summaries=redo_summaries, summaries_forced=summaries_forced)
+        nominee_infos.append(get_nominee_info(nominee_id, force_metadata=force_metadata))
+    summary = get_ai_summary_for_position(position_short_name, force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse, redo_summaries=redo_summaries, summaries_forced=summaries_forced)
+    feedback_list = feedback_dict.get("feedback", None)
+
     output_filename = f"{position_short_name}.html"
     output_file = os.path.join(output_dir, output_filename)
+    inputs = {
+        "nominees": hash_input([[nominee_info["name"], nominee_info.get("photo"), nominee_info["email"]] for nominee_info in nominee_infos]),
+        "summary": hash_input(summary or ""),
+        "feedback": hash_input(feedback_list),
+    }
+    if not get_rebuild_reason(output_file, inputs, PAGE_VERSION, forced_by="-m" if force_metadata else None):
+        count("format.pages", kind="position", status="unchanged")
+        return
 
     body += '<div style="background-color: #ddeeff; padding: 1rem;">\n'
     body += "<ul style=\"font-size: 1.2em; list-style-type: none; padding-left: 0;\">\n"
-    for nominee_id in nominee_ids:
-        # Make sure page is there.
-        create_page_for_nominee(nominee_id, force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse, redo_summaries=redo_summaries, summaries_forced=summaries_forced)
-        nominee_info = get_nominee_info(nominee_id, force_metadata=force_metadata)
+    for nominee_id, nominee_info in zip(nominee_ids, nominee_infos):
         nominee_name = nominee_info["name"]
         nominee_photo = nominee_info.get("photo")
         summary_file = f"{nominee_id}_{position_short_name}.html"
@@ -298,14 +343,14 @@ def create_page_for_position(position_short_name, force_metadata=False, force_fe
             body += f'<li style="display: flex; align-items: center; margin: 0; padding: 0.2rem 0;"><a href="{summary_file}"><img src="{_get_photo_for_email(nominee_info["email"])}" width="40" height="40" style="margin-right: 1rem; object-fit: contain;"/></a><a href="{summary_file}">{nominee_name}</a></li>\n'
     body += "</ul>\n"
     body += '</div>\n'
-    summary = get_ai_summary_for_position(position_short_name, force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse, redo_summaries=redo_summaries, summaries_forced=summaries_forced)
     body += _create_ai_summary_section(summary)
-    feedback_list = feedback_dict.get("feedback", None)
     body += _create_community_feedback_section(feedback_list)
 
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(wrap_in_html(f"{position_short_name}", body))
+    record_build(output_file, inputs, PAGE_VERSION)
+    count("format.pages", kind="position", status="rendered")
     print(f"Successfully created summary for position {position_full_name} and saved to {output_file}")
 
 
@@ -329,13 +374,40 @@ def create_index_page(force_metadata=False):
         position_full_name = get_position_full_name(position_short_name)
         body += f'<li><a href="data/{position_short_name}.html">{position_full_name}</a></li>\n'
     body += "</ul>\n"
+    body += '<p style="text-align: center;"><a href="search.html">Search all feedback</a></p>\n'
 
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(wrap_in_html("NomCom 2025", body))
+    count("format.pages", kind="index", status="rendered")
     print(f"Successfully created overall summary and saved to {output_file}")
 
 
+def create_search_page(force_metadata=False):
+    """Creates the page searching all feedback, along with the index and script it loads."""
+    update_search_index()
+    export_search_index()
+    copy_static_file("search.js", "output/search.js")
+    positions = sorted(get_position_short_name(position['name']) for position in get_positions(force_metadata=force_metadata))
+    body = '<a href="index.html"><img src="data/logo.jpg" style="position: absolute; top: 1rem; left: 1rem; width: 70px;"/></a>'
+    body += '<h1 style="margin-top: 2rem;">Search Feedback</h1>\n'
+    body += '<form id="search-form" class="row g-2" style="margin: 1rem 0;">\n'
+    body += '<div class="col-sm-8"><input id="search-query" class="form-control" placeholder="Words that must all appear, e.g. shepherding" autofocus/></div>\n'
+    body += '<div class="col-sm-2"><select id="search-position" class="form-select"><option value="">All positions</option>'
+    body += "".join(f'<option value="{position}">{position}</option>' for position in positions)
+    body += '</select></div>\n'
+    body += '<div class="col-sm-2"><button type="submit" class="btn btn-primary w-100">Search</button></div>\n'
+    body += '</form>\n'
+    body += '<div id="search-results"></div>\n'
+    body += f'<script src="search.js" data-search-dir="{os.path.basename(SEARCH_OUTPUT_DIR)}/"></script>\n'
+
+    output_file = os.path.join("output", "search.html")
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(wrap_in_html("Search Feedback", body))
+    count("format.pages", kind="search", status="rendered")
+    print(f"Successfully created search page and saved to {output_file}")
+
+
 def run_formatting(nominee_id=None, position_short_name=None, force_metadata=False, force_feedback=False, force_parse=False, redo_summaries=False, summaries_forced=None):
     # Make sure to ask for session ID before other logs.
     get_session_id()
@@ -348,8 +420,10 @@ def run_formatting(nominee_id=None, position_short_name=None, force_metadata=Fal
         for nominee in get_active_nominees(force_metadata=force_metadata):
             create_page_for_nominee(nominee["id"], force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse, redo_summaries=redo_summaries, summaries_forced=summaries_forced)
         for position_short_name in get_nominees_by_position(force_metadata=force_metadata):
-            create_page_for_position(position_short_name, force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse, redo_summaries=redo_summaries, summaries_forced=summaries_forced)
+            with span("position_page", position=position_short_name):
+                create_page_for_position(position_short_name, force_metadata=force_metadata, force_feedback=force_feedback, force_parse=force_parse, redo_summaries=redo_summaries, summaries_forced=summaries_forced)
         create_index_page(force_metadata=force_metadata)
+        create_search_page(force_metadata=force_metadata)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Format feedback summaries.')
@@ -361,7 +435,9 @@ if __name__ == "__main__":
     parser.add_argument("-a", "--force-all", action="store_true", help="Get latest feedback and redo subsequent operations")
     parser.add_argument("-x", "--add-summaries", action='store_const', const=True, default=None, dest="summaries_forced", help="[BETA] Add summarization even if disabled")
     parser.add_argument("-z", "--no-summaries", action='store_const', const=False, default=None, dest="summaries_forced", help="Disable summarization even if enabled")
+    parser.add_argument("--explain", action="store_true", help="Print why each file gets redone")
     args = parser.parse_args()
+    set_explain(args.explain)
 
     if args.force_all:
         args.force_feedback = True
@@ -377,3 +453,4 @@ if __name__ == "__main__":
             position_short_name = args.identifier
 
     run_formatting(nominee_id=nominee_id, position_short_name=position_short_name, force_metadata=args.force_metadata, force_feedback=args.force_feedback, force_parse=args.force_parse, redo_summaries=args.redo_summaries, summaries_forced=args.summaries_forced)
+    flush_email_index()
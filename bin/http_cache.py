@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+from urllib.parse import urljoin
+import requests
+from http_client import get_page_url, http_get
+from metadata_store import load_json, load_meta, save_json, save_meta
+from rate_limiter import PRIORITY_NORMAL
+from tracing import count
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# How long a cached response can be used without asking datatracker whether
+# it changed, per resource class. Once that expires, the cache is revalidated
+# with a conditional request. A max-age of 0 means revalidate on every run.
+MAX_AGES = {
+    "persons": 7 * DAY,
+    "groups": 7 * DAY,
+    "meetings": 30 * DAY,
+    "sessions": 30 * DAY,
+    "registrations": DAY,
+    "meetings_attended": DAY,
+    "nominee_info": DAY,
+    "nomcom": 30 * DAY,
+    "nomcom_group_info": DAY,
+    "positions": DAY,
+    "topics": DAY,
+    "nominees": HOUR,
+    "nominee_positions": 0,
+}
+
+# Cache files that have already been validated (or rebuilt) by this process.
+VALIDATED_FILES = set()
+CACHE_STATS_LOCK = threading.Lock()
+CACHE_STATS = {
+    "fresh": 0,
+    "not_modified": 0,
+    "downloaded": 0,
+    "stale": 0,
+}
+
+
+def _count(name, cache_file):
+    with CACHE_STATS_LOCK:
+        CACHE_STATS[name] += 1
+    count(f"cache.{name}", directory=os.path.dirname(cache_file))
+
+
+def is_fresh(cache_file, resource_class, force_metadata=False):
+    """Returns whether cache_file is stored and can be used without revalidation."""
+    if cache_file in VALIDATED_FILES:
+        return True
+    if force_metadata:
+        return False
+    meta = load_meta(cache_file)
+    if not meta:
+        return False
+    age = time.time() - meta.get("validated_at", 0)
+    return age < MAX_AGES[resource_class]
+
+
+def mark_validated(cache_file):
+    """Records that cache_file was rebuilt by this process."""
+    VALIDATED_FILES.add(cache_file)
+
+
+def save_cached_json(cache_file, data, url=None):
+    """Caches data that was obtained some other way than fetching its own URL, e.g. from a list."""
+    save_json(cache_file, data, meta={"url": url, "validated_at": time.time()})
+    VALIDATED_FILES.add(cache_file)
+    _count("downloaded", cache_file)
+
+
+def _get_validator_headers(validators):
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _get_validators(response):
+    return {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+
+
+def _are_pages_unchanged(pages, priority):
+    """Asks for each cached page of a list with its validators, and returns whether none of them changed."""
+    for page in pages:
+        headers = _get_validator_headers(page)
+        if not headers:
+            return False
+        response = http_get(page["url"], headers=headers, priority=priority)
+        if response.status_code != 304:
+            response.raise_for_status()
+            return False
+    return True
+
+
+def _download_pages(url, priority):
+    """Returns all the objects of a list endpoint as a single page, and the URL and validators of each page."""
+    pages = []
+    meta = None
+    objects = []
+    page_url = url
+    while page_url:
+        response = http_get(page_url, priority=priority)
+        response.raise_for_status()
+        page = response.json()
+        pages.append(dict(_get_validators(response), url=page_url))
+        if meta is None:
+            meta = dict(page['meta'])
+        objects.extend(page['objects'])
+        next_path = page['meta'].get('next')
+        page_url = urljoin(url, next_path) if next_path else None
+    meta.update({"limit": len(objects), "next": None, "offset": 0, "previous": None})
+    return {"meta": meta, "objects": objects}, pages
+
+
+def get_cached_json(url, cache_file, resource_class, force_metadata=False, paginated=False, priority=PRIORITY_NORMAL):
+    """Returns the JSON at url, cached in cache_file and revalidated once its max-age expires.
+
+    Revalidation uses the ETag and Last-Modified validators saved next to the
+    cache, so unchanged resources cost a 304 instead of a full download.
+    force_metadata revalidates regardless of age. If revalidation fails and
+    there is a cached copy, that copy is returned and counted as stale.
+
+    If paginated, url is a list endpoint whose pages are all fetched and
+    cached together. Every page is revalidated, and the cache is only kept if
+    none of them changed, since an object can change on any page.
+    """
+    if paginated:
+        url = get_page_url(url)
+    if is_fresh(cache_file, resource_class, force_metadata=force_metadata):
+        _count("fresh", cache_file)
+        return load_json(cache_file)
+
+    meta = load_meta(cache_file)
+    try:
+        if paginated:
+            not_modified = bool(meta.get("pages")) and _are_pages_unchanged(meta["pages"], priority)
+            if not not_modified:
+                data, pages = _download_pages(url, priority)
+        else:
+            response = http_get(url, headers=_get_validator_headers(meta), priority=priority)
+            response.raise_for_status()
+            not_modified = response.status_code == 304
+    except requests.RequestException as e:
+        data = load_json(cache_file)
+        if data is None:
+            raise
+        print(f"Failed to revalidate {cache_file}, using stale cached copy: {e}")
+        # Not revalidated, so the next run tries again, but don't retry in this one.
+        VALIDATED_FILES.add(cache_file)
+        _count("stale", cache_file)
+        return data
+
+    meta["validated_at"] = time.time()
+    if not_modified:
+        save_meta(cache_file, meta)
+        VALIDATED_FILES.add(cache_file)
+        _count("not_modified", cache_file)
+        return load_json(cache_file)
+
+    meta["url"] = url
+    if paginated:
+        meta["pages"] = pages
+    else:
+        data = response.json()
+        meta.update(_get_validators(response))
+    save_json(cache_file, data, meta=meta)
+    VALIDATED_FILES.add(cache_file)
+    _count("downloaded", cache_file)
+    print(f"Downloaded {url} and saved to {cache_file}")
+    return data
+
+
+def print_cache_stats():
+    with CACHE_STATS_LOCK:
+        stats = dict(CACHE_STATS)
+    print(f"Cache: {stats['fresh']} fresh, {stats['not_modified']} not modified, {stats['downloaded']} downloaded, {stats['stale']} stale")
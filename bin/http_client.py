@@ -0,0 +1,220 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+import requests
+from requests.adapters import HTTPAdapter
+from cassette import is_recording, is_replaying, record_response, replay_response
+from rate_limiter import PRIORITY_NORMAL, acquire, get_budget, print_rate_limit_stats, report_response
+from tracing import count
+
+# (connect, read) timeouts in seconds.
+TIMEOUT = (10, 60)
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+POOL_SIZE = 32
+# Number of objects requested per page from datatracker list endpoints.
+PAGE_SIZE = 500
+# Whether to print each retry. Retries are always counted in HTTP_STATS and
+# the trace report.
+VERBOSE = False
+
+DATATRACKER_URL = "https://datatracker.ietf.org"
+# Requests meant for datatracker are sent here instead, e.g. to a local
+# fake_datatracker.py. URLs are left unchanged everywhere else, including in
+# caches and cassettes.
+DATATRACKER_URL_OVERRIDE = os.environ.get("NOMCOM_DATATRACKER_URL")
+
+SESSION = None
+SESSION_LOCK = threading.Lock()
+STATS_LOCK = threading.Lock()
+HTTP_STATS = {
+    "requests": 0,
+    "bytes": 0,
+    "retries": 0,
+    "failures": 0,
+}
+
+
+def configure_http(timeout=None, max_retries=None, page_size=None, verbose=None):
+    """Overrides the default timeout (in seconds), number of retries, list page size and verbosity."""
+    global TIMEOUT, MAX_RETRIES, PAGE_SIZE, VERBOSE
+    if timeout is not None:
+        TIMEOUT = (min(timeout, TIMEOUT[0]), timeout)
+    if max_retries is not None:
+        MAX_RETRIES = max_retries
+    if page_size is not None:
+        PAGE_SIZE = page_size
+    if verbose is not None:
+        VERBOSE = verbose
+
+
+def set_datatracker_url(url):
+    """Sends requests meant for datatracker to url instead."""
+    global DATATRACKER_URL_OVERRIDE
+    DATATRACKER_URL_OVERRIDE = url.rstrip("/") if url else None
+
+
+def _get_request_url(url):
+    if DATATRACKER_URL_OVERRIDE and url.startswith(DATATRACKER_URL):
+        return DATATRACKER_URL_OVERRIDE + url[len(DATATRACKER_URL):]
+    return url
+
+
+def get_session():
+    """Returns the process-wide session, which keeps connections alive across requests."""
+    global SESSION
+    with SESSION_LOCK:
+        if SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            SESSION = session
+    return SESSION
+
+
+def _count(name, amount=1):
+    with STATS_LOCK:
+        HTTP_STATS[name] += amount
+
+
+def _get_retry_after(response):
+    """Returns the delay requested by a Retry-After header in seconds, or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _get_backoff(attempt):
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def get_endpoint(url):
+    """Returns the path of url with object IDs replaced by *, to group requests by endpoint."""
+    segments = urlsplit(url).path.split("/")
+    return "/".join("*" if segment.isdigit() or "@" in segment else segment for segment in segments)
+
+
+def http_get(url, cookies=None, headers=None, priority=PRIORITY_NORMAL):
+    """Performs a GET request, retrying on timeouts, connection errors, 429 and 5xx.
+
+    Requests are paced by the rate limiter, and when several are waiting,
+    those with the best priority are sent first.
+    """
+    start = time.perf_counter()
+    response = _http_get(url, cookies=cookies, headers=headers, priority=priority)
+    endpoint = get_endpoint(url)
+    count("http.requests", endpoint=endpoint, status=response.status_code)
+    count("http.bytes", len(response.content), endpoint=endpoint)
+    count("http.latency", time.perf_counter() - start, endpoint=endpoint)
+    return response
+
+
+def _http_get(url, cookies=None, headers=None, priority=PRIORITY_NORMAL):
+    if is_replaying():
+        response = replay_response(url)
+        _count("requests")
+        _count("bytes", len(response.content))
+        return response
+    if is_recording() and headers:
+        # Cassettes need full responses to be replayable from an empty cache.
+        headers = {name: value for name, value in headers.items() if name not in ("If-None-Match", "If-Modified-Since")}
+    session = get_session()
+    budget = get_budget(url)
+    attempt = 0
+    while True:
+        acquire(budget, priority=priority)
+        _count("requests")
+        request_start = time.perf_counter()
+        try:
+            response = session.get(_get_request_url(url), cookies=cookies, headers=headers, timeout=TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= MAX_RETRIES:
+                _count("failures")
+                raise
+            delay = _get_backoff(attempt)
+            reason = type(e).__name__
+            if VERBOSE:
+                print(f"Request to {url} failed ({e}), retrying in {delay:.1f}s")
+        else:
+            report_response(budget, response.status_code, time.perf_counter() - request_start)
+            _count("bytes", len(response.content))
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= MAX_RETRIES:
+                if response.status_code in RETRY_STATUS_CODES:
+                    _count("failures")
+                if is_recording():
+                    record_response(url, response)
+                return response
+            delay = _get_retry_after(response)
+            if delay is None:
+                delay = _get_backoff(attempt)
+            delay = min(delay, BACKOFF_MAX)
+            reason = response.status_code
+            if VERBOSE:
+                print(f"Request to {url} returned {response.status_code}, retrying in {delay:.1f}s")
+        _count("retries")
+        count("http.retries", endpoint=get_endpoint(url), reason=reason)
+        count("http.backoff", delay, endpoint=get_endpoint(url))
+        attempt += 1
+        time.sleep(delay)
+
+
+def set_query_param(url, name, value):
+    """Returns url with the query parameter name set to value."""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != name]
+    query.append((name, str(value)))
+    return urlunsplit(parts._replace(query=urlencode(query, safe="/,@")))
+
+
+def get_page_url(url, page_size=None):
+    """Returns the URL of the first page of a list endpoint."""
+    return set_query_param(url, "limit", page_size or PAGE_SIZE)
+
+
+def iter_pages(url, first_page=None, page_size=None, priority=PRIORITY_NORMAL):
+    """Yields the pages of a datatracker list endpoint, following meta.next until the end.
+
+    If first_page was already fetched from url, it is yielded without
+    fetching it again.
+    """
+    if first_page is None:
+        response = http_get(get_page_url(url, page_size=page_size), priority=priority)
+        response.raise_for_status()
+        first_page = response.json()
+    page = first_page
+    while True:
+        yield page
+        next_path = page['meta'].get('next')
+        if not next_path:
+            return
+        response = http_get(urljoin(url, next_path), priority=priority)
+        response.raise_for_status()
+        page = response.json()
+
+
+def iter_objects(url, page_size=None, priority=PRIORITY_NORMAL):
+    """Yields the objects of a datatracker list endpoint one page at a time."""
+    for page in iter_pages(url, page_size=page_size, priority=priority):
+        yield from page['objects']
+
+
+def print_http_stats():
+    with STATS_LOCK:
+        stats = dict(HTTP_STATS)
+    print(f"HTTP: {stats['requests']} requests, {stats['bytes']} bytes, {stats['retries']} retries, {stats['failures']} failures")
+    print_rate_limit_stats()
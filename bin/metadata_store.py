@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from storage import COMPRESSED_SUFFIX, data_file_exists, get_data_file_mtime, read_data_json, write_data_json
+
+# Datatracker metadata is cached either as one JSON file per object under
+# data/ (the default), or in a single SQLite database. Callers always refer to
+# objects by their path in the JSON tree, e.g. "data/persons/123.json", which
+# the SQLite backend maps to the (type, id) pair ("persons", "123").
+DATA_DIR = "data"
+STORE_SETTINGS_FILE = "config/metadata_store.json"
+SQLITE_FILE = "data/metadata.sqlite3"
+METADATA_DIRS = ["persons", "registrations", "groups", "meetings", "sessions", "meetings_attended", "nominees"]
+METADATA_FILES = ["nominees.json", "positions.json", "topics.json", "nominee_positions.json", "nomcom_id.json", "nomcom_group_info.json", "prefetch_misses.json"]
+
+BACKEND = None
+SQLITE_LOCAL = threading.local()
+
+
+def get_backend():
+    global BACKEND
+    if BACKEND is None:
+        BACKEND = "json"
+        if os.path.exists(STORE_SETTINGS_FILE):
+            with open(STORE_SETTINGS_FILE, "r", encoding="utf-8") as f:
+                BACKEND = json.load(f).get("backend", "json")
+    return BACKEND
+
+
+def set_backend(backend):
+    global BACKEND
+    BACKEND = backend
+    os.makedirs(os.path.dirname(STORE_SETTINGS_FILE), exist_ok=True)
+    with open(STORE_SETTINGS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"backend": backend}, f, indent=4)
+
+
+def _get_key(path):
+    """Maps a path in the JSON tree to a (type, id) pair."""
+    relative_path = os.path.relpath(path, DATA_DIR)
+    if relative_path.startswith("..") or not relative_path.endswith(".json"):
+        raise ValueError(f"{path} is not a metadata file")
+    object_type, object_id = os.path.split(relative_path[:-len(".json")])
+    return object_type, object_id
+
+
+def _get_path(object_type, object_id):
+    return os.path.join(DATA_DIR, object_type, f"{object_id}.json")
+
+
+def _get_connection():
+    connection = getattr(SQLITE_LOCAL, "connection", None)
+    if connection is None:
+        os.makedirs(os.path.dirname(SQLITE_FILE), exist_ok=True)
+        connection = sqlite3.connect(SQLITE_FILE, isolation_level=None, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS objects (type TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, meta TEXT, PRIMARY KEY (type, id)) WITHOUT ROWID")
+        SQLITE_LOCAL.connection = connection
+    return connection
+
+
+def _get_meta_file(path):
+    return f"{path}.meta"
+
+
+def _write_meta_file(path, meta):
+    # Too small to be worth compressing.
+    write_data_json(_get_meta_file(path), meta, compression="none")
+
+
+def _read_meta_file(path):
+    meta_file = _get_meta_file(path)
+    if data_file_exists(meta_file):
+        return read_data_json(meta_file)
+    # Caches written before validators were stored only have their mtime.
+    return {"validated_at": get_data_file_mtime(path)}
+
+
+def exists(path):
+    if get_backend() == "sqlite":
+        row = _get_connection().execute("SELECT 1 FROM objects WHERE type = ? AND id = ?", _get_key(path)).fetchone()
+        return row is not None
+    return data_file_exists(path)
+
+
+def load_json(path):
+    """Returns the object stored at path, or None if there isn't one."""
+    if get_backend() == "sqlite":
+        row = _get_connection().execute("SELECT data FROM objects WHERE type = ? AND id = ?", _get_key(path)).fetchone()
+        return json.loads(row[0]) if row else None
+    if not data_file_exists(path):
+        return None
+    return read_data_json(path)
+
+
+def load_meta(path):
+    """Returns the cache metadata (validators and validation time) of the object stored at path."""
+    if get_backend() == "sqlite":
+        row = _get_connection().execute("SELECT meta FROM objects WHERE type = ? AND id = ?", _get_key(path)).fetchone()
+        return json.loads(row[0]) if row and row[0] else {}
+    if not data_file_exists(path):
+        return {}
+    return _read_meta_file(path)
+
+
+def save_json(path, data, meta=None):
+    """Stores data at path, along with its cache metadata if given."""
+    if get_backend() == "sqlite":
+        object_type, object_id = _get_key(path)
+        encoded_meta = json.dumps(meta) if meta is not None else None
+        _get_connection().execute("INSERT INTO objects (type, id, data, meta) VALUES (?, ?, ?, ?) ON CONFLICT (type, id) DO UPDATE SET data = excluded.data, meta = COALESCE(excluded.meta, objects.meta)", (object_type, object_id, json.dumps(data), encoded_meta))
+        return
+    write_data_json(path, data)
+    if meta is not None:
+        _write_meta_file(path, meta)
+
+
+def save_meta(path, meta):
+    """Updates the cache metadata of an object that is already stored."""
+    if get_backend() == "sqlite":
+        object_type, object_id = _get_key(path)
+        _get_connection().execute("UPDATE objects SET meta = ? WHERE type = ? AND id = ?", (json.dumps(meta), object_type, object_id))
+        return
+    _write_meta_file(path, meta)
+
+
+def iter_json_tree():
+    """Yields the path of every object in the JSON tree, whether its file is compressed or not."""
+    for file_name in METADATA_FILES:
+        path = os.path.join(DATA_DIR, file_name)
+        if data_file_exists(path):
+            yield path
+    for dir_name in METADATA_DIRS:
+        dir_path = os.path.join(DATA_DIR, dir_name)
+        if not os.path.isdir(dir_path):
+            continue
+        # Files being converted can briefly exist in both forms.
+        file_names = {file_name[:-len(COMPRESSED_SUFFIX)] if file_name.endswith(COMPRESSED_SUFFIX) else file_name for file_name in os.listdir(dir_path)}
+        for file_name in sorted(file_names):
+            if file_name.endswith(".json"):
+                yield os.path.join(dir_path, file_name)
+
+
+def import_json_tree():
+    """Copies the per-object JSON files into the SQLite database."""
+    connection = _get_connection()
+    count = 0
+    connection.execute("BEGIN")
+    for path in iter_json_tree():
+        object_type, object_id = _get_key(path)
+        data = read_data_json(path)
+        meta = _read_meta_file(path)
+        connection.execute("INSERT OR REPLACE INTO objects (type, id, data, meta) VALUES (?, ?, ?, ?)", (object_type, object_id, json.dumps(data), json.dumps(meta)))
+        count += 1
+    connection.execute("COMMIT")
+    print(f"Imported {count} objects from {DATA_DIR} into {SQLITE_FILE}")
+
+
+def export_json_tree():
+    """Writes the contents of the SQLite database out as per-object JSON files."""
+    count = 0
+    for object_type, object_id, data, meta in _get_connection().execute("SELECT type, id, data, meta FROM objects"):
+        path = _get_path(object_type, object_id)
+        write_data_json(path, json.loads(data))
+        if meta:
+            _write_meta_file(path, json.loads(meta))
+        count += 1
+    print(f"Exported {count} objects from {SQLITE_FILE} into {DATA_DIR}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Manage where datatracker metadata is cached.')
+    parser.add_argument("--backend", choices=["json", "sqlite"], help="Select the store used by subsequent runs")
+    parser.add_argument("--import", action="store_true", dest="import_tree", help=f"Import the JSON files under {DATA_DIR} into {SQLITE_FILE}")
+    parser.add_argument("--export", action="store_true", dest="export_tree", help=f"Export {SQLITE_FILE} as JSON files under {DATA_DIR}")
+    args = parser.parse_args()
+
+    if args.import_tree:
+        import_json_tree()
+    if args.export_tree:
+        export_json_tree()
+    if args.backend:
+        print(f"Setting metadata store backend to {args.backend}")
+        set_backend(args.backend)
+    if not (args.import_tree or args.export_tree or args.backend):
+        print(f"Metadata store backend is {get_backend()}")
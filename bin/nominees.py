@@ -1,25 +1,62 @@
 #!/usr/bin/env python3
 import argparse
-import requests
+import copy
 import json
-import os
 import random
-from positions import get_nomcom_id, get_position_name, get_position_short_name
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from email_index import add_indexed_person_id, flush_email_index, get_indexed_person_id
+from http_cache import MAX_AGES, get_cached_json, is_fresh, mark_validated, save_cached_json
+from http_client import http_get, iter_pages
+from metadata_store import load_json, save_json
+from positions import get_nomcom_id, get_position_name, get_position_short_name, get_positions
+from rate_limiter import PRIORITY_HIGH, PRIORITY_LOW
+from tracing import span
 
 NOMINEES_DATA = None
 NOMINEE_POSITIONS_DATA = None
+NOMINEES_BY_ID = None
+NOMINEE_POSITION_STATES = None
 ACTIVE_NOMINEES_DATA = None
 NOMINEES_BY_POSITION_DATA = None
-EMAILS_TO_PEOPLE_IDS = None
-PERSON_IDS_DOWNLOADED = []
-REGISTRATIONS_DOWNLOADED = []
-GROUP_IDS_DOWNLOADED = []
-MEETING_IDS_DOWNLOADED = []
-SESSION_IDS_DOWNLOADED = []
-MEETINGS_ATTENDED_DOWNLOADED = []
-NOMINEE_IDS_DOWNLOADED = []
 NOMCOM_GROUP_INFO_DATA = None
 NOMCOM_PERSON_IDS = None
+# Maximum number of objects to request at once with an id__in filter.
+BULK_FETCH_CHUNK_SIZE = 50
+# IDs that bulk requests didn't return, e.g. deleted objects, by resource
+# class: {resource_class: {id: when it was missed}}. They are left out of bulk
+# requests until the max-age of their class expires, instead of being asked
+# for again on every run.
+PREFETCH_MISSES_FILE = "data/prefetch_misses.json"
+PREFETCH_MISSES = None
+PREFETCH_MISSES_LOCK = threading.Lock()
+IN_FLIGHT_LOCK = threading.Lock()
+IN_FLIGHT = {}
+
+
+def _coalesced(key, fetch):
+    """Runs fetch() once for key, even when several threads ask for it concurrently."""
+    with IN_FLIGHT_LOCK:
+        future = IN_FLIGHT.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            IN_FLIGHT[key] = future
+    if not is_owner:
+        # Callers are allowed to mutate what they get back, so don't share it.
+        return copy.deepcopy(future.result())
+    try:
+        result = fetch()
+        future.set_result(result)
+        # Nor with the owner, or waiters could copy it while it's being changed.
+        return copy.deepcopy(result)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with IN_FLIGHT_LOCK:
+            del IN_FLIGHT[key]
 
 
 def load_nominees(force_metadata=False):
@@ -27,195 +64,163 @@ def load_nominees(force_metadata=False):
     if NOMINEES_DATA:
         return NOMINEES_DATA
 
-    nominees_file = "data/nominees.json"
-    if not force_metadata and os.path.exists(nominees_file):
-        with open(nominees_file, "r", encoding="utf-8") as f:
-            NOMINEES_DATA = json.load(f)['objects']
-            return NOMINEES_DATA
-
     nomcom_id = get_nomcom_id()
-    url = f"https://datatracker.ietf.org/api/v1/nomcom/nominee/?nomcom={nomcom_id}&limit=1000"
-    response = requests.get(url)
-    response.raise_for_status()  # Raise an exception for HTTP errors
-    nominees_data = response.json()
-
-    os.makedirs(os.path.dirname(nominees_file), exist_ok=True)
-    with open(nominees_file, "w", encoding="utf-8") as f:
-        json.dump(nominees_data, f, indent=4)
-    print(f"Nominees data downloaded and saved to {nominees_file}")
+    url = f"https://datatracker.ietf.org/api/v1/nomcom/nominee/?nomcom={nomcom_id}"
+    nominees_data = get_cached_json(url, "data/nominees.json", "nominees", force_metadata=force_metadata, paginated=True, priority=PRIORITY_HIGH)
     NOMINEES_DATA = nominees_data['objects']
     return NOMINEES_DATA
 
+def get_nominee(nominee_id, force_metadata=False):
+    """Returns the nominee object with the given ID, or None."""
+    global NOMINEES_BY_ID
+    if NOMINEES_BY_ID is None:
+        NOMINEES_BY_ID = {str(nominee['id']): nominee for nominee in load_nominees(force_metadata=force_metadata)}
+    return NOMINEES_BY_ID.get(str(nominee_id))
+
 def get_person_id_from_email(email, force_metadata=False):
-    global EMAILS_TO_PEOPLE_IDS
-    emails_file = "data/emails.json"
-    if not EMAILS_TO_PEOPLE_IDS:
-        EMAILS_TO_PEOPLE_IDS = {}
-        if not force_metadata and os.path.exists(emails_file):
-            with open(emails_file, "r", encoding="utf-8") as f:
-                EMAILS_TO_PEOPLE_IDS = json.load(f)
-    if email in EMAILS_TO_PEOPLE_IDS:
-        return EMAILS_TO_PEOPLE_IDS[email]
+    person_id = get_indexed_person_id(email)
+    if person_id is not None:
+        return person_id
+    return _coalesced(("email", email), lambda: _download_person_id_from_email(email))
 
+def _download_person_id_from_email(email):
     url = f'https://datatracker.ietf.org/api/v1/person/email/{email}/'
-    response = requests.get(url)
+    response = http_get(url)
     response.raise_for_status()
     email_data = response.json()
     person_path = email_data['person']
     person_id = person_path.strip('/').split('/')[-1]
-    EMAILS_TO_PEOPLE_IDS[email] = person_id
-    os.makedirs(os.path.dirname(emails_file), exist_ok=True)
-    with open(emails_file, "w", encoding="utf-8") as f:
-        json.dump(EMAILS_TO_PEOPLE_IDS, f, indent=4)
+    add_indexed_person_id(email, person_id)
     return person_id
 
 def get_person_info_from_id(person_id, force_metadata=False):
-    global PERSON_IDS_DOWNLOADED
-    person_file = f"data/persons/{person_id}.json"
-
-    if os.path.exists(person_file) and ((not force_metadata) or (person_id in PERSON_IDS_DOWNLOADED)):
-        with open(person_file, "r", encoding="utf-8") as f:
-            return json.load(f)
+    return _coalesced(("person", str(person_id)), lambda: _get_person_info_from_id(person_id, force_metadata=force_metadata))
 
+def _get_person_info_from_id(person_id, force_metadata=False):
     url = f'https://datatracker.ietf.org/api/v1/person/person/{person_id}/'
-    response = requests.get(url)
-    response.raise_for_status()
-    person_data = response.json()
-
-    os.makedirs(os.path.dirname(person_file), exist_ok=True)
-    with open(person_file, "w", encoding="utf-8") as f:
-        json.dump(person_data, f, indent=4)
-    print(f"Person data downloaded and saved to {person_file}")
-    PERSON_IDS_DOWNLOADED.append(person_id)
-
-    return person_data
-
+    return get_cached_json(url, f"data/persons/{person_id}.json", "persons", force_metadata=force_metadata)
 
 def get_registrations_from_person_id(person_id, force_metadata=False):
-    global REGISTRATIONS_DOWNLOADED
-    registration_file = f"data/registrations/{person_id}.json"
-
-    if os.path.exists(registration_file) and ((not force_metadata) or (person_id in REGISTRATIONS_DOWNLOADED)):
-        with open(registration_file, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    url = f'https://datatracker.ietf.org/api/v1/meeting/registration/?person={person_id}&limit=1000'
-    response = requests.get(url)
-    response.raise_for_status()
-    registration_data = response.json()
-
-    os.makedirs(os.path.dirname(registration_file), exist_ok=True)
-    with open(registration_file, "w", encoding="utf-8") as f:
-        json.dump(registration_data, f, indent=4)
-    print(f"Registration data downloaded and saved to {registration_file}")
-    REGISTRATIONS_DOWNLOADED.append(person_id)
-
-    return registration_data
+    url = f'https://datatracker.ietf.org/api/v1/meeting/registration/?person={person_id}'
+    return get_cached_json(url, f"data/registrations/{person_id}.json", "registrations", force_metadata=force_metadata, paginated=True)
 
 
 def get_group_info_from_id(group_id, force_metadata=False):
-    global GROUP_IDS_DOWNLOADED
-    group_file = f"data/groups/{group_id}.json"
-
-    if os.path.exists(group_file) and ((not force_metadata) or (group_id in GROUP_IDS_DOWNLOADED)):
-        with open(group_file, "r", encoding="utf-8") as f:
-            return json.load(f)
-
     url = f'https://datatracker.ietf.org/api/v1/group/group/{group_id}/'
-    response = requests.get(url)
-    response.raise_for_status()
-    group_data = response.json()
-
-    os.makedirs(os.path.dirname(group_file), exist_ok=True)
-    with open(group_file, "w", encoding="utf-8") as f:
-        json.dump(group_data, f, indent=4)
-    print(f"Group data downloaded and saved to {group_file}")
-    GROUP_IDS_DOWNLOADED.append(group_id)
-
-    return group_data
+    return get_cached_json(url, f"data/groups/{group_id}.json", "groups", force_metadata=force_metadata)
 
 
 def get_meeting_info_from_id(meeting_id, force_metadata=False):
-    global MEETING_IDS_DOWNLOADED
-    meeting_file = f"data/meetings/{meeting_id}.json"
-
-    if os.path.exists(meeting_file) and ((not force_metadata) or (meeting_id in MEETING_IDS_DOWNLOADED)):
-        with open(meeting_file, "r", encoding="utf-8") as f:
-            return json.load(f)
-
     url = f'https://datatracker.ietf.org/api/v1/meeting/meeting/{meeting_id}/'
-    response = requests.get(url)
-    response.raise_for_status()
-    meeting_data = response.json()
-
-    os.makedirs(os.path.dirname(meeting_file), exist_ok=True)
-    with open(meeting_file, "w", encoding="utf-8") as f:
-        json.dump(meeting_data, f, indent=4)
-    print(f"Meeting data downloaded and saved to {meeting_file}")
-    MEETING_IDS_DOWNLOADED.append(meeting_id)
-
-    return meeting_data
+    return get_cached_json(url, f"data/meetings/{meeting_id}.json", "meetings", force_metadata=force_metadata)
 
 
 def get_session_info_from_id(session_id, force_metadata=False):
-    global SESSION_IDS_DOWNLOADED
-    session_file = f"data/sessions/{session_id}.json"
+    url = f'https://datatracker.ietf.org/api/v1/meeting/session/{session_id}/'
+    return get_cached_json(url, f"data/sessions/{session_id}.json", "sessions", force_metadata=force_metadata)
 
-    if os.path.exists(session_file) and ((not force_metadata) or (session_id in SESSION_IDS_DOWNLOADED)):
-        with open(session_file, "r", encoding="utf-8") as f:
-            return json.load(f)
 
-    url = f'https://datatracker.ietf.org/api/v1/meeting/session/{session_id}/'
-    response = requests.get(url)
-    response.raise_for_status()
-    session_data = response.json()
+def get_meetings_attended_from_person_id(person_id, force_metadata=False):
+    url = f'https://datatracker.ietf.org/api/v1/meeting/attended/?person={person_id}'
+    return get_cached_json(url, f"data/meetings_attended/{person_id}.json", "meetings_attended", force_metadata=force_metadata, paginated=True)
+
+
+def _get_prefetch_misses_locked():
+    global PREFETCH_MISSES
+    if PREFETCH_MISSES is None:
+        PREFETCH_MISSES = load_json(PREFETCH_MISSES_FILE) or {}
+    return PREFETCH_MISSES
+
+
+def _is_recent_miss(resource_class, object_id, force_metadata=False):
+    if force_metadata:
+        return False
+    with PREFETCH_MISSES_LOCK:
+        missed_at = _get_prefetch_misses_locked().get(resource_class, {}).get(object_id)
+    return missed_at is not None and time.time() - missed_at < MAX_AGES[resource_class]
+
+
+def _record_prefetch_results(resource_class, requested_ids, returned_ids):
+    with PREFETCH_MISSES_LOCK:
+        all_misses = _get_prefetch_misses_locked()
+        misses = all_misses.setdefault(resource_class, {})
+        changed = False
+        now = time.time()
+        for object_id in requested_ids:
+            if object_id not in returned_ids:
+                misses[object_id] = now
+                changed = True
+            elif misses.pop(object_id, None) is not None:
+                changed = True
+        if changed:
+            save_json(PREFETCH_MISSES_FILE, all_misses)
+
+
+def _prefetch_objects(resource, resource_class, ids, force_metadata=False, jobs=1):
+    """Downloads the objects that aren't cached yet using chunked id__in list requests.
+
+    Each object is then saved to the same cache file that fetching it
+    individually would have used, so that subsequent lookups are cache hits.
+    IDs that the requests don't return are recorded, and left to individual
+    lookups until their max-age expires.
+    """
+    missing_ids = sorted({str(object_id) for object_id in ids if not is_fresh(f"data/{resource_class}/{object_id}.json", resource_class, force_metadata=force_metadata)}, key=lambda object_id: (len(object_id), object_id))
+    missing_ids = [object_id for object_id in missing_ids if not _is_recent_miss(resource_class, object_id, force_metadata=force_metadata)]
+    chunks = [missing_ids[i:i + BULK_FETCH_CHUNK_SIZE] for i in range(0, len(missing_ids), BULK_FETCH_CHUNK_SIZE)]
+
+    def fetch_chunk(chunk):
+        url = f"https://datatracker.ietf.org/api/v1/{resource}/?id__in={','.join(chunk)}&limit={len(chunk)}"
+        # Each chunk stands in for many individual requests.
+        response = http_get(url, priority=PRIORITY_HIGH)
+        response.raise_for_status()
+        returned_ids = set()
+        for obj in response.json()['objects']:
+            object_url = f"https://datatracker.ietf.org{obj['resource_uri']}"
+            save_cached_json(f"data/{resource_class}/{obj['id']}.json", obj, url=object_url)
+            returned_ids.add(str(obj['id']))
+        _record_prefetch_results(resource_class, chunk, returned_ids)
+        return len(returned_ids)
+
+    if not chunks:
+        return
+    if jobs <= 1 or len(chunks) <= 1:
+        num_downloaded = sum(fetch_chunk(chunk) for chunk in chunks)
+    else:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            num_downloaded = sum(executor.map(fetch_chunk, chunks))
+    num_missed = len(missing_ids) - num_downloaded
+    print(f"Downloaded {num_downloaded} {resource_class} in bulk" + (f", {num_missed} not found" if num_missed else ""))
 
-    os.makedirs(os.path.dirname(session_file), exist_ok=True)
-    with open(session_file, "w", encoding="utf-8") as f:
-        json.dump(session_data, f, indent=4)
-    print(f"Session data downloaded and saved to {session_file}")
-    SESSION_IDS_DOWNLOADED.append(session_id)
 
-    return session_data
+def prefetch_persons(person_ids, force_metadata=False, jobs=1):
+    _prefetch_objects("person/person", "persons", person_ids, force_metadata=force_metadata, jobs=jobs)
 
 
-def get_meetings_attended_from_person_id(person_id, force_metadata=False):
-    global MEETINGS_ATTENDED_DOWNLOADED
-    meetings_attended_file = f"data/meetings_attended/{person_id}.json"
+def prefetch_groups(group_ids, force_metadata=False, jobs=1):
+    _prefetch_objects("group/group", "groups", group_ids, force_metadata=force_metadata, jobs=jobs)
 
-    if os.path.exists(meetings_attended_file) and ((not force_metadata) or (person_id in MEETINGS_ATTENDED_DOWNLOADED)):
-        with open(meetings_attended_file, "r", encoding="utf-8") as f:
-            return json.load(f)
 
-    url = f'https://datatracker.ietf.org/api/v1/meeting/attended/?person={person_id}&limit=1000'
-    response = requests.get(url)
-    response.raise_for_status()
-    meetings_attended_data = response.json()
+def prefetch_meetings(meeting_ids, force_metadata=False, jobs=1):
+    _prefetch_objects("meeting/meeting", "meetings", meeting_ids, force_metadata=force_metadata, jobs=jobs)
 
-    os.makedirs(os.path.dirname(meetings_attended_file), exist_ok=True)
-    with open(meetings_attended_file, "w", encoding="utf-8") as f:
-        json.dump(meetings_attended_data, f, indent=4)
-    print(f"Meetings attended data downloaded and saved to {meetings_attended_file}")
-    MEETINGS_ATTENDED_DOWNLOADED.append(person_id)
 
-    return meetings_attended_data
+def prefetch_sessions(session_ids, force_metadata=False, jobs=1):
+    _prefetch_objects("meeting/session", "sessions", session_ids, force_metadata=force_metadata, jobs=jobs)
 
 
 def get_person_info_from_email(email, force_metadata=False):
     return get_person_info_from_id(get_person_id_from_email(email, force_metadata=force_metadata), force_metadata=force_metadata)
 
 def get_nominee_info(nominee_id, force_metadata=False):
-    global NOMINEE_IDS_DOWNLOADED
+    with span("nominee_info", nominee_id=nominee_id):
+        return _coalesced(("nominee", str(nominee_id)), lambda: _get_nominee_info(nominee_id, force_metadata=force_metadata))
+
+def _get_nominee_info(nominee_id, force_metadata=False):
     nominee_file = f"data/nominees/{nominee_id}.json"
-    if os.path.exists(nominee_file) and ((not force_metadata) or (nominee_id in NOMINEE_IDS_DOWNLOADED)):
-        with open(nominee_file, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    nominee = None
-    for obj in load_nominees(force_metadata=force_metadata):
-        if str(obj['id']) == str(nominee_id):
-            nominee = obj
-            break
+    if is_fresh(nominee_file, "nominee_info", force_metadata=force_metadata):
+        return load_json(nominee_file)
+
+    nominee = get_nominee(nominee_id, force_metadata=force_metadata)
     if not nominee:
         raise Exception(f'Nominee with id {nominee_id} not found')
 
@@ -225,68 +230,98 @@ def get_nominee_info(nominee_id, force_metadata=False):
     nominee_info = get_person_info_from_id(person_id, force_metadata=force_metadata)
 
     url = f'https://datatracker.ietf.org/api/v1/meeting/registration/?person={nominee_info["id"]}&limit=1'
-    response = requests.get(url)
+    response = http_get(url)
     response.raise_for_status()
     attended_data = response.json()
     nominee_info['num_meetings_registered'] = attended_data['meta']['total_count']
 
-    url = f'https://datatracker.ietf.org/api/v1/doc/documentauthor/?email={email}&limit=1000'
-    response = requests.get(url)
-    response.raise_for_status()
-    drafts_data = response.json()
+    url = f'https://datatracker.ietf.org/api/v1/doc/documentauthor/?email={email}'
+    num_documents = None
     num_individual_drafts = 0
     num_wg_drafts = 0
     num_rfcs = 0
-    for document in drafts_data['objects']:
-        document_path = document['document']
-        if document_path.startswith('/api/v1/doc/document/rfc'):
-            num_rfcs += 1
-        elif document_path.startswith('/api/v1/doc/document/draft-ietf-'):
-            num_wg_drafts += 1
-        elif document_path.startswith('/api/v1/doc/document/draft-'):
-            num_individual_drafts += 1
-    nominee_info['num_documents'] = drafts_data['meta']['total_count']
+    # Only feeds counts shown on the pages, so anything else can go first.
+    for page in iter_pages(url, priority=PRIORITY_LOW):
+        if num_documents is None:
+            num_documents = page['meta']['total_count']
+        for document in page['objects']:
+            document_path = document['document']
+            if document_path.startswith('/api/v1/doc/document/rfc'):
+                num_rfcs += 1
+            elif document_path.startswith('/api/v1/doc/document/draft-ietf-'):
+                num_wg_drafts += 1
+            elif document_path.startswith('/api/v1/doc/document/draft-'):
+                num_individual_drafts += 1
+    nominee_info['num_documents'] = num_documents
     nominee_info['num_individual_drafts'] = num_individual_drafts
     nominee_info['num_wg_drafts'] = num_wg_drafts
     nominee_info['num_rfcs'] = num_rfcs
 
     nominee_info['nominee_id'] = nominee_id
     nominee_info['email'] = email
-    nominee_positions_data = get_nominee_positions(force_metadata=force_metadata)
-    positions = {}
-    for r in nominee['nominee_position']:
-        short_name = get_position_short_name(get_position_name(r, force_metadata=force_metadata))
-        state = 'unknown'
-        for np in nominee_positions_data:
-            if np['nominee'] == nominee['resource_uri'] and np['position'] == r:
-                state = np['state'].split('/')[-2]
-                break
-        positions[short_name] = state
-    nominee_info['positions'] = positions
-
-    os.makedirs(os.path.dirname(nominee_file), exist_ok=True)
-    with open(nominee_file, "w", encoding="utf-8") as f:
-        json.dump(nominee_info, f, indent=4)
+    nominee_info['positions'] = get_positions_for_nominee(nominee, force_metadata=force_metadata)
+
+    save_json(nominee_file, nominee_info, meta={"validated_at": time.time()})
     print(f"Nominee info downloaded and saved to {nominee_file}")
-    NOMINEE_IDS_DOWNLOADED.append(nominee_id)
+    mark_validated(nominee_file)
 
     return nominee_info
 
-def print_info_from_email(email, force_metadata=False):
-    person_id = get_person_id_from_email(email, force_metadata=force_metadata)
+def crawl_nominee_info(nominee_ids, force_metadata=False, jobs=1):
+    """Fetches info for many nominees using up to `jobs` concurrent workers, returned in input order."""
+    # Load the shared lists up front so that workers don't race to download them.
+    load_nominees(force_metadata=force_metadata)
+    get_nominee_positions(force_metadata=force_metadata)
+    get_positions(force_metadata=force_metadata)
+    if jobs <= 1:
+        return [get_nominee_info(nominee_id, force_metadata=force_metadata) for nominee_id in nominee_ids]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(lambda nominee_id: get_nominee_info(nominee_id, force_metadata=force_metadata), nominee_ids))
+
+def _get_id_from_uri(uri):
+    return uri.strip('/').split('/')[-1]
+
+def prefetch_attendance(person_ids, force_metadata=False, jobs=1):
+    """Downloads everything needed to build the attendance timelines of several people.
+
+    The per-person lists are fetched concurrently, and then the sessions,
+    meetings and groups they reference are deduplicated across everyone and
+    fetched in bulk.
+    """
+    person_ids = list(dict.fromkeys(str(person_id) for person_id in person_ids))
+
+    def fetch_person_lists(person_id):
+        return (get_meetings_attended_from_person_id(person_id, force_metadata=force_metadata),
+                get_registrations_from_person_id(person_id, force_metadata=force_metadata))
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        person_lists = list(executor.map(fetch_person_lists, person_ids))
+
+    session_ids = set()
+    meeting_ids = set()
+    for meetings_attended, registrations_data in person_lists:
+        session_ids.update(_get_id_from_uri(session['session']) for session in meetings_attended['objects'])
+        meeting_ids.update(_get_id_from_uri(registration['meeting']) for registration in registrations_data['objects'])
+    prefetch_sessions(session_ids, force_metadata=force_metadata, jobs=jobs)
+
+    group_ids = set()
+    for session_id in session_ids:
+        session_info = get_session_info_from_id(session_id, force_metadata=force_metadata)
+        meeting_ids.add(_get_id_from_uri(session_info['meeting']))
+        group_ids.add(_get_id_from_uri(session_info['group']))
+    prefetch_meetings(meeting_ids, force_metadata=force_metadata, jobs=jobs)
+    prefetch_groups(group_ids, force_metadata=force_metadata, jobs=jobs)
+
+def get_attendance_timeline(person_id, force_metadata=False):
+    """Returns [(meeting_number, groups)] sorted by meeting date, for meetings the person attended or registered for."""
     meetings_attended = get_meetings_attended_from_person_id(person_id, force_metadata=force_metadata)
     registrations_data = get_registrations_from_person_id(person_id, force_metadata=force_metadata)
 
     meetings_data = {}
     for session in meetings_attended['objects']:
-        session_id = session['session'].strip('/').split('/')[-1]
-        session_info = get_session_info_from_id(session_id, force_metadata=force_metadata)
-
-        meeting_id = session_info['meeting'].strip('/').split('/')[-1]
-        group_id = session_info['group'].strip('/').split('/')[-1]
-
-        meeting_info = get_meeting_info_from_id(meeting_id, force_metadata=force_metadata)
-        group_info = get_group_info_from_id(group_id, force_metadata=force_metadata)
+        session_info = get_session_info_from_id(_get_id_from_uri(session['session']), force_metadata=force_metadata)
+        meeting_info = get_meeting_info_from_id(_get_id_from_uri(session_info['meeting']), force_metadata=force_metadata)
+        group_info = get_group_info_from_id(_get_id_from_uri(session_info['group']), force_metadata=force_metadata)
 
         meeting_number = meeting_info['number']
         meeting_date = meeting_info['date']
@@ -296,26 +331,48 @@ def print_info_from_email(email, force_metadata=False):
         meetings_data[meeting_number]['groups'].add(group_info['acronym'])
 
     for registration in registrations_data['objects']:
-        meeting_id = registration['meeting'].strip('/').split('/')[-1]
-        meeting_info = get_meeting_info_from_id(meeting_id, force_metadata=force_metadata)
+        meeting_info = get_meeting_info_from_id(_get_id_from_uri(registration['meeting']), force_metadata=force_metadata)
         meeting_number = meeting_info['number']
         meeting_date = meeting_info['date']
         if meeting_number not in meetings_data:
             meetings_data[meeting_number] = {'date': meeting_date, 'groups': set()}
 
     sorted_meetings = sorted(meetings_data.items(), key=lambda item: item[1]['date'])
-    for meeting_number, details in sorted_meetings:
-        group_str = ', '.join(sorted(list(details['groups'])))
+    return [(meeting_number, sorted(details['groups'])) for meeting_number, details in sorted_meetings]
+
+def _print_attendance_timeline(timeline):
+    for meeting_number, groups in timeline:
+        group_str = ', '.join(groups)
         ietf_str = 'IETF ' if meeting_number.isdigit() else ''
         print(f"{ietf_str}{meeting_number}: {group_str}")
 
-
-def print_nominee_info(force_metadata=False):
+def print_info_from_email(email, force_metadata=False, jobs=1):
+    person_id = get_person_id_from_email(email, force_metadata=force_metadata)
+    prefetch_attendance([person_id], force_metadata=force_metadata, jobs=jobs)
+    _print_attendance_timeline(get_attendance_timeline(person_id, force_metadata=force_metadata))
+
+def print_all_attendance_timelines(force_metadata=False, jobs=1):
+    """Prints the attendance timeline of every active nominee and voting member."""
+    people = []
+    nominee_ids = [nominee['id'] for nominee in get_active_nominees(force_metadata=force_metadata)]
+    for nominee_info in crawl_nominee_info(nominee_ids, force_metadata=force_metadata, jobs=jobs):
+        people.append((nominee_info['name'], str(nominee_info['id'])))
+    member_person_ids = [_get_id_from_uri(member['person']) for member in get_nomcom_group_info(force_metadata=force_metadata) if member['name'].endswith('/member/')]
+    prefetch_persons(member_person_ids, force_metadata=force_metadata, jobs=jobs)
+    for person_id in member_person_ids:
+        people.append((get_person_info_from_id(person_id, force_metadata=force_metadata)['name'], person_id))
+
+    prefetch_attendance([person_id for _, person_id in people], force_metadata=force_metadata, jobs=jobs)
+    for name, person_id in people:
+        print(f"\n{name}:")
+        _print_attendance_timeline(get_attendance_timeline(person_id, force_metadata=force_metadata))
+
+
+def print_nominee_info(force_metadata=False, jobs=1):
     """Prints each nominee and the number of IETF meetings they have attended, sorted in descending order."""
     nominees_data = get_active_nominees(force_metadata=force_metadata)
     nominee_stats = []
-    for nominee in nominees_data:
-        nominee_info = get_nominee_info(nominee['id'], force_metadata=force_metadata)
+    for nominee_info in crawl_nominee_info([nominee['id'] for nominee in nominees_data], force_metadata=force_metadata, jobs=jobs):
         name = nominee_info['name']
         meetings_registered = nominee_info['num_meetings_registered']
         num_documents = nominee_info['num_documents']
@@ -332,24 +389,31 @@ def get_nominee_positions(force_metadata=False):
     if NOMINEE_POSITIONS_DATA:
         return NOMINEE_POSITIONS_DATA
 
-    nominee_positions_file = "data/nominee_positions.json"
-    if not force_metadata and os.path.exists(nominee_positions_file):
-        with open(nominee_positions_file, "r", encoding="utf-8") as f:
-            NOMINEE_POSITIONS_DATA = json.load(f)['objects']
-            return NOMINEE_POSITIONS_DATA
-
-    url = "https://datatracker.ietf.org/api/v1/nomcom/nomineeposition/?limit=4000"
-    response = requests.get(url)
-    response.raise_for_status()  # Raise an exception for HTTP errors
-    nominee_positions_data = response.json()
-
-    os.makedirs(os.path.dirname(nominee_positions_file), exist_ok=True)
-    with open(nominee_positions_file, "w", encoding="utf-8") as f:
-        json.dump(nominee_positions_data, f, indent=4)
-    print(f"Nominee positions data downloaded and saved to {nominee_positions_file}")
+    url = "https://datatracker.ietf.org/api/v1/nomcom/nomineeposition/"
+    nominee_positions_data = get_cached_json(url, "data/nominee_positions.json", "nominee_positions", force_metadata=force_metadata, paginated=True, priority=PRIORITY_HIGH)
     NOMINEE_POSITIONS_DATA = nominee_positions_data['objects']
     return NOMINEE_POSITIONS_DATA
 
+def get_nominee_position_states(nominee_uri, force_metadata=False):
+    """Returns {position_uri: state} for the nominee with the given resource URI."""
+    global NOMINEE_POSITION_STATES
+    if NOMINEE_POSITION_STATES is None:
+        states = {}
+        for np in get_nominee_positions(force_metadata=force_metadata):
+            # If there are duplicate entries for a nominee and position, the first one wins.
+            states.setdefault(np['nominee'], {}).setdefault(np['position'], np['state'].split('/')[-2])
+        NOMINEE_POSITION_STATES = states
+    return NOMINEE_POSITION_STATES.get(nominee_uri, {})
+
+def get_positions_for_nominee(nominee, force_metadata=False):
+    """Returns {position_short_name: state} for a nominee object from the nominees list."""
+    position_states = get_nominee_position_states(nominee['resource_uri'], force_metadata=force_metadata)
+    positions = {}
+    for r in nominee['nominee_position']:
+        short_name = get_position_short_name(get_position_name(r, force_metadata=force_metadata))
+        positions[short_name] = position_states.get(r, 'unknown')
+    return positions
+
 NOMCOM_GROUP_ID = None
 def get_nomcom_group_id(force_metadata=False):
     global NOMCOM_GROUP_ID
@@ -357,21 +421,8 @@ def get_nomcom_group_id(force_metadata=False):
         return NOMCOM_GROUP_ID
 
     nomcom_id = get_nomcom_id()
-    nomcom_group_file = f"data/nomcom_id.json"
-    if not force_metadata and os.path.exists(nomcom_group_file):
-        with open(nomcom_group_file, "r", encoding="utf-8") as f:
-            NOMCOM_GROUP_ID = json.load(f)['group'].strip('/').split('/')[-1]
-            return NOMCOM_GROUP_ID
-
     url = f"https://datatracker.ietf.org/api/v1/nomcom/nomcom/{nomcom_id}/"
-    response = requests.get(url)
-    response.raise_for_status()  # Raise an exception for HTTP errors
-    nomcom_data = response.json()
-
-    os.makedirs(os.path.dirname(nomcom_group_file), exist_ok=True)
-    with open(nomcom_group_file, "w", encoding="utf-8") as f:
-        json.dump(nomcom_data, f, indent=4)
-    print(f"Nomcom group data downloaded and saved to {nomcom_group_file}")
+    nomcom_data = get_cached_json(url, "data/nomcom_id.json", "nomcom", force_metadata=force_metadata, priority=PRIORITY_HIGH)
     NOMCOM_GROUP_ID = nomcom_data['group'].strip('/').split('/')[-1]
     return NOMCOM_GROUP_ID
 
@@ -382,33 +433,17 @@ def get_nomcom_group_info(force_metadata=False):
         return NOMCOM_GROUP_INFO_DATA
 
     nomcom_group_id = get_nomcom_group_id(force_metadata=force_metadata)
-    nomcom_group_info_file = f"data/nomcom_group_info.json"
-    if not force_metadata and os.path.exists(nomcom_group_info_file):
-        with open(nomcom_group_info_file, "r", encoding="utf-8") as f:
-            NOMCOM_GROUP_INFO_DATA = json.load(f)['objects']
-            return NOMCOM_GROUP_INFO_DATA
-
-    url = f"https://datatracker.ietf.org/api/v1/group/role/?group={nomcom_group_id}&limit=1000"
-    response = requests.get(url)
-    response.raise_for_status()  # Raise an exception for HTTP errors
-    nomcom_group_info_data = response.json()
-
-    os.makedirs(os.path.dirname(nomcom_group_info_file), exist_ok=True)
-    with open(nomcom_group_info_file, "w", encoding="utf-8") as f:
-        json.dump(nomcom_group_info_data, f, indent=4)
-    print(f"Nomcom group info data downloaded and saved to {nomcom_group_info_file}")
+    url = f"https://datatracker.ietf.org/api/v1/group/role/?group={nomcom_group_id}"
+    nomcom_group_info_data = get_cached_json(url, "data/nomcom_group_info.json", "nomcom_group_info", force_metadata=force_metadata, paginated=True, priority=PRIORITY_HIGH)
     NOMCOM_GROUP_INFO_DATA = nomcom_group_info_data['objects']
     return NOMCOM_GROUP_INFO_DATA
 
 def get_random_voting_members(force_metadata=False):
     """Gets the list of voting members and returns them in a random order."""
     nomcom_group_info = get_nomcom_group_info(force_metadata=force_metadata)
-    voting_members = []
-    for member in nomcom_group_info:
-        if member['name'].endswith('/member/'):
-            person_id = member['person'].strip('/').split('/')[-1]
-            person_info = get_person_info_from_id(person_id, force_metadata=force_metadata)
-            voting_members.append(person_info['name'])
+    member_person_ids = [_get_id_from_uri(member['person']) for member in nomcom_group_info if member['name'].endswith('/member/')]
+    prefetch_persons(member_person_ids, force_metadata=force_metadata)
+    voting_members = [get_person_info_from_id(person_id, force_metadata=force_metadata)['name'] for person_id in member_person_ids]
     random.shuffle(voting_members)
     return voting_members
 
@@ -426,22 +461,19 @@ def is_email_in_nomcom(email, force_metadata=False):
 
 
 def get_active_nominees(force_metadata=False):
+    """Returns the nominees who accepted at least one nomination.
+
+    This only needs the nominee and nomineeposition lists, so that full
+    nominee info is only fetched for nominees who are actually active.
+    """
     global ACTIVE_NOMINEES_DATA
     if ACTIVE_NOMINEES_DATA:
         return ACTIVE_NOMINEES_DATA
 
-    nominees = load_nominees(force_metadata=force_metadata)
     active_nominees = []
-    for nominee in nominees:
-        nominee_info = get_nominee_info(nominee['id'], force_metadata=force_metadata)
-        if not nominee_info['positions']:
-            continue
-        has_accepted = False
-        for state in nominee_info['positions'].values():
-            if state == 'accepted':
-                has_accepted = True
-                break
-        if has_accepted:
+    for nominee in load_nominees(force_metadata=force_metadata):
+        positions = get_positions_for_nominee(nominee, force_metadata=force_metadata)
+        if 'accepted' in positions.values():
             active_nominees.append(nominee)
 
     ACTIVE_NOMINEES_DATA = active_nominees
@@ -454,8 +486,8 @@ def get_nominees_by_position(force_metadata=False):
         return NOMINEES_BY_POSITION_DATA
     NOMINEES_BY_POSITION_DATA = {}
     for nominee in get_active_nominees(force_metadata=force_metadata):
-        nominee_info = get_nominee_info(nominee['id'], force_metadata=force_metadata)
-        for position, state in nominee_info['positions'].items():
+        positions = get_positions_for_nominee(nominee, force_metadata=force_metadata)
+        for position, state in positions.items():
             if state == 'accepted':
                 if position not in NOMINEES_BY_POSITION_DATA:
                     NOMINEES_BY_POSITION_DATA[position] = []
@@ -470,20 +502,25 @@ if __name__ == "__main__":
     parser.add_argument("--by-position", action="store_true", help="Print nominees by position.")
     parser.add_argument("--random-voting-members", action="store_true", help="Print a randomized list of voting members.")
     parser.add_argument("--email", help="Get info about a specific email address")
+    parser.add_argument("--all-timelines", action="store_true", help="Print the meeting attendance of every nominee and voting member.")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="Number of concurrent metadata downloads")
     parser.add_argument("nominee_id", nargs='?', help="Get info about a specific nominee")
     args = parser.parse_args()
 
     if args.info:
-        print_nominee_info(force_metadata=args.force_metadata)
+        print_nominee_info(force_metadata=args.force_metadata, jobs=args.jobs)
     elif args.by_position:
         print(json.dumps(get_nominees_by_position(force_metadata=args.force_metadata), indent=4))
     elif args.random_voting_members:
         print(json.dumps(get_random_voting_members(force_metadata=args.force_metadata), indent=4))
     elif args.email:
-        print_info_from_email(args.email, force_metadata=args.force_metadata)
+        print_info_from_email(args.email, force_metadata=args.force_metadata, jobs=args.jobs)
+    elif args.all_timelines:
+        print_all_attendance_timelines(force_metadata=args.force_metadata, jobs=args.jobs)
     elif args.nominee_id:
         print(json.dumps(get_nominee_info(args.nominee_id, force_metadata=args.force_metadata), indent=4))
     else:
-        for nominee in load_nominees(force_metadata=args.force_metadata):
-            get_nominee_info(nominee['id'], force_metadata=args.force_metadata)
+        nominee_ids = [nominee['id'] for nominee in load_nominees(force_metadata=args.force_metadata)]
+        crawl_nominee_info(nominee_ids, force_metadata=args.force_metadata, jobs=args.jobs)
         get_nominee_positions(force_metadata=args.force_metadata)
+    flush_email_index()
@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 import argparse
-import requests
-import json
-import os
+from http_cache import get_cached_json
+from rate_limiter import PRIORITY_HIGH
 
 POSITIONS_DATA = None
+POSITIONS_BY_URI = None
 TOPICS_DATA = None
+TOPIC_IDS_BY_POSITION_NAME = {}
 
 POSITION_SHORT_NAMES = {
     "Applications and Real Time (ART) AD": "ART",
@@ -20,6 +21,9 @@ POSITION_SHORT_NAMES = {
     "Security (SEC) AD": "SEC",
     "Web and Internet Transport (WIT) AD": "WIT"
 }
+POSITION_FULL_NAMES = {}
+for full_name, short_name in POSITION_SHORT_NAMES.items():
+    POSITION_FULL_NAMES.setdefault(short_name, full_name)
 
 def get_nomcom_id():
     return 16
@@ -28,32 +32,16 @@ def get_position_short_name(name):
     return POSITION_SHORT_NAMES.get(name, name)
 
 def get_position_full_name(short_name):
-    for full_name, s_name in POSITION_SHORT_NAMES.items():
-        if s_name == short_name:
-            return full_name
-    return None
+    return POSITION_FULL_NAMES.get(short_name)
 
 def get_positions(force_metadata=False):
     global POSITIONS_DATA
     if POSITIONS_DATA:
         return POSITIONS_DATA
 
-    positions_file = "data/positions.json"
-    if not force_metadata and os.path.exists(positions_file):
-        with open(positions_file, "r", encoding="utf-8") as f:
-            POSITIONS_DATA = json.load(f)['objects']
-            return POSITIONS_DATA
-
     nomcom_id = get_nomcom_id()
-    url = f"https://datatracker.ietf.org/api/v1/nomcom/position/?nomcom={nomcom_id}&limit=1000"
-    response = requests.get(url)
-    response.raise_for_status()  # Raise an exception for HTTP errors
-    positions_data = response.json()
-
-    os.makedirs(os.path.dirname(positions_file), exist_ok=True)
-    with open(positions_file, "w", encoding="utf-8") as f:
-        json.dump(positions_data, f, indent=4)
-    print(f"Positions data downloaded and saved to {positions_file}")
+    url = f"https://datatracker.ietf.org/api/v1/nomcom/position/?nomcom={nomcom_id}"
+    positions_data = get_cached_json(url, "data/positions.json", "positions", force_metadata=force_metadata, paginated=True, priority=PRIORITY_HIGH)
     POSITIONS_DATA = positions_data['objects']
     return POSITIONS_DATA
 
@@ -62,33 +50,27 @@ def get_topics(force_metadata=False):
     if TOPICS_DATA:
         return TOPICS_DATA
 
-    topics_file = "data/topics.json"
-    if not force_metadata and os.path.exists(topics_file):
-        with open(topics_file, "r", encoding="utf-8") as f:
-            TOPICS_DATA = json.load(f)['objects']
-            return TOPICS_DATA
-
     nomcom_id = get_nomcom_id()
-    url = f"https://datatracker.ietf.org/api/v1/nomcom/topic/?nomcom={nomcom_id}&limit=1000"
-    response = requests.get(url)
-    response.raise_for_status()  # Raise an exception for HTTP errors
-    topics_data = response.json()
-
-    os.makedirs(os.path.dirname(topics_file), exist_ok=True)
-    with open(topics_file, "w", encoding="utf-8") as f:
-        json.dump(topics_data, f, indent=4)
-    print(f"Topics data downloaded and saved to {topics_file}")
+    url = f"https://datatracker.ietf.org/api/v1/nomcom/topic/?nomcom={nomcom_id}"
+    topics_data = get_cached_json(url, "data/topics.json", "topics", force_metadata=force_metadata, paginated=True, priority=PRIORITY_HIGH)
     TOPICS_DATA = topics_data['objects']
     return TOPICS_DATA
 
 def get_position_name(resource_uri, force_metadata=False):
-    positions = get_positions(force_metadata=force_metadata)
-    for position in positions:
-        if position['resource_uri'] == resource_uri:
-            return position['name']
-    return None
+    global POSITIONS_BY_URI
+    if POSITIONS_BY_URI is None:
+        POSITIONS_BY_URI = {}
+        for position in get_positions(force_metadata=force_metadata):
+            POSITIONS_BY_URI.setdefault(position['resource_uri'], position)
+    position = POSITIONS_BY_URI.get(resource_uri)
+    return position['name'] if position else None
 
 def get_topic_id_from_position_name(position_full_name, force_metadata=False):
+    if position_full_name not in TOPIC_IDS_BY_POSITION_NAME:
+        TOPIC_IDS_BY_POSITION_NAME[position_full_name] = _find_topic_id_for_position_name(position_full_name, force_metadata=force_metadata)
+    return TOPIC_IDS_BY_POSITION_NAME[position_full_name]
+
+def _find_topic_id_for_position_name(position_full_name, force_metadata=False):
     topics = get_topics(force_metadata=force_metadata)
     for topic in topics:
         if position_full_name in topic['subject']:
@@ -0,0 +1,117 @@
+import heapq
+import itertools
+import threading
+import time
+from urllib.parse import urlsplit
+from tracing import count
+
+# Paces all datatracker traffic with one token bucket per budget: the public
+# API, and the private NomCom pages that use the session cookie, which are
+# much more sensitive since throttling there can lock the session out. When
+# several requests are waiting for the same budget, the one with the best
+# priority goes first, so that list requests which unblock many others aren't
+# stuck behind them.
+#
+# Rates adapt AIMD-style: a 429 or 503 halves the rate, and fast successful
+# responses raise it additively, by about `increase` requests per second for
+# every second of fast responses, up to max_rate.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+# Responses faster than this (in seconds) let the rate grow.
+FAST_LATENCY = 1.0
+THROTTLE_STATUS_CODES = (429, 503)
+
+BUDGETS = {
+    "api": {"rate": 10.0, "min_rate": 1.0, "max_rate": 50.0, "increase": 1.0, "burst": 20.0},
+    "private": {"rate": 2.0, "min_rate": 0.2, "max_rate": 5.0, "increase": 0.2, "burst": 4.0},
+}
+for _budget in BUDGETS.values():
+    _budget.update({"tokens": _budget["burst"], "updated": time.monotonic(), "waiters": []})
+
+RATE_LIMIT_CONDITION = threading.Condition()
+WAITER_SEQUENCE = itertools.count()
+RATE_LIMIT_STATS = {name: {"requests": 0, "waited": 0.0, "max_wait": 0.0, "max_queue_depth": 0, "throttled": 0} for name in BUDGETS}
+
+
+def configure_rate_limits(api_rate=None, private_rate=None):
+    """Sets the initial and maximum requests per second of each budget. A rate of 0 disables pacing."""
+    with RATE_LIMIT_CONDITION:
+        for name, rate in (("api", api_rate), ("private", private_rate)):
+            if rate is None:
+                continue
+            budget = BUDGETS[name]
+            budget["rate"] = rate
+            budget["max_rate"] = rate
+            budget["min_rate"] = min(budget["min_rate"], rate)
+
+
+def get_budget(url):
+    """Returns the name of the budget that requests to url are paced by."""
+    return "private" if "/private/" in urlsplit(url).path else "api"
+
+
+def _refill(budget):
+    now = time.monotonic()
+    budget["tokens"] = min(budget["burst"], budget["tokens"] + (now - budget["updated"]) * budget["rate"])
+    budget["updated"] = now
+
+
+def acquire(name, priority=PRIORITY_NORMAL):
+    """Blocks until a request can be sent within the named budget."""
+    budget = BUDGETS[name]
+    stats = RATE_LIMIT_STATS[name]
+    start = time.monotonic()
+    with RATE_LIMIT_CONDITION:
+        if budget["rate"] <= 0:
+            stats["requests"] += 1
+            return
+        waiter = (priority, next(WAITER_SEQUENCE))
+        heapq.heappush(budget["waiters"], waiter)
+        queue_depth = len(budget["waiters"])
+        while True:
+            _refill(budget)
+            if budget["waiters"][0] == waiter:
+                if budget["tokens"] >= 1:
+                    break
+                RATE_LIMIT_CONDITION.wait((1 - budget["tokens"]) / budget["rate"])
+            else:
+                # Woken up whenever the head of the queue changes.
+                RATE_LIMIT_CONDITION.wait()
+        heapq.heappop(budget["waiters"])
+        budget["tokens"] -= 1
+        RATE_LIMIT_CONDITION.notify_all()
+        waited = time.monotonic() - start
+        stats["requests"] += 1
+        stats["waited"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+        stats["max_queue_depth"] = max(stats["max_queue_depth"], queue_depth)
+    count("ratelimit.wait", waited, budget=name, priority=priority)
+    count("ratelimit.queue_depth", queue_depth, budget=name)
+
+
+def report_response(name, status_code, latency):
+    """Adapts the rate of the named budget to how datatracker responded."""
+    budget = BUDGETS[name]
+    with RATE_LIMIT_CONDITION:
+        if budget["rate"] <= 0:
+            return
+        if status_code in THROTTLE_STATUS_CODES:
+            budget["rate"] = max(budget["min_rate"], budget["rate"] / 2)
+            # Don't let saved-up tokens send a burst right after being throttled.
+            budget["tokens"] = min(budget["tokens"], 0)
+            RATE_LIMIT_STATS[name]["throttled"] += 1
+            print(f"Datatracker is throttling {name} requests, slowing down to {budget['rate']:.1f}/s")
+        elif status_code < 400 and latency < FAST_LATENCY:
+            budget["rate"] = min(budget["max_rate"], budget["rate"] + budget["increase"] / budget["rate"])
+    count("ratelimit.rate", budget["rate"], budget=name)
+
+
+def print_rate_limit_stats():
+    with RATE_LIMIT_CONDITION:
+        for name, stats in RATE_LIMIT_STATS.items():
+            if not stats["requests"]:
+                continue
+            rate = BUDGETS[name]["rate"]
+            rate_str = f"{rate:.1f}/s" if rate > 0 else "unlimited"
+            print(f"Rate limit ({name}): {stats['requests']} requests, {stats['waited']:.1f}s waited (max {stats['max_wait']:.1f}s), max queue depth {stats['max_queue_depth']}, throttled {stats['throttled']} times, now {rate_str}")
@@ -2,12 +2,20 @@
 
 import argparse
 import os
+from build_state import flush_build_state, set_explain
 from feedback import save_all_html_feedback
-from feedback_parser import parse_all_feedback
+from feedback_parser import PARSER_BACKEND, PARSER_BACKENDS, parse_all_feedback, set_parser_backend
+from cassette import start_recording, start_replaying
+from doc_cache import print_doc_cache_stats
+from email_index import flush_email_index
 from format import run_formatting
-from nominees import get_active_nominees, get_nominee_info, get_nominee_positions
+from http_cache import print_cache_stats
+from http_client import configure_http, print_http_stats, set_datatracker_url
+from nominees import crawl_nominee_info, get_active_nominees, get_nominee_positions
 from positions import get_positions, get_topics
+from rate_limiter import configure_rate_limits
 from summarize import are_summaries_enabled, run_summarize
+from tracing import span, start_tracing
 
 
 if __name__ == "__main__":
@@ -20,8 +28,39 @@ if __name__ == "__main__":
     parser.add_argument("-a", "--force-all", action="store_true", help="Get latest feedback and redo subsequent operations")
     parser.add_argument("-x", "--add-summaries", action='store_const', const=True, default=None, dest="summaries_forced", help="[BETA] Add summarization even if disabled")
     parser.add_argument("-z", "--no-summaries", action='store_const', const=False, default=None, dest="summaries_forced", help="Disable summarization even if enabled")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="Number of concurrent metadata and feedback downloads, and of feedback parsing processes")
+    parser.add_argument("--http-timeout", type=float, default=None, help="Timeout in seconds for each HTTP request")
+    parser.add_argument("--http-retries", type=int, default=None, help="Number of retries for failed HTTP requests")
+    parser.add_argument("--page-size", type=int, default=None, help="Number of objects to request per page from datatracker list endpoints")
+    parser.add_argument("--api-rate", type=float, default=None, help="Requests per second to the datatracker API, 0 for unlimited")
+    parser.add_argument("--private-rate", type=float, default=None, help="Requests per second to the private NomCom pages, 0 for unlimited")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print each retried HTTP request")
+    parser.add_argument("--record", metavar="CASSETTE", help="Record all HTTP exchanges into a cassette file")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Serve all HTTP requests from a previously recorded cassette file")
+    parser.add_argument("--replay-latency", type=float, default=0, help="Milliseconds of latency to add to each replayed request")
+    parser.add_argument("--datatracker-url", help="Send datatracker requests to this URL instead, e.g. a local fake_datatracker.py")
+    parser.add_argument("--trace-report", metavar="FILE", help="Write spans and metrics of this run to a JSON lines file")
+    parser.add_argument("--chrome-trace", metavar="FILE", help="Also write the spans in Chrome trace event format, requires --trace-report")
+    parser.add_argument("--parser", choices=PARSER_BACKENDS, default=PARSER_BACKEND, help="HTML parser to extract feedback with")
+    parser.add_argument("--explain", action="store_true", help="Print why each page, parsed file, summary and output page gets redone")
     args = parser.parse_args()
 
+    if args.chrome_trace and not args.trace_report:
+        parser.error("--chrome-trace requires --trace-report")
+    if args.trace_report:
+        start_tracing(args.trace_report, chrome_trace_file=args.chrome_trace)
+
+    if args.datatracker_url:
+        set_datatracker_url(args.datatracker_url)
+    if args.record:
+        start_recording(args.record)
+    elif args.replay:
+        start_replaying(args.replay, latency=args.replay_latency / 1000)
+    configure_http(timeout=args.http_timeout, max_retries=args.http_retries, page_size=args.page_size, verbose=args.verbose)
+    configure_rate_limits(api_rate=args.api_rate, private_rate=args.private_rate)
+    set_parser_backend(args.parser)
+    set_explain(args.explain)
+
     if args.force_all:
         args.force_feedback = True
         args.force_parse = True
@@ -37,23 +76,38 @@ if __name__ == "__main__":
 
     if not nominee_id and not position_short_name:
         print("Getting positions and topics...")
-        get_positions(force_metadata=args.force_metadata)
-        get_topics(force_metadata=args.force_metadata)
-        get_nominee_positions(force_metadata=args.force_metadata)
+        with span("stage.positions"):
+            get_positions(force_metadata=args.force_metadata)
+            get_topics(force_metadata=args.force_metadata)
+            get_nominee_positions(force_metadata=args.force_metadata)
         print("Getting nominees...")
-        for nominee in get_active_nominees(force_metadata=args.force_metadata):
-            nominee_info = get_nominee_info(nominee['id'], force_metadata=args.force_metadata)
+        with span("stage.metadata"):
+            active_nominee_ids = [nominee['id'] for nominee in get_active_nominees(force_metadata=args.force_metadata)]
+            crawl_nominee_info(active_nominee_ids, force_metadata=args.force_metadata, jobs=args.jobs)
+            flush_email_index()
         print("Saving feedback...")
-        save_all_html_feedback(force_metadata=args.force_metadata, force_feedback=args.force_feedback)
+        with span("stage.feedback"):
+            save_all_html_feedback(force_metadata=args.force_metadata, force_feedback=args.force_feedback, jobs=args.jobs)
         print("Parsing feedback...")
-        parse_all_feedback(force_metadata=args.force_metadata, force_feedback=args.force_feedback, force_parse=args.force_parse)
+        with span("stage.parse"):
+            parse_all_feedback(force_metadata=args.force_metadata, force_feedback=args.force_feedback, force_parse=args.force_parse, jobs=args.jobs)
+            flush_email_index()
+            flush_build_state()
         if are_summaries_enabled(summaries_forced=args.summaries_forced):
             print("Summarizing feedback...")
-            run_summarize(nominee_id=None, position=None, force_metadata=args.force_metadata, force_feedback=args.force_feedback, force_parse=args.force_parse, redo_summaries=args.redo_summaries, summaries_forced=args.summaries_forced)
+            with span("stage.summarize"):
+                run_summarize(nominee_id=None, position=None, force_metadata=args.force_metadata, force_feedback=args.force_feedback, force_parse=args.force_parse, redo_summaries=args.redo_summaries, summaries_forced=args.summaries_forced)
         print("Formatting feedback...")
 
-    run_formatting(nominee_id=nominee_id, position_short_name=position_short_name, force_metadata=args.force_metadata, force_feedback=args.force_feedback, force_parse=args.force_parse, redo_summaries=args.redo_summaries, summaries_forced=args.summaries_forced)
+    with span("stage.format"):
+        run_formatting(nominee_id=nominee_id, position_short_name=position_short_name, force_metadata=args.force_metadata, force_feedback=args.force_feedback, force_parse=args.force_parse, redo_summaries=args.redo_summaries, summaries_forced=args.summaries_forced)
+
+    flush_email_index()
+    flush_build_state()
 
+    print_http_stats()
+    print_cache_stats()
+    print_doc_cache_stats()
     print(f"\nDone. You can now navigate to the result at:\n")
     output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "output")
     index_path = os.path.join(output_dir, "index.html")
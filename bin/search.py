@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+from collections import Counter
+import feedback_corpus
+from feedback_corpus import iter_corpus_lines, read_corpus_row
+from positions import get_position_short_name, get_positions, get_topic_id_from_position_name
+from storage import data_file_exists, read_data_json, write_data_json
+from tracing import count, span
+
+# An inverted index of all the feedback and questionnaires in the corpus,
+# updated from where it last stopped reading the corpus. It is split into
+# files so that a query only reads what it needs, both here and in the
+# static search page, which loads the same files as scripts:
+#   meta.json         counts and tables, and how far the corpus was indexed
+#   terms_NN.json     {term: [[doc_id, term_count], ...]} for terms whose hash falls in shard NN
+#   docs_NNNN.json    {doc_id: doc} for DOC_BLOCK_SIZE consecutive documents
+# A doc is {"k": "f" for feedback or "q" for a questionnaire, "n": nominee_id,
+# "t": topic_id, "p": [positions], "a": author, "d": date, "l": number of
+# terms, "o": offset of its row in the corpus, "s": start of the text}.
+SEARCH_INDEX_DIR = "data/search_index"
+SEARCH_OUTPUT_DIR = "output/search"
+# Bump when the index format or tokenization changes, to rebuild it.
+SEARCH_INDEX_VERSION = 1
+NUM_SHARDS = 64
+DOC_BLOCK_SIZE = 1000
+SNIPPET_LENGTH = 300
+# Standard BM25 parameters.
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Letters and digits, which the search page matches with /[\p{L}\p{N}]+/gu.
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+SEARCH_INDEX_LOCK = threading.Lock()
+# Index files loaded by this process, and those that need to be written.
+LOADED_FILES = {}
+DIRTY_FILES = set()
+TOPIC_POSITIONS = None
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(unicodedata.normalize("NFC", text).lower())
+
+
+def get_shard(term):
+    """Returns the shard of term, with a 32-bit FNV-1a hash that's easy to compute in the search page too."""
+    term_hash = 0x811c9dc5
+    for byte in term.encode("utf-8"):
+        term_hash = ((term_hash ^ byte) * 0x01000193) & 0xffffffff
+    return term_hash % NUM_SHARDS
+
+
+def _get_terms_file_name(shard):
+    return f"terms_{shard:02d}"
+
+
+def _get_docs_file_name(doc_id):
+    return f"docs_{doc_id // DOC_BLOCK_SIZE:04d}"
+
+
+def _load_index_file(name):
+    if name not in LOADED_FILES:
+        path = os.path.join(SEARCH_INDEX_DIR, f"{name}.json")
+        LOADED_FILES[name] = read_data_json(path) if data_file_exists(path) else {}
+    return LOADED_FILES[name]
+
+
+def _get_meta():
+    meta = _load_index_file("meta")
+    if not meta:
+        meta.update({
+            "version": SEARCH_INDEX_VERSION,
+            "corpus": {"inode": None, "offset": 0, "last_line_offset": 0, "last_line": None},
+            "num_docs": 0,
+            "next_doc_id": 0,
+            "total_length": 0,
+            "num_shards": NUM_SHARDS,
+            "doc_block_size": DOC_BLOCK_SIZE,
+            "snippet_length": SNIPPET_LENGTH,
+            "authors": {},
+            "positions": {},
+            "nominees": {},
+            "questionnaire_docs": {},
+        })
+    return meta
+
+
+def _clear_index():
+    LOADED_FILES.clear()
+    DIRTY_FILES.clear()
+    if os.path.isdir(SEARCH_INDEX_DIR):
+        shutil.rmtree(SEARCH_INDEX_DIR)
+
+
+def _get_topic_positions(topic_id):
+    global TOPIC_POSITIONS
+    if TOPIC_POSITIONS is None:
+        TOPIC_POSITIONS = {}
+        for position in get_positions():
+            topic_id_for_position = get_topic_id_from_position_name(position["name"])
+            TOPIC_POSITIONS.setdefault(topic_id_for_position, []).append(get_position_short_name(position["name"]))
+    return TOPIC_POSITIONS.get(topic_id, [])
+
+
+def _add_doc(meta, doc, text):
+    doc_id = meta["next_doc_id"]
+    meta["next_doc_id"] += 1
+    terms = tokenize(text)
+    doc["l"] = len(terms)
+    doc["s"] = text[:SNIPPET_LENGTH]
+    _load_index_file(_get_docs_file_name(doc_id))[str(doc_id)] = doc
+    DIRTY_FILES.add(_get_docs_file_name(doc_id))
+    for term, term_count in Counter(terms).items():
+        name = _get_terms_file_name(get_shard(term))
+        _load_index_file(name).setdefault(term, []).append([doc_id, term_count])
+        DIRTY_FILES.add(name)
+    meta["num_docs"] += 1
+    meta["total_length"] += len(terms)
+    return doc_id
+
+
+def _remove_doc(meta, doc_id):
+    docs = _load_index_file(_get_docs_file_name(doc_id))
+    doc = docs.pop(str(doc_id))
+    DIRTY_FILES.add(_get_docs_file_name(doc_id))
+    text = read_corpus_row(doc["o"])[3]
+    for term in set(tokenize(text)):
+        name = _get_terms_file_name(get_shard(term))
+        postings = _load_index_file(name)
+        postings[term] = [posting for posting in postings[term] if posting[0] != doc_id]
+        if not postings[term]:
+            del postings[term]
+        DIRTY_FILES.add(name)
+    meta["num_docs"] -= 1
+    meta["total_length"] -= doc["l"]
+
+
+def _index_row(meta, offset, row):
+    kind = row[0]
+    if kind == "a":
+        meta["authors"][str(row[1])] = row[2]
+    elif kind == "p":
+        meta["positions"][str(row[1])] = row[2]
+    elif kind == "n":
+        meta["nominees"][str(row[1])] = row[2]
+    elif kind == "e":
+        _, nominee_id, topic_id, position_id, author_id, date, _, subject, feedback = row
+        positions = [meta["positions"][str(position_id)]] if position_id is not None else _get_topic_positions(topic_id)
+        doc = {"k": "f", "n": nominee_id, "t": topic_id, "p": positions, "a": meta["authors"][str(author_id)], "d": date, "o": offset}
+        _add_doc(meta, doc, f"{subject}\n{feedback}" if subject else feedback)
+    elif kind == "q":
+        _, nominee_id, position_id, text = row
+        key = f"{nominee_id}:{position_id}"
+        if key in meta["questionnaire_docs"]:
+            _remove_doc(meta, meta["questionnaire_docs"].pop(key))
+        if text is not None:
+            doc = {"k": "q", "n": nominee_id, "t": None, "p": [meta["positions"][str(position_id)]], "a": meta["nominees"].get(str(nominee_id)), "d": "", "o": offset}
+            meta["questionnaire_docs"][key] = _add_doc(meta, doc, text)
+
+
+def _hash_line(line):
+    return hashlib.sha256(line).hexdigest()[:16]
+
+
+def _is_index_current(meta):
+    """Returns whether the corpus still starts with what was indexed, i.e. whether it was only appended to since."""
+    corpus = meta["corpus"]
+    if meta["version"] != SEARCH_INDEX_VERSION:
+        return False
+    corpus_file = feedback_corpus.CORPUS_FILE
+    if not os.path.exists(corpus_file):
+        return corpus["offset"] == 0
+    stat = os.stat(corpus_file)
+    if corpus["offset"] == 0:
+        return True
+    if corpus["inode"] != stat.st_ino or corpus["offset"] > stat.st_size:
+        return False
+    # Inodes get reused, so also check that the last indexed line is still where it was.
+    with open(corpus_file, "rb") as f:
+        f.seek(corpus["last_line_offset"])
+        return _hash_line(f.read(corpus["offset"] - corpus["last_line_offset"])) == corpus["last_line"]
+
+
+def update_search_index():
+    """Indexes what was added to the corpus since the last update, or everything if it was rewritten."""
+    with SEARCH_INDEX_LOCK, span("search_index"):
+        meta = _get_meta()
+        if not _is_index_current(meta):
+            print("Rebuilding the search index")
+            _clear_index()
+            meta = _get_meta()
+        start = meta["corpus"]["offset"]
+        num_rows = 0
+        for offset, line in iter_corpus_lines(start=start):
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # Overwritten by a later line after an interrupted write.
+                row = None
+            if row:
+                _index_row(meta, offset, row)
+                num_rows += 1
+            meta["corpus"].update(offset=offset + len(line), last_line_offset=offset, last_line=_hash_line(line))
+        if os.path.exists(feedback_corpus.CORPUS_FILE):
+            meta["corpus"]["inode"] = os.stat(feedback_corpus.CORPUS_FILE).st_ino
+        count("search.indexed_rows", num_rows)
+        if meta["corpus"]["offset"] != start or not data_file_exists(os.path.join(SEARCH_INDEX_DIR, "meta.json")):
+            DIRTY_FILES.add("meta")
+        for name in sorted(DIRTY_FILES):
+            write_data_json(os.path.join(SEARCH_INDEX_DIR, f"{name}.json"), LOADED_FILES[name])
+        DIRTY_FILES.clear()
+        if num_rows:
+            print(f"Indexed {num_rows} new corpus rows, {meta['num_docs']} documents in the search index")
+
+
+def _iter_index_file_names():
+    if not os.path.isdir(SEARCH_INDEX_DIR):
+        return
+    for file_name in sorted(os.listdir(SEARCH_INDEX_DIR)):
+        name = file_name.split(".json")[0]
+        if file_name.startswith(("meta.", "terms_", "docs_")) and not file_name.endswith(".tmp"):
+            yield name
+
+
+def export_search_index(output_dir=SEARCH_OUTPUT_DIR):
+    """Writes the index as scripts the search page can load, even from a file:// URL."""
+    names = set(_iter_index_file_names())
+    os.makedirs(output_dir, exist_ok=True)
+    for file_name in os.listdir(output_dir):
+        if file_name.endswith(".js") and file_name[:-len(".js")] not in names:
+            os.remove(os.path.join(output_dir, file_name))
+    written = 0
+    for name in sorted(names):
+        content = f"searchIndexLoaded({json.dumps(name)}, {json.dumps(read_data_json(os.path.join(SEARCH_INDEX_DIR, f'{name}.json')), separators=(',', ':'))});\n"
+        output_file = os.path.join(output_dir, f"{name}.js")
+        if os.path.exists(output_file):
+            with open(output_file, "r", encoding="utf-8") as f:
+                if f.read() == content:
+                    continue
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write(content)
+        written += 1
+    count("search.exported_files", written)
+
+
+def search(query, position=None, limit=10):
+    """Returns up to limit (score, doc_id, doc) for the documents containing all the terms of query, best first."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    with SEARCH_INDEX_LOCK:
+        meta = _get_meta()
+        postings_by_term = [dict(_load_index_file(_get_terms_file_name(get_shard(term))).get(term, [])) for term in terms]
+        doc_ids = set(postings_by_term[0]) if postings_by_term else set()
+        for postings in postings_by_term[1:]:
+            doc_ids &= set(postings)
+        docs = {doc_id: _load_index_file(_get_docs_file_name(doc_id))[str(doc_id)] for doc_id in doc_ids}
+    if position:
+        position = position.upper()
+        docs = {doc_id: doc for doc_id, doc in docs.items() if position in (p.upper() for p in doc["p"])}
+    num_docs = max(meta["num_docs"], 1)
+    average_length = meta["total_length"] / num_docs or 1
+    results = []
+    for doc_id, doc in docs.items():
+        score = 0
+        for postings in postings_by_term:
+            document_frequency = len(postings)
+            idf = math.log(1 + (num_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+            term_count = postings[doc_id]
+            score += idf * term_count * (BM25_K1 + 1) / (term_count + BM25_K1 * (1 - BM25_B + BM25_B * doc["l"] / average_length))
+        results.append((score, doc_id, doc))
+    results.sort(key=lambda result: (-result[0], result[1]))
+    return results[:limit]
+
+
+def _get_snippet(text, terms, width=100):
+    """Returns the part of text around the first match of any of terms."""
+    lowered = unicodedata.normalize("NFC", text).lower()
+    starts = [match.start() for term in terms for match in [re.search(rf"(?<![^\W_]){re.escape(term)}(?![^\W_])", lowered)] if match]
+    start = max(min(starts, default=0) - width // 2, 0)
+    snippet = " ".join(text[start:start + width].split())
+    return ("..." if start > 0 else "") + snippet + ("..." if start + width < len(text) else "")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Search all the parsed feedback and questionnaires.')
+    parser.add_argument("query", nargs="?", help="Words that must all appear, e.g. \"shepherding\"")
+    parser.add_argument("--position", help="Only search feedback about this position, e.g. SEC")
+    parser.add_argument("-n", "--limit", type=int, default=10, help="Number of results to show")
+    parser.add_argument("--update", action="store_true", help="Index what was parsed since the index was last updated first")
+    args = parser.parse_args()
+
+    if args.update or not data_file_exists(os.path.join(SEARCH_INDEX_DIR, "meta.json")):
+        update_search_index()
+    if not args.query:
+        parser.exit()
+    start_time = time.perf_counter()
+    search_results = search(args.query, position=args.position, limit=args.limit)
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    meta = _get_meta()
+    for result_score, result_doc_id, result_doc in search_results:
+        row = read_corpus_row(result_doc["o"])
+        text = row[3] if result_doc["k"] == "q" else row[8]
+        about = meta["nominees"].get(str(result_doc["n"])) if result_doc["n"] is not None else f"topic {result_doc['t']}"
+        kind = "questionnaire" if result_doc["k"] == "q" else f"feedback from {result_doc['a']} on {result_doc['d']}"
+        print(f"{result_score:6.2f}  {about} ({', '.join(result_doc['p'])}), {kind}")
+        print(f"        {_get_snippet(text, tokenize(args.query))}")
+    print(f"{len(search_results)} results in {elapsed_ms:.1f} ms")
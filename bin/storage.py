@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+import argparse
+import gzip
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+# Raw feedback pages and cached JSON compress about 10x, so they can be
+# stored gzipped as "<path>.gz" by selecting "gzip" in STORAGE_SETTINGS_FILE,
+# which --migrate does. Files are stored uncompressed by default, so that
+# they stay readable by other tools. Callers always refer to the plain path:
+# readers accept either form, and writers use the configured one and remove
+# the other, so an existing tree keeps working and converts as files get
+# rewritten, or all at once with --migrate.
+STORAGE_SETTINGS_FILE = "config/storage.json"
+COMPRESSIONS = ["gzip", "none"]
+COMPRESSED_SUFFIX = ".gz"
+# Higher levels barely shrink these files but are several times slower to write.
+COMPRESSION_LEVEL = 6
+# Directories converted by --migrate, with the extension of the files in them.
+# The metadata tree is listed by metadata_store.
+FEEDBACK_DIRS = {"data/feedback_html": ".html", "data/feedback_json": ".json"}
+
+COMPRESSION = None
+
+
+def get_compression():
+    global COMPRESSION
+    if COMPRESSION is None:
+        COMPRESSION = "none"
+        if os.path.exists(STORAGE_SETTINGS_FILE):
+            with open(STORAGE_SETTINGS_FILE, "r", encoding="utf-8") as f:
+                COMPRESSION = json.load(f).get("compression", "none")
+    return COMPRESSION
+
+
+def set_compression(compression):
+    global COMPRESSION
+    COMPRESSION = compression
+    os.makedirs(os.path.dirname(STORAGE_SETTINGS_FILE), exist_ok=True)
+    with open(STORAGE_SETTINGS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"compression": compression}, f, indent=4)
+
+
+def _get_candidate_paths(path):
+    compressed_path = path + COMPRESSED_SUFFIX
+    # Look for the configured form first, since that's what gets written.
+    return (compressed_path, path) if get_compression() == "gzip" else (path, compressed_path)
+
+
+def get_stored_path(path):
+    """Returns the file holding the contents of path, compressed or not, or None if there is none."""
+    for candidate in _get_candidate_paths(path):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def data_file_exists(path):
+    return get_stored_path(path) is not None
+
+
+def read_data_file(path):
+    """Returns the uncompressed contents of path as bytes."""
+    stored_path = get_stored_path(path)
+    if stored_path is None:
+        raise FileNotFoundError(f"No such file: {path}")
+    with open(stored_path, "rb") as f:
+        content = f.read()
+    if stored_path.endswith(COMPRESSED_SUFFIX):
+        return gzip.decompress(content)
+    return content
+
+
+def read_data_text(path):
+    return read_data_file(path).decode("utf-8")
+
+
+def read_data_json(path):
+    return json.loads(read_data_file(path))
+
+
+@contextmanager
+def open_atomically(path, mode="wb"):
+    """Opens a temporary file that replaces path once the block completes.
+
+    An interrupted write never leaves a truncated file behind, and readers
+    see either the old or the new contents.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def write_data_file(path, content, compression=None):
+    """Atomically writes content, as bytes, to path in the configured form."""
+    compression = compression or get_compression()
+    if compression == "gzip":
+        stored_path, other_path = path + COMPRESSED_SUFFIX, path
+        # A fixed mtime keeps the output identical for identical content.
+        content = gzip.compress(content, compresslevel=COMPRESSION_LEVEL, mtime=0)
+    else:
+        stored_path, other_path = path, path + COMPRESSED_SUFFIX
+    with open_atomically(stored_path) as f:
+        f.write(content)
+    if os.path.exists(other_path):
+        os.remove(other_path)
+
+
+def write_data_json(path, data, compression=None):
+    compression = compression or get_compression()
+    if compression == "gzip":
+        # Indentation only makes the files bigger once they aren't readable anyway.
+        encoded = json.dumps(data, separators=(",", ":"))
+    else:
+        encoded = json.dumps(data, indent=4)
+    write_data_file(path, encoded.encode("utf-8"), compression=compression)
+
+
+def get_data_file_mtime(path):
+    return os.path.getmtime(get_stored_path(path) or path)
+
+
+def get_data_file_size(path):
+    """Returns the uncompressed size of path without decompressing it."""
+    stored_path = get_stored_path(path) or path
+    if not stored_path.endswith(COMPRESSED_SUFFIX):
+        return os.path.getsize(stored_path)
+    # The gzip trailer ends with the uncompressed size modulo 2^32.
+    with open(stored_path, "rb") as f:
+        f.seek(-4, os.SEEK_END)
+        return int.from_bytes(f.read(4), "little")
+
+
+def _iter_data_files():
+    from metadata_store import iter_json_tree
+    yield from iter_json_tree()
+    for dir_path, extension in FEEDBACK_DIRS.items():
+        if not os.path.isdir(dir_path):
+            continue
+        # Files being converted can briefly exist in both forms.
+        file_names = {file_name[:-len(COMPRESSED_SUFFIX)] if file_name.endswith(COMPRESSED_SUFFIX) else file_name for file_name in os.listdir(dir_path)}
+        for file_name in sorted(file_names):
+            if file_name.endswith(extension):
+                yield os.path.join(dir_path, file_name)
+
+
+def migrate_data_files(compression):
+    """Rewrites every cached file in the given form, and makes it the configured one."""
+    converted = 0
+    size_before = 0
+    size_after = 0
+    for path in _iter_data_files():
+        stored_path = get_stored_path(path)
+        size_before += os.path.getsize(stored_path)
+        if stored_path.endswith(COMPRESSED_SUFFIX) != (compression == "gzip"):
+            if path.endswith(".json"):
+                # Indented when stored as is, minified when compressed, like new files.
+                write_data_json(path, read_data_json(path), compression=compression)
+            else:
+                write_data_file(path, read_data_file(path), compression=compression)
+            converted += 1
+        size_after += os.path.getsize(get_stored_path(path))
+    set_compression(compression)
+    print(f"Converted {converted} files to {compression}, {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Manage how cached feedback and metadata are stored.')
+    parser.add_argument("--migrate", choices=COMPRESSIONS, help="Convert all cached files, and select the form used by subsequent runs")
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate_data_files(args.migrate)
+    else:
+        print(f"Cached files are stored with compression {get_compression()}")
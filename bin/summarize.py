@@ -6,13 +6,17 @@ import json
 from pathlib import Path
 from feedback_parser import parse_feedback_for_nominee
 from nominees import get_nominee_info, get_nominees_by_position, get_active_nominees
+from build_state import get_rebuild_reason, hash_input, record_build, set_explain
 from positions import get_position_full_name
+from tracing import count, span
 
 
 GEMINI_SETTINGS = None
 GEMINI_SETTINGS_FILE = "config/gemini_settings.json"
 NOMINEE_POSITIONS_SUMMARIZED = []
 POSITIONS_SUMMARIZED = []
+# Bump when a change here should invalidate the existing summaries.
+SUMMARY_VERSION = 1
 
 def save_gemini_settings(settings):
     global GEMINI_SETTINGS
@@ -61,14 +65,27 @@ def are_summaries_enabled(summaries_forced=None):
     settings = get_gemini_settings()
     return settings.get("enabled", False)
 
+def get_ai_model(use_pro_model=False):
+    return 'gemini-pro-latest' if use_pro_model else 'gemini-flash-latest'
+
 def get_ai_summary(prompt, use_pro_model=False, summaries_forced=None):
     """Summarizes the feedback text using the Gemini API."""
+    model = get_ai_model(use_pro_model)
+    with span("llm", model=model, prompt_chars=len(prompt)) as attributes:
+        summary, success = _get_ai_summary(prompt, model, summaries_forced=summaries_forced)
+        attributes["response_chars"] = len(summary)
+        attributes["success"] = success
+    count("llm.prompt_chars", len(prompt), model=model)
+    count("llm.response_chars", len(summary), model=model)
+    return summary, success
+
+def _get_ai_summary(prompt, model, summaries_forced=None):
     try:
         api_key = get_gemini_api_key(summaries_forced=summaries_forced)
         from google import genai
         client = genai.Client(api_key=api_key)
         response = client.interactions.create(
-            model='gemini-pro-latest' if use_pro_model else 'gemini-flash-latest',
+            model=model,
             input=prompt
         )
         summary_text = response.output_text
@@ -119,18 +136,26 @@ def get_ai_summary_for_nominee_and_position(nominee_id, position, force_metadata
         os.makedirs(summary_dir)
     summary_file = os.path.join(summary_dir, summary_filename)
 
-    if os.path.exists(summary_file) and ((not redo_summaries) or (nominee_position in NOMINEE_POSITIONS_SUMMARIZED)):
+    prompt = f"Summarize the following feedback for {nominee_name} for the {position} position. If there are differing opinions, try to attribute comments to the name of the person who made them. Provide the summary as an HTML snippet suitable for embedding directly into a <body> tag, without any surrounding <html>, <head>, or <body> tags, and without any markdown formatting or extra text outside the HTML. Use <h3> for main sections and <h4> for subsections.:\n\n{feedback_text}"
+    # The summary only needs to be redone if what would be asked changed.
+    # Summaries from before this was recorded are kept until then, since
+    # regenerating them all is slow; -s regenerates them.
+    inputs = {"prompt": hash_input(prompt), "model": get_ai_model()}
+    forced_by = "-s" if redo_summaries and nominee_position not in NOMINEE_POSITIONS_SUMMARIZED else None
+    if not get_rebuild_reason(summary_file, inputs, SUMMARY_VERSION, forced_by=forced_by, adopt_unrecorded=True):
         with open(summary_file, "r", encoding="utf-8") as f:
             summary = f.read()
+        count("cache.fresh", directory=summary_dir)
     elif not feedback_text.strip():
         summary = "<p>No feedback for this position.</p>"
     else:
-        prompt = f"Summarize the following feedback for {nominee_name} for the {position} position. If there are differing opinions, try to attribute comments to the name of the person who made them. Provide the summary as an HTML snippet suitable for embedding directly into a <body> tag, without any surrounding <html>, <head>, or <body> tags, and without any markdown formatting or extra text outside the HTML. Use <h3> for main sections and <h4> for subsections.:\n\n{feedback_text}"
         print(f"Generating AI summary for {nominee_name} ({nominee_id}) for {position}...")
         summary, success = get_ai_summary(prompt)
         if success:
             with open(summary_file, "w", encoding="utf-8") as f:
                 f.write(summary)
+            record_build(summary_file, inputs, SUMMARY_VERSION)
+            count("cache.rebuilt", directory=summary_dir)
             NOMINEE_POSITIONS_SUMMARIZED.append(nominee_position)
         else:
             print("Failed to get AI summary")
@@ -159,23 +184,28 @@ def get_ai_summary_for_position(position, force_metadata=False, force_feedback=F
         os.makedirs(summary_dir)
     summary_file = os.path.join(summary_dir, summary_filename)
 
-    if os.path.exists(summary_file) and ((not redo_summaries) or (position in POSITIONS_SUMMARIZED)):
+    if position == 'IAB':
+        prompt = "We need to pick six people for the role of Internet Architecture Board (IAB) Member. Based on the feedback for these nominees, who are the six that the community thinks are the best choice? Rank all of the nominees from best to worst."
+    else:
+        position_full = get_position_full_name(position)
+        prompt = f"We need to pick one person for the role of {position_full}. Based on the following feedback for these nominees, who does the community think is the best choice?"
+    prompt += f" If there are differing opinions, try to attribute comments to the name of the person who made them. Provide the summary as an HTML snippet suitable for embedding directly into a <body> tag, without any surrounding <html>, <head>, or <body> tags, and without any markdown formatting or extra text outside the HTML. Use <h3> for main sections and <h4> for subsections.:\n\n{all_feedback_text}"
+    inputs = {"prompt": hash_input(prompt), "model": get_ai_model(use_pro_model=True)}
+    forced_by = "-s" if redo_summaries and position not in POSITIONS_SUMMARIZED else None
+    if not get_rebuild_reason(summary_file, inputs, SUMMARY_VERSION, forced_by=forced_by, adopt_unrecorded=True):
         with open(summary_file, "r", encoding="utf-8") as f:
             summary = f.read()
+        count("cache.fresh", directory=summary_dir)
     elif not all_feedback_text.strip():
         summary = "<p>No feedback for this position.</p>"
     else:
-        if position == 'IAB':
-            prompt = "We need to pick six people for the role of Internet Architecture Board (IAB) Member. Based on the feedback for these nominees, who are the six that the community thinks are the best choice? Rank all of the nominees from best to worst."
-        else:
-            position_full = get_position_full_name(position)
-            prompt = f"We need to pick one person for the role of {position_full}. Based on the following feedback for these nominees, who does the community think is the best choice?"
-        prompt += f" If there are differing opinions, try to attribute comments to the name of the person who made them. Provide the summary as an HTML snippet suitable for embedding directly into a <body> tag, without any surrounding <html>, <head>, or <body> tags, and without any markdown formatting or extra text outside the HTML. Use <h3> for main sections and <h4> for subsections.:\n\n{all_feedback_text}"
         print(f"Generating AI summary for {position}...")
         summary, success = get_ai_summary(prompt, use_pro_model=True)
         if success:
             with open(summary_file, "w", encoding="utf-8") as f:
                 f.write(summary)
+            record_build(summary_file, inputs, SUMMARY_VERSION)
+            count("cache.rebuilt", directory=summary_dir)
             POSITIONS_SUMMARIZED.append(position)
     return summary
 
@@ -210,9 +240,11 @@ if __name__ == "__main__":
     parser.add_argument("-a", "--force-all", action="store_true", help="Get latest feedback and redo subsequent operations")
     parser.add_argument("-x", "--add-summaries", action='store_const', const=True, default=None, dest="summaries_forced", help="[BETA] Add summarization even if disabled")
     parser.add_argument("-z", "--no-summaries", action='store_const', const=False, default=None, dest="summaries_forced", help="Disable summarization even if enabled")
+    parser.add_argument("--explain", action="store_true", help="Print why each file gets redone")
     parser.add_argument("--enable-summaries", action='store_const', const=True, default=None, dest="summaries_enabled", help="[BETA] Add summarization even if disabled")
     parser.add_argument("--disable-summaries", action='store_const', const=False, default=None, dest="summaries_enabled", help="Disable summarization even if enabled")
     args = parser.parse_args()
+    set_explain(args.explain)
 
     if args.force_all:
         args.force_feedback = True
@@ -0,0 +1,126 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Lightweight instrumentation for the pipeline. Spans time units of work
+# (stages, nominees, pages...) and counters aggregate numbers by labels
+# (requests per endpoint, cache hits per directory...). Nothing is recorded
+# until start_tracing() is called, so instrumented code costs next to nothing
+# in normal runs. The report is written when the process exits.
+TRACING_LOCK = threading.Lock()
+TRACING_ENABLED = False
+REPORT_FILE = None
+CHROME_TRACE_FILE = None
+START_TIME = None
+# Completed spans, in the order they ended.
+SPANS = []
+# (name, sorted label items) -> {"count": number of events, "total": sum of their values}
+COUNTERS = {}
+SPAN_STACKS = threading.local()
+
+
+def start_tracing(report_file, chrome_trace_file=None):
+    """Records spans and counters until exit, then writes them to report_file as JSON lines.
+
+    If chrome_trace_file is given, the spans are also written there in the
+    Chrome trace event format, which chrome://tracing and Perfetto can open.
+    """
+    global TRACING_ENABLED, REPORT_FILE, CHROME_TRACE_FILE, START_TIME
+    REPORT_FILE = report_file
+    CHROME_TRACE_FILE = chrome_trace_file
+    START_TIME = time.perf_counter()
+    TRACING_ENABLED = True
+    atexit.register(write_trace_report)
+
+
+def is_tracing():
+    return TRACING_ENABLED
+
+
+@contextmanager
+def span(name, **attributes):
+    """Times the enclosed block. Attributes can be added to the yielded dict while it runs."""
+    if not TRACING_ENABLED:
+        yield attributes
+        return
+    stack = getattr(SPAN_STACKS, "stack", None)
+    if stack is None:
+        stack = SPAN_STACKS.stack = []
+    parent = stack[-1] if stack else None
+    stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        duration = time.perf_counter() - start
+        stack.pop()
+        record = {
+            "name": name,
+            "parent": parent,
+            "start": start - START_TIME,
+            "duration": duration,
+            "thread": threading.get_ident(),
+            "attributes": attributes,
+        }
+        with TRACING_LOCK:
+            SPANS.append(record)
+
+
+def count(name, value=1, **labels):
+    """Adds one event of the given value to the counter identified by name and labels."""
+    if not TRACING_ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with TRACING_LOCK:
+        counter = COUNTERS.get(key)
+        if counter is None:
+            counter = COUNTERS[key] = {"count": 0, "total": 0}
+        counter["count"] += 1
+        counter["total"] += value
+
+
+def _write_chrome_trace():
+    pid = os.getpid()
+    events = []
+    for record in SPANS:
+        events.append({
+            "name": record["name"],
+            "cat": record["parent"] or "run",
+            "ph": "X",
+            "ts": record["start"] * 1e6,
+            "dur": record["duration"] * 1e6,
+            "pid": pid,
+            "tid": record["thread"],
+            "args": record["attributes"],
+        })
+    with open(CHROME_TRACE_FILE, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def write_trace_report():
+    """Writes the spans, the counters and a per-span-name summary to the report file."""
+    global TRACING_ENABLED
+    if not TRACING_ENABLED:
+        return
+    TRACING_ENABLED = False
+    summary = {}
+    for record in SPANS:
+        totals = summary.setdefault(record["name"], {"count": 0, "duration": 0.0})
+        totals["count"] += 1
+        totals["duration"] += record["duration"]
+    os.makedirs(os.path.dirname(REPORT_FILE) or ".", exist_ok=True)
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        for record in SPANS:
+            f.write(json.dumps({"type": "span", **record}) + "\n")
+        for (name, labels), counter in sorted(COUNTERS.items()):
+            f.write(json.dumps({"type": "counter", "name": name, "labels": dict(labels), **counter}) + "\n")
+        for name, totals in sorted(summary.items(), key=lambda item: -item[1]["duration"]):
+            f.write(json.dumps({"type": "summary", "name": name, **totals}) + "\n")
+        f.write(json.dumps({"type": "run", "duration": time.perf_counter() - START_TIME}) + "\n")
+    print(f"Saved trace report to {REPORT_FILE}")
+    if CHROME_TRACE_FILE:
+        _write_chrome_trace()
+        print(f"Saved Chrome trace to {CHROME_TRACE_FILE}")
@@ -0,0 +1,110 @@
+// Runs the same queries as search.py, against the index files written by
+// export_search_index(). They are loaded as scripts rather than fetched, since
+// browsers don't let pages opened from file:// URLs fetch other files.
+
+// The directory of the index files, relative to the page.
+const SEARCH_DIR = document.currentScript.dataset.searchDir;
+const BM25_K1 = 1.2;
+const BM25_B = 0.75;
+const indexFiles = {};
+const indexFileCallbacks = {};
+
+function searchIndexLoaded(name, data) {
+    indexFileCallbacks[name](data);
+}
+
+function loadIndexFile(name) {
+    if (!indexFiles[name]) {
+        indexFiles[name] = new Promise(resolve => {
+            indexFileCallbacks[name] = resolve;
+            const script = document.createElement("script");
+            script.src = SEARCH_DIR + name + ".js";
+            // Files that don't exist have nothing in them.
+            script.onerror = () => resolve({});
+            document.head.appendChild(script);
+        });
+    }
+    return indexFiles[name];
+}
+
+function tokenize(text) {
+    return text.normalize("NFC").toLowerCase().match(/[\p{L}\p{N}]+/gu) || [];
+}
+
+function getShard(term, numShards) {
+    // 32-bit FNV-1a, like get_shard() in search.py.
+    let hash = 0x811c9dc5;
+    for (const byte of new TextEncoder().encode(term)) {
+        hash = Math.imul(hash ^ byte, 0x01000193) >>> 0;
+    }
+    return hash % numShards;
+}
+
+function escapeHtml(text) {
+    const element = document.createElement("span");
+    element.textContent = text;
+    return element.innerHTML;
+}
+
+async function search(query, position) {
+    const meta = await loadIndexFile("meta");
+    const terms = [...new Set(tokenize(query))];
+    if (!terms.length || !meta.num_docs) {
+        return [terms, []];
+    }
+    const postingsByTerm = await Promise.all(terms.map(async term => {
+        const shard = String(getShard(term, meta.num_shards)).padStart(2, "0");
+        const shardData = await loadIndexFile("terms_" + shard);
+        return new Map(shardData[term] || []);
+    }));
+    let docIds = [...postingsByTerm[0].keys()].filter(docId => postingsByTerm.every(postings => postings.has(docId)));
+    const docs = await Promise.all(docIds.map(async docId => {
+        const block = String(Math.floor(docId / meta.doc_block_size)).padStart(4, "0");
+        return (await loadIndexFile("docs_" + block))[docId];
+    }));
+    const averageLength = meta.total_length / meta.num_docs || 1;
+    const results = [];
+    docIds.forEach((docId, i) => {
+        const doc = docs[i];
+        if (position && !doc.p.includes(position)) {
+            return;
+        }
+        let score = 0;
+        for (const postings of postingsByTerm) {
+            const idf = Math.log(1 + (meta.num_docs - postings.size + 0.5) / (postings.size + 0.5));
+            const termCount = postings.get(docId);
+            score += idf * termCount * (BM25_K1 + 1) / (termCount + BM25_K1 * (1 - BM25_B + BM25_B * doc.l / averageLength));
+        }
+        results.push([score, docId, doc]);
+    });
+    results.sort((a, b) => b[0] - a[0] || a[1] - b[1]);
+    return [terms, results.slice(0, 50)];
+}
+
+function highlight(text, terms) {
+    let html = escapeHtml(text);
+    for (const term of terms) {
+        html = html.replace(new RegExp("(?<![\\p{L}\\p{N}])(" + term + ")(?![\\p{L}\\p{N}])", "giu"), "<mark>$1</mark>");
+    }
+    return html;
+}
+
+async function runSearch(event) {
+    event.preventDefault();
+    const query = document.getElementById("search-query").value;
+    const position = document.getElementById("search-position").value;
+    const meta = await loadIndexFile("meta");
+    const [terms, results] = await search(query, position);
+    let html = "<p>" + results.length + (results.length == 50 ? "+" : "") + " results</p>";
+    for (const [score, docId, doc] of results) {
+        const nominee = doc.n !== null ? meta.nominees[doc.n] : null;
+        const pagePosition = position || doc.p[0];
+        const page = nominee ? "data/" + doc.n + "_" + pagePosition + ".html" : "data/" + pagePosition + ".html";
+        const title = (nominee || doc.p.join(", ")) + " (" + doc.p.join(", ") + ")";
+        const source = doc.k == "q" ? "Questionnaire" : "Feedback from " + escapeHtml(doc.a) + " on " + escapeHtml(doc.d);
+        html += '<div class="feedback"><p><a href="' + page + '">' + escapeHtml(title) + "</a> &ndash; " + source + "<br/>" + highlight(doc.s, terms) + (doc.s.length == meta.snippet_length ? "..." : "") + "</p></div>";
+    }
+    document.getElementById("search-results").innerHTML = html;
+}
+
+document.getElementById("search-form").addEventListener("submit", runSearch);
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import build_state
+from build_state import get_build_record, get_rebuild_reason, hash_input, record_build
+
+ARTIFACT = "data/ai_summaries/1_SEC.txt"
+
+
+def start_patch(test, patcher):
+    test.addCleanup(patcher.stop)
+    return patcher.start()
+
+
+class TestBuildState(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir.name)
+        start_patch(self, mock.patch.object(build_state, "BUILD_STATE", None))
+        start_patch(self, mock.patch.object(build_state, "BUILD_STATE_DIRTY", False))
+        os.makedirs(os.path.dirname(ARTIFACT))
+        with open(ARTIFACT, "w", encoding="utf-8") as f:
+            f.write("<p>Summary</p>")
+
+    def reload(self):
+        # Reads the file again, as the next run would.
+        build_state.flush_build_state()
+        build_state.BUILD_STATE = None
+
+    def test_inputs(self):
+        inputs = {"prompt": hash_input("Summarize"), "model": "flash"}
+        self.assertEqual(get_rebuild_reason(ARTIFACT, inputs, 1), "no record of how it was built")
+        self.assertEqual(get_rebuild_reason("data/ai_summaries/missing.txt", inputs, 1), "missing")
+        record_build(ARTIFACT, inputs, 1)
+        self.reload()
+        self.assertEqual(get_build_record(ARTIFACT), {"inputs": inputs, "code_version": 1})
+        self.assertIsNone(get_rebuild_reason(ARTIFACT, dict(inputs), 1))
+        self.assertEqual(get_rebuild_reason(ARTIFACT, inputs, 1, forced_by="-s"), "forced by -s")
+        self.assertEqual(get_rebuild_reason(ARTIFACT, inputs, 1, exists=False), "missing")
+
+        # Only the inputs that differ are named, including added and removed ones.
+        self.assertEqual(get_rebuild_reason(ARTIFACT, dict(inputs, prompt=hash_input("Summarize again")), 1), "prompt changed")
+        self.assertEqual(get_rebuild_reason(ARTIFACT, dict(inputs, parser="lxml"), 1), "parser changed")
+        self.assertEqual(get_rebuild_reason(ARTIFACT, {"model": "pro"}, 1), "model, prompt changed")
+
+    def test_code_version(self):
+        inputs = {"prompt": hash_input("Summarize")}
+        record_build(ARTIFACT, inputs, 1)
+        self.assertEqual(get_rebuild_reason(ARTIFACT, inputs, 2), "code version changed from 1 to 2")
+        record_build(ARTIFACT, inputs, 2)
+        self.assertIsNone(get_rebuild_reason(ARTIFACT, inputs, 2))
+
+    def test_adopt_unrecorded(self):
+        inputs = {"prompt": hash_input("Summarize"), "model": "flash"}
+        # Outputs from before the build state are kept, and recorded as made from the current inputs.
+        self.assertIsNone(get_rebuild_reason(ARTIFACT, inputs, 1, adopt_unrecorded=True))
+        self.reload()
+        self.assertEqual(get_build_record(ARTIFACT), {"inputs": inputs, "code_version": 1})
+        # But only once, so later changes are noticed like for any other output.
+        changed_inputs = dict(inputs, prompt=hash_input("Summarize differently"))
+        self.assertEqual(get_rebuild_reason(ARTIFACT, changed_inputs, 1, adopt_unrecorded=True), "prompt changed")
+        self.assertEqual(get_rebuild_reason(ARTIFACT, inputs, 2, adopt_unrecorded=True), "code version changed from 1 to 2")
+        # Missing outputs, or forced ones, aren't adopted.
+        self.assertEqual(get_rebuild_reason("data/ai_summaries/missing.txt", inputs, 1, adopt_unrecorded=True), "missing")
+        self.assertIsNone(get_build_record("data/ai_summaries/missing.txt"))
+        with open("data/ai_summaries/SEC.txt", "w", encoding="utf-8") as f:
+            f.write("<p>Summary</p>")
+        self.assertEqual(get_rebuild_reason("data/ai_summaries/SEC.txt", inputs, 1, forced_by="-s", adopt_unrecorded=True), "forced by -s")
+        self.assertIsNone(get_build_record("data/ai_summaries/SEC.txt"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import cassette
+import http_cache
+import http_client
+import metadata_store
+import storage
+from fake_datatracker import generate_corpus, start_fake_datatracker
+
+API_URL = "https://datatracker.ietf.org/api/v1"
+
+
+def start_patch(test, patcher):
+    test.addCleanup(patcher.stop)
+    return patcher.start()
+
+
+class TestCassette(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+        self.addCleanup(os.chdir, os.getcwd())
+        for name, value in (("CASSETTE_MODE", None), ("CASSETTE_FILE", None), ("RECORDING_HANDLE", None), ("REPLAY_EXCHANGES", {}), ("REPLAY_POSITIONS", {})):
+            start_patch(self, mock.patch.object(cassette, name, value))
+        start_patch(self, mock.patch.object(metadata_store, "BACKEND", "json"))
+        start_patch(self, mock.patch.object(storage, "COMPRESSION", None))
+        start_patch(self, mock.patch.object(http_client, "PAGE_SIZE", 2))
+        start_patch(self, mock.patch("builtins.print"))
+        corpus = generate_corpus(num_nominees=5, feedback_per_nominee=2, num_authors=20, seed=7)
+        self.server, url = start_fake_datatracker(corpus)
+        self.addCleanup(self.server.server_close)
+        start_patch(self, mock.patch.object(http_client, "DATATRACKER_URL_OVERRIDE", url))
+
+    def run_in(self, dir_name):
+        """Fetches a few things into an empty cache in dir_name, and returns what was fetched."""
+        os.makedirs(os.path.join(self.tmp_dir, dir_name))
+        os.chdir(os.path.join(self.tmp_dir, dir_name))
+        start_patch(self, mock.patch.object(http_cache, "VALIDATED_FILES", set()))
+        nominees = http_cache.get_cached_json(f"{API_URL}/nomcom/nominee/", "data/nominees.json", "nominees", paginated=True)
+        person = http_cache.get_cached_json(f"{API_URL}/person/person/1001/", "data/persons/1001.json", "persons")
+        missing = http_client.http_get(f"{API_URL}/person/person/9999/")
+        return nominees, person, missing.status_code, missing.text
+
+    def test_round_trip(self):
+        cassette_file = os.path.join(self.tmp_dir, "run.jsonl.gz")
+        cassette.start_recording(cassette_file)
+        recorded = self.run_in("recorded")
+        cassette.stop_recording()
+        self.assertGreater(len(recorded[0]["objects"]), 2)
+        self.assertEqual(recorded[2], 404)
+
+        # Replaying needs neither the server nor anything cached.
+        self.server.shutdown()
+        cassette.start_replaying(cassette_file)
+        requests_before = http_client.HTTP_STATS["requests"]
+        self.assertEqual(self.run_in("replayed"), recorded)
+        self.assertEqual(http_client.HTTP_STATS["requests"] - requests_before, 2 + (len(recorded[0]["objects"]) + 1) // 2)
+        self.assertEqual(metadata_store.load_meta("data/nominees.json")["pages"], metadata_store.load_meta(os.path.join(self.tmp_dir, "recorded", "data", "nominees.json"))["pages"])
+        with self.assertRaises(Exception):
+            http_client.http_get(f"{API_URL}/person/person/1002/")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import tempfile
+import time
+from unittest import mock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import doc_cache
+from storage import write_data_json
+
+
+class TestDocCache(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+        doc_cache.DOC_CACHE.clear()
+        doc_cache.DOC_CACHE_BYTES = 0
+        for name in doc_cache.DOC_CACHE_STATS:
+            doc_cache.DOC_CACHE_STATS[name] = 0
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp_dir, name)
+        write_data_json(path, data)
+        return path
+
+    def test_cache(self):
+        path = self.write("1.json", {"feedback": ["a"]})
+        self.assertEqual(doc_cache.get_cached_json(path), {"feedback": ["a"]})
+        self.assertIs(doc_cache.get_cached_json(path), doc_cache.get_cached_json(path))
+        self.assertEqual((doc_cache.DOC_CACHE_STATS["misses"], doc_cache.DOC_CACHE_STATS["hits"]), (1, 2))
+
+        # Rewriting the file drops what was cached.
+        write_data_json(path, {"feedback": ["a", "b"]})
+        os.utime(doc_cache.get_stored_path(path), ns=(0, 0))
+        self.assertEqual(doc_cache.get_cached_json(path), {"feedback": ["a", "b"]})
+        self.assertEqual(doc_cache.DOC_CACHE_STATS["invalidations"], 1)
+
+        # Documents that were just written don't need to be read back.
+        document = {"feedback": ["c"]}
+        other_path = self.write("2.json", document)
+        doc_cache.put_cached_json(other_path, document)
+        self.assertIs(doc_cache.get_cached_json(other_path), document)
+
+    def test_hit_cost(self):
+        """A hit neither reads nor copies the document, so it costs far less than a miss."""
+        document = {"feedback": {"SEC": [{"name": f"Author {i}", "feedback": "Great nominee. " * 50} for i in range(2000)]}}
+        path = self.write("1.json", document)
+        with mock.patch.object(doc_cache, "read_data_json", wraps=doc_cache.read_data_json) as read_data_json:
+            start = time.perf_counter()
+            doc_cache.get_cached_json(path)
+            miss_time = time.perf_counter() - start
+            hit_times = []
+            for _ in range(5):
+                start = time.perf_counter()
+                doc_cache.get_cached_json(path)
+                hit_times.append(time.perf_counter() - start)
+        self.assertEqual(read_data_json.call_count, 1)
+        self.assertLess(min(hit_times) * 10, miss_time)
+
+    def test_eviction(self):
+        paths = [self.write(f"{i}.json", {"feedback": ["x" * 100]}) for i in range(4)]
+        size = doc_cache.get_data_file_size(paths[0])
+        self.addCleanup(setattr, doc_cache, "DOC_CACHE_MAX_BYTES", doc_cache.DOC_CACHE_MAX_BYTES)
+        doc_cache.DOC_CACHE_MAX_BYTES = 3 * size
+        for path in paths[:3]:
+            doc_cache.get_cached_json(path)
+        # Using the first one makes the second one the least recently used.
+        doc_cache.get_cached_json(paths[0])
+        doc_cache.get_cached_json(paths[3])
+        self.assertEqual(list(doc_cache.DOC_CACHE), [paths[2], paths[0], paths[3]])
+        self.assertEqual(doc_cache.DOC_CACHE_STATS["evictions"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+import unittest
+import json
+import os
+import sys
+import tempfile
+from unittest import mock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import email_index
+
+
+def start_patch(test, patcher):
+    test.addCleanup(patcher.stop)
+    return patcher.start()
+
+
+class TestEmailIndex(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir.name)
+        start_patch(self, mock.patch("builtins.print"))
+        self.reload()
+
+    def reload(self):
+        # Forget what was loaded, as the next run would.
+        for name in ("LOADED_SHARDS", "ADDED_ENTRIES"):
+            start_patch(self, mock.patch.object(email_index, name, {}))
+        start_patch(self, mock.patch.object(email_index, "PENDING_ENTRIES", []))
+        start_patch(self, mock.patch.object(email_index, "LEGACY_EMAILS_FILE_IMPORTED", False))
+
+    def read_shard(self, email):
+        with open(email_index._get_shard_file(email_index._get_shard(email)), "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_legacy_import(self):
+        os.makedirs("data")
+        with open(email_index.LEGACY_EMAILS_FILE, "w", encoding="utf-8") as f:
+            json.dump({"a@example.com": "1", "b@example.com": "2"}, f)
+        # Entries added before the import is done are newer than the legacy ones.
+        email_index.ADDED_ENTRIES["a@example.com"] = "3"
+        email_index.PENDING_ENTRIES.append(("a@example.com", "3"))
+        self.assertEqual(email_index.get_indexed_person_id("b@example.com"), "2")
+        self.assertEqual(self.read_shard("a@example.com")[-1], ["a@example.com", "3"])
+        self.reload()
+        self.assertEqual(email_index.get_indexed_person_id("a@example.com"), "3")
+        self.assertEqual(email_index.get_indexed_person_id("b@example.com"), "2")
+        # The import only happens once.
+        os.remove(email_index.LEGACY_EMAILS_FILE)
+        self.reload()
+        self.assertEqual(email_index.get_indexed_person_id("b@example.com"), "2")
+
+    def test_shards(self):
+        emails = [f"{i}@example.com" for i in range(email_index.FLUSH_BATCH_SIZE)]
+        for i, email in enumerate(emails[:-1]):
+            email_index.add_indexed_person_id(email, str(i))
+        self.assertFalse(os.path.exists(email_index.EMAIL_INDEX_DIR))
+        # A full batch gets written.
+        email_index.add_indexed_person_id(emails[-1], "last")
+        self.assertEqual(email_index.PENDING_ENTRIES, [])
+        self.assertGreater(len(os.listdir(email_index.EMAIL_INDEX_DIR)), 1)
+        for i, email in enumerate(emails[:-1]):
+            self.assertIn([email, str(i)], self.read_shard(email))
+
+        # Known entries aren't written again, and later ones win.
+        email_index.add_indexed_person_id(emails[0], "0")
+        email_index.add_indexed_person_id(emails[1], "changed")
+        self.assertEqual(email_index.PENDING_ENTRIES, [(emails[1], "changed")])
+        email_index.flush_email_index()
+        # A torn line from an interrupted write is skipped, and not glued to the next entry.
+        with open(email_index._get_shard_file(email_index._get_shard(emails[1])), "a", encoding="utf-8") as f:
+            f.write('["torn')
+        self.reload()
+        new_email = next(email for email in (f"new{i}@example.com" for i in range(1000)) if email_index._get_shard(email) == email_index._get_shard(emails[1]))
+        email_index.add_indexed_person_id(new_email, "new")
+        email_index.flush_email_index()
+        self.reload()
+        self.assertEqual(email_index.get_indexed_person_id(emails[0]), "0")
+        self.assertEqual(email_index.get_indexed_person_id(emails[1]), "changed")
+        self.assertEqual(email_index.get_indexed_person_id(new_email), "new")
+        self.assertIsNone(email_index.get_indexed_person_id("unknown@example.com"))
+
+if __name__ == '__main__':
+    unittest.main()
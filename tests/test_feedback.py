@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import tempfile
+import time
+from unittest import mock
+import requests
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import feedback
+import storage
+from fake_datatracker import render_feedback_page
+
+NOMINEE_IDS = [1, 2, 3, 4, 5]
+
+
+class FakeResponse:
+
+    def __init__(self, content):
+        self.status_code = 200
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+def start_patch(test, patcher):
+    test.addCleanup(patcher.stop)
+    return patcher.start()
+
+
+class TestFeedback(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir.name)
+        start_patch(self, mock.patch.object(storage, "COMPRESSION", None))
+        start_patch(self, mock.patch.object(feedback, "SESSION_ID", "test"))
+        start_patch(self, mock.patch.object(feedback, "MANIFEST", None))
+        start_patch(self, mock.patch.object(feedback, "MANIFEST_DIRTY", False))
+        start_patch(self, mock.patch.object(feedback, "PROCESS_STARTED_AT", 0))
+        start_patch(self, mock.patch.object(feedback, "get_active_nominees", lambda force_metadata=False: [{"id": nominee_id} for nominee_id in NOMINEE_IDS]))
+        start_patch(self, mock.patch.object(feedback, "get_positions", lambda force_metadata=False: []))
+        start_patch(self, mock.patch.object(feedback, "http_get", self.http_get))
+        start_patch(self, mock.patch("builtins.print"))
+        self.urls = []
+        self.fail_after = None
+
+    def http_get(self, url, cookies=None):
+        if self.fail_after is not None and len(self.urls) >= self.fail_after:
+            raise requests.ConnectionError("interrupted")
+        self.urls.append(url)
+        return FakeResponse(render_feedback_page({"comments": [], "questionnaires": []}).encode("utf-8"))
+
+    def run_process(self, force_feedback=False, fail_after=None):
+        """Saves all the feedback as a new process would, and returns how many pages it downloaded."""
+        # Leave time between processes, which tell their downloads apart by time.
+        time.sleep(0.01)
+        feedback.PROCESS_STARTED_AT = time.time()
+        feedback.MANIFEST = None
+        self.urls = []
+        self.fail_after = fail_after
+        feedback.save_all_html_feedback(force_feedback=force_feedback)
+        return len(self.urls)
+
+    def test_resume(self):
+        self.assertEqual(self.run_process(), 5)
+        self.assertEqual(self.run_process(), 0)
+
+        # An interrupted -f refresh keeps what it downloaded.
+        with self.assertRaises(requests.ConnectionError):
+            self.run_process(force_feedback=True, fail_after=2)
+        self.assertEqual(len(feedback.MANIFEST["pages"]), 5)
+        self.assertIsNone(feedback.MANIFEST["refresh_completed_at"])
+        # So the next -f only downloads the rest.
+        self.assertEqual(self.run_process(force_feedback=True), 3)
+        self.assertIsNotNone(feedback.MANIFEST["refresh_completed_at"])
+        # Once it completed, the next -f downloads everything again.
+        self.assertEqual(self.run_process(force_feedback=True), 5)
+
+        # Refreshes interrupted too long ago start over.
+        with self.assertRaises(requests.ConnectionError):
+            self.run_process(force_feedback=True, fail_after=2)
+        with mock.patch.object(feedback, "RESUME_WINDOW", 0):
+            self.assertEqual(self.run_process(force_feedback=True), 5)
+
+    def test_damaged_page(self):
+        self.run_process()
+        with open(os.path.join(feedback.FEEDBACK_DIR, "3.html"), "ab") as f:
+            f.write(b"<!-- truncated -->")
+        self.assertEqual(self.run_process(), 1)
+        self.assertTrue(self.urls[0].endswith("/nominee/3"))
+
+if __name__ == '__main__':
+    unittest.main()
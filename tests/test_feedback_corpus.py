@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import feedback_corpus
+from bin.fake_datatracker import generate_corpus, render_feedback_page
+from bin.feedback_parser import extract_nominee_feedback, extract_topic_feedback
+
+
+class TestFeedbackCorpus(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.corpus_file = os.path.join(self.tmp_dir.name, "data", "feedback_corpus.jsonl")
+        for patcher in (mock.patch.object(feedback_corpus, "CORPUS_FILE", self.corpus_file), mock.patch.object(feedback_corpus, "CORPUS_STATE", None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def reload(self):
+        # Reads the file again, as the next run would.
+        feedback_corpus.CORPUS_STATE = None
+
+    def assertCorpusHolds(self, nominee_results, topic_results):
+        expected = []
+        for nominee_id, result in nominee_results.items():
+            for position, entries in result["feedback"].items():
+                expected += [(nominee_id, None, position, data["email"], data["fingerprint"]) for data in entries]
+        for topic_id, result in topic_results.items():
+            expected += [(None, topic_id, None, data["email"], data["fingerprint"]) for data in result["feedback"]]
+        actual = [(entry["nominee_id"], entry["topic_id"], entry["position"], entry["email"], entry["fingerprint"]) for entry in feedback_corpus.iter_corpus_entries()]
+        self.assertEqual(sorted(actual, key=repr), sorted(expected, key=repr))
+
+    def test_updates(self):
+        corpus = generate_corpus(num_nominees=3, feedback_per_nominee=8, num_authors=10, seed=3)
+        nominee_results = {}
+        for nominee_id, feedback in corpus["nominee_feedback"].items():
+            result = extract_nominee_feedback(render_feedback_page(dict(feedback, comments=feedback["comments"][2:])))
+            result["nominee_info"] = {"name": f"Nominee {nominee_id}", "email": f"{nominee_id}@example.com"}
+            feedback_corpus.update_nominee_corpus(nominee_id, result)
+            nominee_results[nominee_id] = result
+        topic_results = {}
+        for topic_id, feedback in corpus["topic_feedback"].items():
+            topic_results[topic_id] = extract_topic_feedback(render_feedback_page(feedback))
+            feedback_corpus.update_topic_corpus(topic_id, topic_results[topic_id])
+        self.assertCorpusHolds(nominee_results, topic_results)
+
+        # New entries are appended, and nothing is written for unchanged feedback.
+        nominee_id, feedback = next(iter(corpus["nominee_feedback"].items()))
+        self.reload()
+        with open(self.corpus_file, "rb") as f:
+            content = f.read()
+        feedback_corpus.update_nominee_corpus(nominee_id, nominee_results[nominee_id])
+        self.assertEqual(os.path.getsize(self.corpus_file), len(content))
+        result = extract_nominee_feedback(render_feedback_page(feedback))
+        result["nominee_info"] = nominee_results[nominee_id]["nominee_info"]
+        nominee_results[nominee_id] = result
+        feedback_corpus.update_nominee_corpus(nominee_id, result)
+        with open(self.corpus_file, "rb") as f:
+            appended = f.read()
+        self.assertTrue(appended.startswith(content))
+        self.assertGreater(len(appended), len(content))
+        self.assertCorpusHolds(nominee_results, topic_results)
+
+        # Removed entries are dropped.
+        self.reload()
+        result = extract_nominee_feedback(render_feedback_page(dict(feedback, comments=feedback["comments"][:1])))
+        result["nominee_info"] = {"name": "Renamed", "email": f"{nominee_id}@example.com"}
+        nominee_results[nominee_id] = result
+        feedback_corpus.update_nominee_corpus(nominee_id, result)
+        self.assertCorpusHolds(nominee_results, topic_results)
+        self.assertEqual({entry["nominee"] for entry in feedback_corpus.iter_corpus_entries() if entry["nominee_id"] == nominee_id}, {"Renamed"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import OrderedDict
+from unittest import mock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import build_state
+import doc_cache
+import feedback_corpus
+import feedback_parser
+from bin.fake_datatracker import generate_corpus, render_feedback_page, start_fake_datatracker
+from bin.feedback_parser import extract_nominee_feedback, extract_topic_feedback, update_nominee_feedback, update_topic_feedback
+from bin.storage import read_data_file, read_data_json, read_data_text, write_data_file, write_data_json
+
+# Markup that datatracker's templates could plausibly produce, beyond what the
+# fake datatracker renders.
+TRICKY_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"></head><body>
+<div class="tab-pane" id="comment" role="tabpanel"><dl class="row"><dt>Feedback</dt><dd><pre>Inactive pane</pre></dd></dl></div>
+<div class="tab-pane active" id="comment" role="tabpanel">
+<dl class="row g-0">
+  <dt class="col-sm-2"> From </dt>
+  <dd class="col-sm-10">
+      Zo&euml; &lt;Example&gt; &lt;<a href="mailto:zoe@example.com"> zoe@example.com </a>&gt;</dd>
+  <dt>Date</dt><dd>2025-09-01  10:00</dd>
+  <dt>Positions</dt><dd> Internet Architecture Board, Member </dd>
+  <dt>Subject</dt><!-- no value -->
+  <dt>Feedback</dt><dd><pre>Line one<br>line &amp; two
+  </pre></dd>
+</dl>
+<dl class="row"><dt>From</dt><dd><a href="https://example.com">Not an email</a></dd><dt>Feedback</dt><dd>No pre</dd></dl>
+<dl class="rows"><dt>Feedback</dt><dd><pre>Not an entry</pre></dd></dl>
+<dl class="row"></dl>
+</div>
+<div class="tab-pane" id="questio" role="tabpanel">
+<dl class="row"><dt>Positions</dt><dd>SEC</dd><dt>Feedback</dt><dd><pre>First part. </pre></dd></dl>
+<dl class="row"><dt>Positions</dt><dd>SEC</dd><dt>Feedback</dt><dd><pre>Second part.</pre></dd></dl>
+<dl class="row"><dt>Positions</dt><dd>ART</dd></dl>
+</div>
+</body></html>
+"""
+
+
+class TestFeedbackParser(unittest.TestCase):
+
+    def assertBackendsAgree(self, html_content):
+        for extract in (extract_nominee_feedback, extract_topic_feedback):
+            self.assertEqual(extract(html_content, backend="lxml"), extract(html_content, backend="bs4"))
+
+    def test_synthetic_pages(self):
+        corpus = generate_corpus(num_nominees=10, feedback_per_nominee=10, num_authors=50, seed=1)
+        for feedback in list(corpus["nominee_feedback"].values()) + list(corpus["topic_feedback"].values()):
+            self.assertBackendsAgree(render_feedback_page(feedback))
+
+    def test_tricky_page(self):
+        self.assertBackendsAgree(TRICKY_PAGE)
+        result = extract_nominee_feedback(TRICKY_PAGE)
+        self.assertEqual(result["questionnaires"], {"SEC": "First part.Second part."})
+        self.assertEqual(result["feedback"]["IAB"][0]["email"], "zoe@example.com")
+
+    def test_incremental_updates(self):
+        corpus = generate_corpus(num_nominees=3, feedback_per_nominee=12, num_authors=50, seed=2)
+        for feedback in corpus["nominee_feedback"].values():
+            comments = feedback["comments"]
+            old_page = render_feedback_page(dict(feedback, comments=comments[2:-2]))
+            for backend in ("lxml", "bs4"):
+                previous = extract_nominee_feedback(old_page, backend=backend)
+                for new_comments in (comments[:2] + comments[2:-2], comments[2:-2] + comments[-2:], comments[2:]):
+                    new_page = render_feedback_page(dict(feedback, comments=new_comments))
+                    result, new_entries = update_nominee_feedback(new_page, previous, backend=backend)
+                    self.assertEqual(result, extract_nominee_feedback(new_page, backend=backend))
+                    self.assertEqual(len(new_entries), len(new_comments) - len(comments[2:-2]))
+                # Removed entries make the whole page be parsed again.
+                moved_comments = comments[:2] + comments[2:5] + comments[6:-2]
+                moved_page = render_feedback_page(dict(feedback, comments=moved_comments))
+                result, new_entries = update_nominee_feedback(moved_page, previous, backend=backend)
+                self.assertEqual(result, extract_nominee_feedback(moved_page, backend=backend))
+                self.assertEqual(len(new_entries), 2)
+                # So do entries edited in place, even where their fingerprint stays the same.
+                edited_comments = comments[:2] + comments[2:5] + [dict(comments[5], name="Edited")] + comments[6:-2]
+                edited_page = render_feedback_page(dict(feedback, comments=edited_comments))
+                result, new_entries = update_nominee_feedback(edited_page, previous, backend=backend)
+                self.assertEqual(result, extract_nominee_feedback(edited_page, backend=backend))
+                self.assertEqual(len(new_entries), 2)
+        for feedback in corpus["topic_feedback"].values():
+            previous = extract_topic_feedback(render_feedback_page(dict(feedback, comments=feedback["comments"][1:])))
+            new_page = render_feedback_page(feedback)
+            result, new_entries = update_topic_feedback(new_page, previous)
+            self.assertEqual(result, extract_topic_feedback(new_page))
+            self.assertEqual(len(new_entries), len(feedback["comments"][:1]))
+
+    def test_recorded_pages(self):
+        # Compares the backends on whatever pages were downloaded into the current directory.
+        feedback_dir = "data/feedback_html"
+        if not os.path.isdir(feedback_dir):
+            self.skipTest(f"No downloaded pages in {feedback_dir}")
+        for file_name in sorted(os.listdir(feedback_dir)):
+            if file_name.endswith(".gz"):
+                file_name = file_name[:-len(".gz")]
+            if file_name.endswith(".html"):
+                with self.subTest(file_name=file_name):
+                    self.assertBackendsAgree(read_data_text(os.path.join(feedback_dir, file_name)))
+
+
+def start_patch(test, patcher):
+    test.addCleanup(patcher.stop)
+    return patcher.start()
+
+
+class TestParseModes(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir.name)
+        start_patch(self, mock.patch("builtins.print"))
+        start_patch(self, mock.patch.object(feedback_parser, "save_html_feedback_for_position"))
+        start_patch(self, mock.patch.object(feedback_parser, "get_topic_id_from_position_name", return_value=7))
+        start_patch(self, mock.patch.object(feedback_parser, "get_page_fingerprint", lambda file_name: self.fingerprint))
+        start_patch(self, mock.patch.object(feedback_parser, "PARSED_TOPIC_IDS", []))
+        start_patch(self, mock.patch.object(build_state, "BUILD_STATE", {}))
+        start_patch(self, mock.patch.object(build_state, "BUILD_STATE_DIRTY", False))
+        start_patch(self, mock.patch.object(feedback_corpus, "CORPUS_STATE", None))
+        start_patch(self, mock.patch.object(doc_cache, "DOC_CACHE", OrderedDict()))
+        start_patch(self, mock.patch.object(doc_cache, "DOC_CACHE_BYTES", 0))
+        self.feedback = generate_corpus(num_nominees=1, feedback_per_nominee=4, num_authors=10, seed=4)["topic_feedback"][7]
+        self.output_file = "data/feedback_json/topic_7.json"
+
+    def parse(self, comments, force_parse=False):
+        """Parses a topic page with comments, as a new run would."""
+        page = render_feedback_page(dict(self.feedback, comments=comments))
+        write_data_file("data/feedback_html/topic_7.html", page.encode("utf-8"))
+        self.fingerprint = str(len(comments))
+        feedback_parser.PARSED_TOPIC_IDS.clear()
+        doc_cache.DOC_CACHE.clear()
+        feedback_parser.parse_feedback_for_position("SEC", force_parse=force_parse)
+        return read_data_json(self.output_file), extract_topic_feedback(page)
+
+    def tamper(self):
+        """Edits the first saved entry in place, as an older parser could have got it wrong."""
+        result = read_data_json(self.output_file)
+        result["feedback"][0]["name"] = "Tampered"
+        write_data_json(self.output_file, result)
+
+    def test_modes(self):
+        comments = self.feedback["comments"]
+        result, expected = self.parse(comments[:-1])
+        self.assertEqual(result, expected)
+        # Updates only parse the new entries, and keep the saved ones.
+        self.tamper()
+        result, expected = self.parse(comments)
+        self.assertEqual(result["feedback"][0]["name"], "Tampered")
+        self.assertEqual(result["feedback"][1:], expected["feedback"][1:])
+
+        # -p parses everything again, though the page didn't change.
+        self.tamper()
+        result, expected = self.parse(comments, force_parse=True)
+        self.assertEqual(result, expected)
+        # Otherwise an unchanged page isn't parsed at all.
+        self.tamper()
+        result, expected = self.parse(comments)
+        self.assertEqual(result["feedback"][0]["name"], "Tampered")
+
+        # So do another parser, and a new parser version.
+        start_patch(self, mock.patch.object(feedback_parser, "PARSER_BACKEND", "bs4"))
+        result, expected = self.parse(comments)
+        self.assertEqual(result, expected)
+        self.tamper()
+        start_patch(self, mock.patch.object(feedback_parser, "PARSER_VERSION", feedback_parser.PARSER_VERSION + 1))
+        result, expected = self.parse(comments)
+        self.assertEqual(result, expected)
+
+    def test_processes(self):
+        """Parsing in several processes gives the same results as parsing in this one."""
+        corpus = generate_corpus(num_nominees=6, feedback_per_nominee=5, num_authors=20, seed=8)
+        server, url = start_fake_datatracker(corpus)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        env = dict(os.environ, NOMCOM_DATATRACKER_URL=url)
+        bin_dir = os.path.dirname(os.path.abspath(feedback_parser.__file__))
+        os.makedirs("download/config")
+        with open("download/config/session_id.txt", "w", encoding="utf-8") as f:
+            f.write("test")
+        subprocess.run([sys.executable, os.path.join(bin_dir, "feedback.py")], cwd="download", env=env, stdout=subprocess.DEVNULL, check=True)
+        results = {}
+        for jobs in (1, 4):
+            work_dir = f"jobs{jobs}"
+            shutil.copytree("download", work_dir)
+            subprocess.run([sys.executable, os.path.join(bin_dir, "feedback_parser.py"), "-j", str(jobs)], cwd=work_dir, env=env, stdout=subprocess.DEVNULL, check=True)
+            output_dir = os.path.join(work_dir, "data", "feedback_json")
+            files = {file_name: read_data_file(os.path.join(output_dir, file_name)) for file_name in os.listdir(output_dir)}
+            with mock.patch.object(feedback_corpus, "CORPUS_FILE", os.path.join(work_dir, "data", "feedback_corpus.jsonl")):
+                entries = sorted(feedback_corpus.iter_corpus_entries(), key=repr)
+            results[jobs] = (files, entries)
+        self.assertGreater(len(results[1][0]), 6)
+        self.assertEqual(results[4], results[1])
+
+if __name__ == '__main__':
+    unittest.main()
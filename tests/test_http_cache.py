@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import tempfile
+import time
+from unittest import mock
+import requests
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import http_cache
+import metadata_store
+import storage
+
+URL = "https://datatracker.ietf.org/api/v1/person/person/1/"
+CACHE_FILE = "data/persons/1.json"
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+
+def start_patch(test, patcher):
+    test.addCleanup(patcher.stop)
+    return patcher.start()
+
+
+class TestHttpCache(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir.name)
+        start_patch(self, mock.patch.object(metadata_store, "BACKEND", "json"))
+        start_patch(self, mock.patch.object(storage, "COMPRESSION", "gzip"))
+        start_patch(self, mock.patch.object(http_cache, "VALIDATED_FILES", set()))
+        start_patch(self, mock.patch.dict(http_cache.CACHE_STATS, dict.fromkeys(http_cache.CACHE_STATS, 0)))
+        start_patch(self, mock.patch("builtins.print"))
+        self.responses = []
+        self.requests = []
+        self.urls = []
+        start_patch(self, mock.patch.object(http_cache, "http_get", self.http_get))
+
+    def http_get(self, url, headers=None, priority=None):
+        self.requests.append(headers)
+        self.urls.append(url)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def get(self, responses=(), force_metadata=False, url=URL, cache_file=CACHE_FILE, resource_class="persons", paginated=False):
+        self.responses = list(responses)
+        data = http_cache.get_cached_json(url, cache_file, resource_class, force_metadata=force_metadata, paginated=paginated)
+        self.assertEqual(self.responses, [])
+        # The next call is from the next run.
+        http_cache.VALIDATED_FILES.clear()
+        return data
+
+    def expire(self, cache_file=CACHE_FILE):
+        meta = metadata_store.load_meta(cache_file)
+        meta["validated_at"] = 0
+        metadata_store.save_meta(cache_file, meta)
+
+    def test_revalidation(self):
+        self.assertEqual(self.get([FakeResponse(200, {"name": "A"}, {"ETag": '"1"', "Last-Modified": "Wed, 01 Oct 2025 10:00:00 GMT"})]), {"name": "A"})
+        self.assertEqual(self.requests, [{}])
+
+        # Within its max-age, the cache is used without asking.
+        self.assertEqual(self.get(), {"name": "A"})
+        self.assertEqual(http_cache.CACHE_STATS["fresh"], 1)
+
+        # Once expired, it is revalidated with its validators.
+        self.expire()
+        self.assertEqual(self.get([FakeResponse(304)]), {"name": "A"})
+        self.assertEqual(self.requests[-1], {"If-None-Match": '"1"', "If-Modified-Since": "Wed, 01 Oct 2025 10:00:00 GMT"})
+        self.assertEqual(http_cache.CACHE_STATS["not_modified"], 1)
+        # Which makes it fresh again.
+        self.assertEqual(self.get(), {"name": "A"})
+
+        # force_metadata revalidates regardless of age, and picks up changes.
+        self.assertEqual(self.get([FakeResponse(200, {"name": "B"}, {"ETag": '"2"'})], force_metadata=True), {"name": "B"})
+        self.assertEqual(self.requests[-1]["If-None-Match"], '"1"')
+        self.assertEqual(metadata_store.load_meta(CACHE_FILE)["etag"], '"2"')
+        self.assertEqual(http_cache.CACHE_STATS["downloaded"], 2)
+
+    def test_stale_fallback(self):
+        with self.assertRaises(requests.ConnectionError):
+            self.get([requests.ConnectionError("down")])
+        self.get([FakeResponse(200, {"name": "A"})])
+        self.expire()
+        self.assertEqual(self.get([FakeResponse(500)]), {"name": "A"})
+        self.assertEqual(self.get([requests.ConnectionError("down")]), {"name": "A"})
+        self.assertEqual(http_cache.CACHE_STATS["stale"], 2)
+        # Serving a stale copy doesn't make it fresh for the next run.
+        self.assertEqual(self.get([FakeResponse(304)]), {"name": "A"})
+
+    def test_paginated(self):
+        list_url = "https://datatracker.ietf.org/api/v1/nomcom/nomineeposition/"
+        page_url = http_cache.get_page_url(list_url)
+        next_path = "/api/v1/nomcom/nomineeposition/?limit=2&offset=2"
+
+        def page(objects, next_path=None):
+            return {"meta": {"limit": 2, "next": next_path, "offset": 0, "previous": None, "total_count": 3}, "objects": objects}
+
+        def get(responses):
+            return self.get(responses, url=list_url, cache_file="data/nominee_positions.json", resource_class="nominee_positions", paginated=True)
+
+        first_page = FakeResponse(200, page([{"id": 1}, {"id": 2}], next_path), {"ETag": '"1"'})
+        self.assertEqual(get([first_page, FakeResponse(200, page([{"id": 3}]), {"ETag": '"2"'})])["objects"], [{"id": 1}, {"id": 2}, {"id": 3}])
+        self.assertEqual(self.urls, [page_url, "https://datatracker.ietf.org" + next_path])
+
+        # Every page is revalidated, and kept if none of them changed.
+        del self.urls[:]
+        self.assertEqual(get([FakeResponse(304), FakeResponse(304)])["objects"], [{"id": 1}, {"id": 2}, {"id": 3}])
+        self.assertEqual(self.requests[-2:], [{"If-None-Match": '"1"'}, {"If-None-Match": '"2"'}])
+        self.assertEqual(self.urls, [page_url, "https://datatracker.ietf.org" + next_path])
+        self.assertEqual(http_cache.CACHE_STATS["not_modified"], 1)
+
+        # A change to a later page alone downloads the list again.
+        changed_page = FakeResponse(200, page([{"id": 3, "state": "accepted"}]), {"ETag": '"3"'})
+        self.assertEqual(get([FakeResponse(304), changed_page, first_page, changed_page])["objects"], [{"id": 1}, {"id": 2}, {"id": 3, "state": "accepted"}])
+        self.assertEqual(metadata_store.load_meta("data/nominee_positions.json")["pages"][1]["etag"], '"3"')
+        self.assertEqual(http_cache.CACHE_STATS["downloaded"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
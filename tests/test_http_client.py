@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import threading
+import time
+from unittest import mock
+import requests
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import http_client
+import rate_limiter
+
+URL = "https://datatracker.ietf.org/api/v1/person/person/1/"
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = b"{}"
+
+
+class FakeSession:
+    """Returns the given responses in order, raising those that are exceptions."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def start_patch(test, patcher):
+    test.addCleanup(patcher.stop)
+    return patcher.start()
+
+
+def make_budget(rate, tokens=0.0):
+    return {"rate": rate, "min_rate": 1.0, "max_rate": 8.0, "increase": 2.0, "burst": 1.0, "tokens": tokens, "updated": time.monotonic(), "waiters": []}
+
+
+class TestHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in (("SESSION", None), ("MAX_RETRIES", 2), ("VERBOSE", False)):
+            self.addCleanup(setattr, http_client, name, getattr(http_client, name))
+            setattr(http_client, name, value)
+        self.addCleanup(setattr, http_client, "HTTP_STATS", http_client.HTTP_STATS)
+        http_client.HTTP_STATS = dict.fromkeys(http_client.HTTP_STATS, 0)
+        # Don't pace or wait between the fake requests.
+        start_patch(self, mock.patch.dict(rate_limiter.BUDGETS, api=make_budget(0)))
+        self.sleep = start_patch(self, mock.patch.object(http_client.time, "sleep"))
+
+    def get(self, responses):
+        http_client.SESSION = FakeSession(responses)
+        return http_client.http_get(URL)
+
+    def test_retries(self):
+        response = self.get([requests.ConnectionError("reset"), FakeResponse(503, {"Retry-After": "7"}), FakeResponse(200)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(http_client.SESSION.urls), 3)
+        self.assertEqual(http_client.HTTP_STATS["retries"], 2)
+        self.assertEqual(http_client.HTTP_STATS["failures"], 0)
+        # The first delay is a jittered backoff, the second the one asked for.
+        first_delay, second_delay = [call.args[0] for call in self.sleep.call_args_list]
+        self.assertLessEqual(first_delay, http_client.BACKOFF_BASE)
+        self.assertEqual(second_delay, 7)
+
+    def test_gives_up(self):
+        response = self.get([FakeResponse(500)] * 3)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(http_client.HTTP_STATS["failures"], 1)
+        with self.assertRaises(requests.Timeout):
+            self.get([requests.Timeout()] * 3)
+        self.assertEqual(http_client.HTTP_STATS["failures"], 2)
+        # Other errors aren't retried.
+        self.assertEqual(self.get([FakeResponse(404)]).status_code, 404)
+        self.assertEqual(http_client.HTTP_STATS["retries"], 4)
+
+    def test_backoff(self):
+        for attempt in range(10):
+            self.assertLessEqual(http_client._get_backoff(attempt), min(http_client.BACKOFF_MAX, http_client.BACKOFF_BASE * 2 ** attempt))
+        self.assertIsNone(http_client._get_retry_after(FakeResponse(503)))
+        self.assertIsNone(http_client._get_retry_after(FakeResponse(503, {"Retry-After": "soon"})))
+        self.assertEqual(http_client._get_retry_after(FakeResponse(503, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})), 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        start_patch(self, mock.patch.dict(rate_limiter.BUDGETS, test=make_budget(4.0)))
+        start_patch(self, mock.patch.dict(rate_limiter.RATE_LIMIT_STATS, test={"requests": 0, "waited": 0.0, "max_wait": 0.0, "max_queue_depth": 0, "throttled": 0}))
+        self.budget = rate_limiter.BUDGETS["test"]
+
+    def test_adaptive_rate(self):
+        # Throttling halves the rate, down to min_rate, and drops saved-up tokens.
+        self.budget["tokens"] = 1.0
+        with mock.patch("builtins.print"):
+            rate_limiter.report_response("test", 429, 0.1)
+            self.assertEqual((self.budget["rate"], self.budget["tokens"]), (2.0, 0))
+            rate_limiter.report_response("test", 503, 0.1)
+            rate_limiter.report_response("test", 503, 0.1)
+        self.assertEqual(self.budget["rate"], 1.0)
+        self.assertEqual(rate_limiter.RATE_LIMIT_STATS["test"]["throttled"], 3)
+        # Fast responses add increase / rate, so about increase per second, up to max_rate.
+        rate_limiter.report_response("test", 200, 0.1)
+        self.assertEqual(self.budget["rate"], 3.0)
+        rate_limiter.report_response("test", 200, rate_limiter.FAST_LATENCY + 1)
+        rate_limiter.report_response("test", 404, 0.1)
+        self.assertEqual(self.budget["rate"], 3.0)
+        for _ in range(100):
+            rate_limiter.report_response("test", 200, 0.1)
+        self.assertEqual(self.budget["rate"], 8.0)
+
+    def test_priority(self):
+        order = []
+
+        def acquire(priority):
+            rate_limiter.acquire("test", priority=priority)
+            order.append(priority)
+
+        # With no tokens, the low priority request waits for the next one, and
+        # the high priority request that comes in meanwhile gets it first.
+        low = threading.Thread(target=acquire, args=(rate_limiter.PRIORITY_LOW,))
+        low.start()
+        while not self.budget["waiters"]:
+            time.sleep(0.001)
+        high = threading.Thread(target=acquire, args=(rate_limiter.PRIORITY_HIGH,))
+        high.start()
+        low.join()
+        high.join()
+        self.assertEqual(order, [rate_limiter.PRIORITY_HIGH, rate_limiter.PRIORITY_LOW])
+        self.assertEqual(rate_limiter.RATE_LIMIT_STATS["test"]["requests"], 2)
+        self.assertEqual(rate_limiter.RATE_LIMIT_STATS["test"]["max_queue_depth"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from unittest import mock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import metadata_store
+import storage
+from fake_datatracker import generate_corpus, start_fake_datatracker
+
+BIN_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin'))
+
+
+def start_patch(test, patcher):
+    test.addCleanup(patcher.stop)
+    return patcher.start()
+
+
+def read_data_files(root):
+    """Returns {path: bytes} of the cached objects under root, leaving out their metadata."""
+    files = {}
+    for dir_path, _, file_names in os.walk(os.path.join(root, "data")):
+        for file_name in file_names:
+            if file_name.endswith(".json"):
+                path = os.path.join(dir_path, file_name)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+class TestMetadataStore(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir.name)
+        start_patch(self, mock.patch.object(storage, "COMPRESSION", None))
+        start_patch(self, mock.patch.object(metadata_store, "SQLITE_LOCAL", threading.local()))
+        self.addCleanup(self.close)
+        start_patch(self, mock.patch("builtins.print"))
+
+    def close(self):
+        connection = getattr(metadata_store.SQLITE_LOCAL, "connection", None)
+        if connection is not None:
+            connection.close()
+
+    def use(self, backend):
+        start_patch(self, mock.patch.object(metadata_store, "BACKEND", backend))
+
+    def run_operations(self):
+        """Returns what each backend gives back for the same operations."""
+        results = []
+        path = "data/persons/1.json"
+        results.append((metadata_store.exists(path), metadata_store.load_json(path), metadata_store.load_meta(path)))
+        metadata_store.save_json(path, {"name": "Zoë", "emails": ["a@example.com"]}, meta={"etag": '"1"', "validated_at": 1.0})
+        metadata_store.save_json("data/nominees.json", {"objects": [{"id": 1}]})
+        results.append((metadata_store.exists(path), metadata_store.load_json(path), metadata_store.load_meta(path)))
+        # Saving without metadata keeps the previous metadata.
+        metadata_store.save_json(path, {"name": "Zoë"})
+        results.append(metadata_store.load_meta(path))
+        metadata_store.save_meta(path, {"etag": '"2"', "validated_at": 2.0})
+        results.append((metadata_store.load_json(path), metadata_store.load_meta(path)))
+        results.append(metadata_store.load_json("data/nominees.json"))
+        return results
+
+    def test_parity(self):
+        self.use("json")
+        json_results = self.run_operations()
+        os.chdir(tempfile.mkdtemp(dir="."))
+        self.use("sqlite")
+        self.assertEqual(self.run_operations(), json_results)
+        self.assertFalse(os.path.exists("data/persons"))
+
+    def test_import_export(self):
+        self.use("json")
+        metadata_store.save_json("data/persons/1.json", {"name": "A"}, meta={"etag": '"1"', "validated_at": 1.0})
+        metadata_store.save_json("data/groups/2.json", {"acronym": "wg"}, meta={"validated_at": 2.0})
+        metadata_store.save_json("data/positions.json", {"objects": []}, meta={"validated_at": 3.0})
+        files = read_data_files(".")
+        metadata_store.import_json_tree()
+        for path in files:
+            os.remove(path)
+            os.remove(path + ".meta")
+
+        self.use("sqlite")
+        self.assertEqual(metadata_store.load_json("data/groups/2.json"), {"acronym": "wg"})
+        self.assertEqual(metadata_store.load_meta("data/persons/1.json"), {"etag": '"1"', "validated_at": 1.0})
+        metadata_store.export_json_tree()
+        self.assertEqual(read_data_files("."), files)
+
+    def test_crawl(self):
+        """A crawl caches the same objects in either store."""
+        corpus = generate_corpus(num_nominees=5, feedback_per_nominee=2, num_authors=20, seed=6)
+        server, url = start_fake_datatracker(corpus)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        env = dict(os.environ, NOMCOM_DATATRACKER_URL=url)
+        files = {}
+        for backend in ("json", "sqlite"):
+            os.makedirs(backend)
+            subprocess.run([sys.executable, os.path.join(BIN_DIR, "metadata_store.py"), "--backend", backend], cwd=backend, stdout=subprocess.DEVNULL, check=True)
+            subprocess.run([sys.executable, os.path.join(BIN_DIR, "nominees.py"), "-j", "4"], cwd=backend, env=env, stdout=subprocess.DEVNULL, check=True)
+            if backend == "sqlite":
+                self.assertEqual(read_data_files(backend), {})
+                subprocess.run([sys.executable, os.path.join(BIN_DIR, "metadata_store.py"), "--export"], cwd=backend, stdout=subprocess.DEVNULL, check=True)
+            files[backend] = read_data_files(backend)
+        self.assertIn(os.path.join("data", "nominees", "1.json"), files["json"])
+        self.assertEqual(files["sqlite"], files["json"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from unittest import mock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import http_cache
+import http_client
+import metadata_store
+import nominees
+import storage
+from fake_datatracker import generate_corpus, start_fake_datatracker
+
+NOMINEES_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin/nominees.py'))
+
+
+def read_files(root, directories):
+    """Returns {path: bytes} of the data files in directories, leaving out their metadata."""
+    files = {}
+    for directory in directories:
+        for file_name in os.listdir(os.path.join(root, directory)):
+            if not file_name.endswith(".meta"):
+                with open(os.path.join(root, directory, file_name), "rb") as f:
+                    files[os.path.join(directory, file_name)] = f.read()
+    return files
+
+
+def start_patch(test, patcher):
+    test.addCleanup(patcher.stop)
+    return patcher.start()
+
+
+class TestNominees(unittest.TestCase):
+
+    def start_fake_datatracker(self):
+        corpus = generate_corpus(num_nominees=8, feedback_per_nominee=2, num_authors=20, seed=5)
+        server, url = start_fake_datatracker(corpus)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return url
+
+    def test_coalesced(self):
+        lookups = threading.Semaphore(0)
+
+        class InFlight(dict):
+            def get(self, key):
+                lookups.release()
+                return super().get(key)
+
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait()
+            return {"name": "A", "emails": ["a@example.com"]}
+
+        results = [None] * 4
+
+        def run(i):
+            results[i] = nominees._coalesced(("test", "1"), fetch)
+            # Everyone can change what they got without affecting the others.
+            results[i]["emails"].append(str(i))
+
+        with mock.patch.object(nominees, "IN_FLIGHT", InFlight()):
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            # Only let the fetch finish once every thread found it in flight.
+            for _ in threads:
+                lookups.acquire()
+            release.set()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(nominees.IN_FLIGHT, {})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(result["emails"][1] for result in results), ["0", "1", "2", "3"])
+        self.assertTrue(all(len(result["emails"]) == 2 for result in results))
+
+    def test_concurrent_crawl(self):
+        """Crawling concurrently writes the same files as crawling one nominee at a time."""
+        env = dict(os.environ, NOMCOM_DATATRACKER_URL=self.start_fake_datatracker())
+        files = {}
+        for jobs in (1, 8):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                subprocess.run([sys.executable, NOMINEES_SCRIPT, "-j", str(jobs)], cwd=tmp_dir, env=env, stdout=subprocess.DEVNULL, check=True)
+                files[jobs] = read_files(tmp_dir, ["data/nominees", "data/persons"])
+        self.assertEqual(len([path for path in files[1] if path.startswith("data/nominees")]), 8)
+        self.assertEqual(files[8], files[1])
+
+    def test_prefetch(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir.name)
+        start_patch(self, mock.patch.object(http_client, "DATATRACKER_URL_OVERRIDE", self.start_fake_datatracker()))
+        start_patch(self, mock.patch.object(metadata_store, "BACKEND", "json"))
+        start_patch(self, mock.patch.object(storage, "COMPRESSION", None))
+        start_patch(self, mock.patch.object(http_cache, "VALIDATED_FILES", set()))
+        start_patch(self, mock.patch.object(nominees, "PREFETCH_MISSES", None))
+        start_patch(self, mock.patch("builtins.print"))
+
+        def prefetch(person_ids, force_metadata=False):
+            requests_before = http_client.HTTP_STATS["requests"]
+            nominees.prefetch_persons(person_ids, force_metadata=force_metadata)
+            return http_client.HTTP_STATS["requests"] - requests_before
+
+        self.assertEqual(prefetch(["1001", "1002", "9999"]), 1)
+        self.assertEqual(metadata_store.load_json("data/persons/1002.json")["id"], 1002)
+        self.assertEqual(list(nominees.PREFETCH_MISSES["persons"]), ["9999"])
+        # Cached objects and recent misses aren't asked for again, even by the next run.
+        http_cache.VALIDATED_FILES.clear()
+        nominees.PREFETCH_MISSES = None
+        self.assertEqual(prefetch(["1001", "1002", "9999"]), 0)
+        self.assertEqual(prefetch(["1003", "9999"]), 1)
+        self.assertEqual(prefetch(["9999"], force_metadata=True), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import feedback_corpus
+import search
+
+
+def make_entry(name, feedback, date="2025-10-01 10:00"):
+    return {"name": name, "email": f"{name.lower()}@example.com", "date": date, "feedback": feedback, "fingerprint": f"{name}-{date}-{feedback}"}
+
+
+def make_result(feedback, questionnaires=None):
+    return {"feedback": feedback, "questionnaires": questionnaires or {}, "nominee_info": {"name": "Nominee", "email": "nominee@example.com"}}
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir.name)
+        for patcher in (mock.patch.object(feedback_corpus, "CORPUS_FILE", os.path.join(tmp_dir.name, "corpus.jsonl")), mock.patch.object(feedback_corpus, "CORPUS_STATE", None), mock.patch.object(search, "TOPIC_POSITIONS", {7: ["SEC", "ART"]})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        search.LOADED_FILES.clear()
+
+    def update(self):
+        search.update_search_index()
+        # Read everything back from disk, as the next run would.
+        search.LOADED_FILES.clear()
+
+    def assertResults(self, query, expected, position=None):
+        results = search.search(query, position=position)
+        self.assertEqual([(doc["n"], doc["t"], doc["k"], doc["a"]) for _, _, doc in results], expected)
+
+    def test_search(self):
+        feedback_corpus.update_nominee_corpus(1, make_result({
+            "SEC": [make_entry("Alice", "Great at shepherding documents."), make_entry("Bob", "Shepherding, shepherding and more shepherding drafts.")],
+            "ART": [make_entry("Carol", "Good at shepherding drafts.")],
+        }, questionnaires={"SEC": "I enjoy reviewing drafts."}))
+        feedback_corpus.update_topic_corpus(7, {"feedback": [make_entry("Dan", "The next AD needs to like shepherding.")]})
+        self.update()
+        # Results rank by BM25, which favors entries repeating the term, then shorter ones.
+        self.assertResults("shepherding", [(1, None, "f", "Bob"), (1, None, "f", "Alice"), (1, None, "f", "Carol"), (None, 7, "f", "Dan")])
+        self.assertResults("Shepherding  DRAFTS", [(1, None, "f", "Bob"), (1, None, "f", "Carol")])
+        self.assertResults("shepherding", [(1, None, "f", "Carol"), (None, 7, "f", "Dan")], position="art")
+        self.assertResults("drafts", [(1, None, "q", "Nominee"), (1, None, "f", "Bob")], position="SEC")
+        self.assertResults("nothing", [])
+
+        # New entries and questionnaires are indexed from where the last update stopped.
+        feedback_corpus.update_nominee_corpus(1, make_result({
+            "SEC": [make_entry("Alice", "Great at shepherding documents."), make_entry("Bob", "Shepherding, shepherding and more shepherding drafts."), make_entry("Erin", "Documents galore.")],
+            "ART": [make_entry("Carol", "Good at shepherding drafts.")],
+        }, questionnaires={"SEC": "I enjoy reading documents."}))
+        self.assertTrue(search._is_index_current(search._get_meta()))
+        self.update()
+        self.assertResults("documents", [(1, None, "f", "Erin"), (1, None, "f", "Alice"), (1, None, "q", "Nominee")])
+        self.assertResults("reviewing", [])
+
+        # Removing entries rewrites the corpus, which rebuilds the index.
+        feedback_corpus.update_nominee_corpus(1, make_result({"SEC": [make_entry("Erin", "Documents galore.")]}))
+        self.update()
+        self.assertResults("documents", [(1, None, "f", "Erin")])
+        self.assertResults("shepherding", [(None, 7, "f", "Dan")])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../bin')))
+import metadata_store
+import storage
+
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir.name)
+        for patcher in (mock.patch.object(storage, "COMPRESSION", None), mock.patch.object(metadata_store, "BACKEND", "json"), mock.patch("builtins.print")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_migrate(self):
+        files = {
+            "data/persons/1.json": {"name": "Zoë", "emails": ["a@example.com"] * 100},
+            "data/feedback_json/2.json": {"feedback": {"SEC": []}},
+        }
+        page = "<html>" + "feedback " * 1000 + "</html>"
+        for path, data in files.items():
+            storage.write_data_json(path, data)
+        storage.write_data_file("data/feedback_html/2.html", page.encode("utf-8"))
+        paths = list(files) + ["data/feedback_html/2.html"]
+        # Files are stored as they are, and indented, unless configured otherwise.
+        self.assertEqual(storage.get_compression(), "none")
+        with open("data/persons/1.json", "r", encoding="utf-8") as f:
+            self.assertIn('\n    "name"', f.read())
+        sizes = {path: os.path.getsize(path) for path in paths}
+
+        storage.migrate_data_files("gzip")
+        storage.COMPRESSION = None
+        self.assertEqual(storage.get_compression(), "gzip")
+        for path in paths:
+            self.assertFalse(os.path.exists(path))
+            self.assertTrue(os.path.exists(path + storage.COMPRESSED_SUFFIX))
+        self.assertEqual(storage.get_data_file_size("data/feedback_html/2.html"), sizes["data/feedback_html/2.html"])
+        self.assertLess(os.path.getsize("data/feedback_html/2.html.gz"), sizes["data/feedback_html/2.html"] / 10)
+        for path, data in files.items():
+            self.assertEqual(storage.read_data_json(path), data)
+            self.assertLess(storage.get_data_file_size(path), sizes[path])
+        self.assertEqual(storage.read_data_text("data/feedback_html/2.html"), page)
+
+        # New files follow the configured form, and compressed JSON isn't indented.
+        storage.write_data_json("data/persons/3.json", {"name": "C"})
+        self.assertEqual(storage.get_data_file_size("data/persons/3.json"), len('{"name":"C"}'))
+
+        storage.migrate_data_files("none")
+        storage.COMPRESSION = None
+        self.assertEqual(storage.get_compression(), "none")
+        for path in paths:
+            self.assertTrue(os.path.exists(path))
+            self.assertFalse(os.path.exists(path + storage.COMPRESSED_SUFFIX))
+            self.assertEqual(os.path.getsize(path), sizes[path])
+        for path, data in files.items():
+            self.assertEqual(storage.read_data_json(path), data)
+        self.assertEqual(storage.read_data_json("data/persons/3.json"), {"name": "C"})
+        # Migrated JSON is indented again.
+        with open("data/persons/3.json", "r", encoding="utf-8") as f:
+            self.assertIn('\n    "name"', f.read())
+
+if __name__ == '__main__':
+    unittest.main()